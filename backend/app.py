@@ -1,17 +1,259 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-from inventory_optimization import recommend_stock_levels
-from game import StockGame
-import copy
+from inventory_optimization import (
+    recommend_stock_levels, evaluate_stock_levels, product_columns, recommend_scenarios,
+    build_recommendations, EOQCache, DEFAULT_CACHE_SIZE
+)
+from parallel import use_parallel, recommend_sharded, simulate_sharded
+from safety_stock import (
+    recommend_with_safety_stock, validate_options, DEFAULT_SERVICE_LEVEL, DEFAULT_SAMPLES
+)
+from ndjson_stream import (
+    NDJSON_MIMETYPE, iter_ndjson, iter_chunks, dump_line, parse_chunk_size
+)
+from sensitivity import compute_sensitivities, aggregate_sensitivities, sensitivity_report
+from catalog_registry import CatalogRegistry, DEFAULT_CATALOG_ID
+from catalog_format import (
+    BinaryCatalogStore, CatalogFormatError, BINARY_MIMETYPE, encode_catalog
+)
+from game import StockGame, REPORT_LEVELS, DAY_ACTIONS
+from game_arrays import ArrayStockGame
+from policy_evaluation import RestockPolicy, evaluate_policy as run_policy_evaluation
+from policy_search import (
+    PolicySearch, RolloutCache, candidate_space, DEFAULT_REORDER_DAYS, DEFAULT_ORDER_FACTORS
+)
+from game_store import GameStore, DEFAULT_STORE_PATH
+from game_events import EventBroker, CLOSED, RESYNC
+from game_sessions import (
+    SessionRegistry, SESSION_HEADER, DEFAULT_SESSION_ID, DEFAULT_SESSION_TTL,
+    DEFAULT_MAX_SESSIONS, valid_session_id
+)
+import os
+import queue
+import threading
 
 app = Flask(__name__)
-CORS(app)  # Enable CORS for frontend communication
+CORS(app, expose_headers=[SESSION_HEADER])  # Enable CORS for frontend communication
 
-# Store for product data (in-memory for simplicity)
-product_store = []
+# Game sessions keyed by X-Session-ID (idle TTL and capacity via env)
+game_sessions = SessionRegistry(
+    ttl=float(os.environ.get('GAME_SESSION_TTL', DEFAULT_SESSION_TTL)),
+    max_sessions=int(os.environ.get('GAME_MAX_SESSIONS', DEFAULT_MAX_SESSIONS))
+)
 
-# Global game instance
-game_instance = None
+# Persistent action log + snapshots of every session's game (GAME_STORE_PATH)
+game_store = GameStore(DEFAULT_STORE_PATH) if DEFAULT_STORE_PATH else None
+_resume_lock = threading.Lock()
+
+# Server-Sent Events channels of watched sessions (/events)
+game_events = EventBroker()
+
+# Seconds between keepalive comments on idle /events streams
+EVENTS_KEEPALIVE = 15
+
+# Game cores selectable by /start_game?engine=... (default via GAME_ENGINE)
+GAME_ENGINES = {
+    'classic': StockGame,
+    'array': ArrayStockGame
+}
+DEFAULT_GAME_ENGINE = os.environ.get('GAME_ENGINE', 'classic')
+
+# Engines of /evaluate_policy and /optimize_policy: policy episodes spend
+# their time in per-order restocks, where the array engine is slower at
+# every store size measured (python benchmark.py engines)
+POLICY_ENGINES = ('classic',)
+
+# Upper bound on the days simulated by one /advance call
+MAX_ADVANCE_DAYS = 100000
+
+# Upper bound on the points per series returned by /history
+MAX_HISTORY_POINTS = 10000
+
+# Days a /replay may simulate
+MAX_REPLAY_DAYS = 1000000
+
+# Simulated days (episodes x days) an /evaluate_policy or /optimize_policy request may
+# run: about four minutes on one process (~20k days/s), less on the process pool
+MAX_POLICY_DAYS = 5000000
+
+# Episodes of one /evaluate_policy request, or per policy of an /optimize_policy
+# request (each keeps a seed and a result row)
+MAX_POLICY_EPISODES = 20000
+
+# Actions accepted in one /batch request
+MAX_BATCH_ACTIONS = 1000
+
+# Policy searches of /optimize_policy with the types of their options, and
+# their shared rollout cache
+POLICY_SEARCH_OPTIONS = {
+    'cross_entropy': {
+        'iterations': int, 'samples': int, 'elite_fraction': float,
+        'smoothing': float, 'episodes': int, 'validation_episodes': int
+    },
+    'successive_halving': {
+        'candidates': int, 'min_episodes': int, 'max_episodes': int,
+        'eta': int, 'validation_episodes': int
+    },
+    'grid': {'episodes': int, 'validation_episodes': int}
+}
+POLICY_SEARCH_METHODS = tuple(POLICY_SEARCH_OPTIONS)
+rollout_cache = RolloutCache()
+
+# Shared EOQ/cost cache for the optimization endpoints (size via EOQ_CACHE_SIZE)
+eoq_cache = EOQCache(maxsize=int(os.environ.get('EOQ_CACHE_SIZE', DEFAULT_CACHE_SIZE)))
+
+REQUIRED_PRODUCT_FIELDS = ['name', 'stock', 'demand', 'cost_storage', 'cost_restock']
+
+# Catalogs keyed by catalog ID / SKU, with their last recommendations
+catalog_registry = CatalogRegistry(cache=eoq_cache, required_fields=REQUIRED_PRODUCT_FIELDS)
+
+# Binary catalogs on local disk (directory via CATALOG_DATA_DIR)
+binary_catalogs = BinaryCatalogStore(os.environ.get(
+    'CATALOG_DATA_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'catalog_data')
+))
+
+
+def missing_product_fields(product):
+    """Return the required product fields absent from a product dict."""
+    return [field for field in REQUIRED_PRODUCT_FIELDS if field not in product]
+
+
+def parse_scenarios(scenarios):
+    """Normalize /simulate scenario definitions, filling in default multipliers."""
+    scenario_specs = []
+    for scenario in scenarios:
+        modifications = scenario.get('modifications', {})
+        scenario_specs.append({
+            'name': scenario.get('name', 'Unnamed Scenario'),
+            'demand_multiplier': modifications.get('demand_multiplier', 1.0),
+            'cost_storage_multiplier': modifications.get('cost_storage_multiplier', 1.0),
+            'cost_restock_multiplier': modifications.get('cost_restock_multiplier', 1.0)
+        })
+    return scenario_specs
+
+
+def simulate_scenarios(columns, scenario_specs, parallel=False):
+    """
+    Evaluate the whole scenarios x products matrix in one pass.
+    
+    Args:
+        columns: Catalog columns (see inventory_optimization.product_columns)
+        scenario_specs: Output of parse_scenarios()
+        parallel: Shard the catalog across the process pool
+    
+    Yields:
+        (scenario spec, list of recommendations) for each scenario, in order
+    """
+    multipliers = (
+        [spec['demand_multiplier'] for spec in scenario_specs],
+        [spec['cost_storage_multiplier'] for spec in scenario_specs],
+        [spec['cost_restock_multiplier'] for spec in scenario_specs]
+    )
+    
+    if parallel:
+        per_scenario = simulate_sharded(columns, *multipliers)
+    else:
+        per_scenario = recommend_scenarios(columns, *multipliers, cache=eoq_cache)
+    
+    yield from zip(scenario_specs, per_scenario)
+
+
+def request_columns(data):
+    """
+    Catalog columns for a request: its "binary_catalog", its "products", or
+    the stored catalog named by "catalog_id".
+    
+    Returns:
+        The columns, or None if the binary catalog does not exist
+    """
+    if 'binary_catalog' in data:
+        mapped = binary_catalogs.open(data['binary_catalog'])
+        return mapped.columns() if mapped is not None else None
+    
+    base_products = data.get('products')
+    if base_products is None:
+        catalog = catalog_registry.get(data.get('catalog_id', DEFAULT_CATALOG_ID))
+        base_products = catalog.product_list() if catalog else []
+    return product_columns(base_products)
+
+
+def request_session_id():
+    """
+    Session ID of a game request: the X-Session-ID header, else the
+    session_id query parameter, else the shared default session.
+    """
+    return (request.headers.get(SESSION_HEADER)
+            or request.args.get('session_id')
+            or DEFAULT_SESSION_ID)
+
+
+def current_session():
+    """
+    The caller's live game session, or None if it has no game.
+    
+    With a game store, a session that is not in memory (after a restart,
+    or once expired) is resumed from the store.
+    """
+    session_id = request_session_id()
+    session = game_sessions.get(session_id)
+    if session is not None or game_store is None or not valid_session_id(session_id):
+        return session
+    
+    with _resume_lock:
+        session = game_sessions.get(session_id)
+        if session is None:
+            game = game_store.load(session_id)
+            if game is not None:
+                session = game_sessions.create(lambda: game, session_id)
+        return session
+
+
+def game_changed(session, event=None, data=None):
+    """
+    Record a change to the session's game: queue its new actions for the
+    game store, if there is one, and push the event and the state delta
+    to the session's watchers. Call with the session lock held.
+    """
+    if game_store is not None:
+        game_store.record(session.session_id, session.game)
+    game_events.publish_state(session.session_id, session.game, event, data)
+
+
+def state_etag(game):
+    """ETag of a game's current state (game ID and state version)."""
+    return f'{game.game_id}-{game.version}'
+
+
+def request_state(game):
+    """
+    The game state for the current request: full, or only what changed
+    since the ?since_version= the client already holds.
+    """
+    since_version = request.args.get('since_version', type=int)
+    if since_version is not None and request.args.get('game_id') not in (None, game.game_id):
+        # The client's version belongs to an earlier game
+        since_version = None
+    return game.get_state(since_version=since_version)
+
+
+def invalid_chunk_line(chunk):
+    """Return an error message for the first NDJSON product missing fields, if any."""
+    for line_number, product in chunk:
+        missing_fields = missing_product_fields(product)
+        if missing_fields:
+            return f'Line {line_number} missing required fields: {", ".join(missing_fields)}'
+    return None
+
+
+def wants_ndjson():
+    """True when the request body is newline-delimited JSON (streaming mode)."""
+    return request.mimetype == NDJSON_MIMETYPE
+
+
+def ndjson_response(lines):
+    """Stream NDJSON lines back as a chunked response."""
+    return Response(stream_with_context(lines), mimetype=NDJSON_MIMETYPE)
 
 
 @app.route('/')
@@ -23,16 +265,31 @@ def home():
         'endpoints': {
             'optimization': {
                 '/recommend': 'POST - Get stock level recommendations for products',
-                '/simulate': 'POST - Simulate scenarios with updated demand/costs'
+                '/simulate': 'POST - Simulate scenarios with updated demand/costs',
+                '/sensitivity': 'POST - Derivatives and elasticities of EOQ / total cost per product and catalog-wide',
+                '/cache_stats': 'GET - EOQ cache hit/miss/eviction counters (DELETE clears it)',
+                '/catalogs': 'GET - List stored catalogs',
+                '/catalogs/<catalog_id>': 'GET recommendations / PUT full catalog / PATCH upsert+delete SKUs / DELETE',
+                '/binary_catalogs/<catalog_id>': 'PUT - Upload a binary (or JSON) catalog for memory-mapped use, GET info, DELETE'
             },
             'game': {
-                '/start_game': 'GET - Start a new stock management game',
+                '/start_game': 'GET - Start a new stock management game (per X-Session-ID session)',
+                '/end_game': 'POST - End the current session',
+                '/sessions': 'GET - Live session metrics (?memory=1 for memory per session)',
                 '/next_day': 'POST - Advance to next day in the game',
+                '/advance': 'POST - Advance several days in one call (params: days, report_level)',
+                '/action_log': 'GET - Seed and action log of the current game',
+                '/replay': 'POST - Rebuild a game from a seed and action log (params: seed, actions, until_day)',
+                '/batch': 'POST - Apply a list of actions atomically (params: actions)',
                 '/restock': 'POST - Restock a product (params: product, quantity)',
                 '/unlock_item': 'POST - Unlock a store item (params: item_name)',
                 '/get_state': 'GET - Get current game state',
+                '/history': 'GET - Chart history (params: start_day, end_day, products, max_points)',
                 '/get_daily_report': 'GET - Get most recent daily report',
-                '/apply_multipliers': 'POST - Preview scenario with multipliers'
+                '/events': 'GET - Server-Sent Events stream of a session (day reports, actions, state deltas)',
+                '/apply_multipliers': 'POST - Preview scenario with multipliers',
+                '/evaluate_policy': 'POST - Monte Carlo score of a restocking policy (params: policy, episodes, days, seed)',
+                '/optimize_policy': 'POST - Search per-product reorder points and quantities (params: method, days, seed, options)'
             }
         }
     })
@@ -54,16 +311,40 @@ def recommend():
                 "cost_restock": 100
             },
             ...
-        ]
+        ],
+        "catalog_id": "default",  # Optional: registry slot to store the catalog in
+        "parallel": true,  # Optional: shard large catalogs across the process pool
+        "reorder_mode": "normal",  # Optional: deterministic (default) | normal | monte_carlo
+        "service_level": 0.95,  # Optional: target for the normal / monte_carlo modes
+        "samples": 10000,  # Optional: Monte Carlo samples per product
+        "seed": 42  # Optional: Monte Carlo seed
     }
     
+    In the normal and monte_carlo modes products may also carry
+    daily_demand_std, lead_time_days and lead_time_std; reorder points then
+    include safety stock, and every recommendation gains safety_stock,
+    stockout_probability and service_level.
+    
+    Instead of "products", {"binary_catalog": "<id>"} evaluates a catalog
+    uploaded to /binary_catalogs/<id>, straight from its memory mapping
+    (deterministic reorder points only).
+    
     Returns:
     {
         "success": true,
         "count": 3,
         "recommendations": [...]
     }
+    
+    Streaming mode: send the products as NDJSON (one product object per
+    line) with Content-Type application/x-ndjson. Products are evaluated in
+    chunks of ?chunk_size= lines and one recommendation per line is streamed
+    back, followed by a final {"success": ..., "count": ...} line. Streamed
+    catalogs are not kept for /simulate.
     """
+    if wants_ndjson():
+        return stream_recommend()
+    
     try:
         data = request.get_json()
         
@@ -73,6 +354,26 @@ def recommend():
                 'error': 'No JSON data provided'
             }), 400
         
+        reorder_mode = data.get('reorder_mode', 'deterministic')
+        service_level = data.get('service_level', DEFAULT_SERVICE_LEVEL)
+        samples = data.get('samples', DEFAULT_SAMPLES)
+        try:
+            validate_options(reorder_mode, service_level, samples)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        if 'binary_catalog' in data:
+            # The binary format has no demand / lead-time distribution columns
+            if reorder_mode != 'deterministic':
+                return jsonify({
+                    'success': False,
+                    'error': "Binary catalogs only support reorder_mode 'deterministic'"
+                }), 400
+            return recommend_binary(data['binary_catalog'])
+        
         products = data.get('products', [])
         
         if not products:
@@ -83,8 +384,7 @@ def recommend():
         
         # Validate product data
         for i, product in enumerate(products):
-            required_fields = ['name', 'stock', 'demand', 'cost_storage', 'cost_restock']
-            missing_fields = [field for field in required_fields if field not in product]
+            missing_fields = missing_product_fields(product)
             
             if missing_fields:
                 return jsonify({
@@ -92,12 +392,31 @@ def recommend():
                     'error': f'Product {i} missing required fields: {", ".join(missing_fields)}'
                 }), 400
         
-        # Store products for potential simulation later
-        global product_store
-        product_store = copy.deepcopy(products)
+        # Get recommendations (sharded across processes for large opt-in requests)
+        if reorder_mode != 'deterministic':
+            try:
+                recommendations = recommend_with_safety_stock(
+                    products, reorder_mode, service_level, samples,
+                    seed=data.get('seed'), cache=eoq_cache
+                )
+            except (ValueError, TypeError) as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 400
+        elif use_parallel(len(products), data.get('parallel')):
+            recommendations = recommend_sharded(products)
+        else:
+            recommendations = recommend_stock_levels(products, cache=eoq_cache)
         
-        # Get recommendations
-        recommendations = recommend_stock_levels(products)
+        # Keep the catalog for later simulations and delta updates
+        catalog_registry.replace(
+            data.get('catalog_id', DEFAULT_CATALOG_ID), products, recommendations,
+            reorder_options={
+                'mode': reorder_mode, 'service_level': service_level,
+                'samples': samples, 'seed': data.get('seed')
+            } if reorder_mode != 'deterministic' else None
+        )
         
         return jsonify({
             'success': True,
@@ -137,7 +456,10 @@ def simulate():
                 }
             }
         ],
-        "products": [...]  # Optional: provide new products, or use stored ones
+        "products": [...],  # Optional: provide new products, or use stored ones
+        "catalog_id": "default",  # Optional: stored catalog to use without products
+        "binary_catalog": "big",  # Optional: memory-mapped catalog (see /binary_catalogs)
+        "parallel": true  # Optional: shard large catalogs across the process pool
     }
     
     Returns:
@@ -151,7 +473,16 @@ def simulate():
             ...
         ]
     }
+    
+    Streaming mode: send NDJSON with Content-Type application/x-ndjson. The
+    first line holds {"scenarios": [...]}, every following line is one
+    product. Each chunk of products is evaluated against all scenarios and
+    streamed back as one line per (scenario, product) pair, tagged with a
+    "scenario" field, followed by a final {"success": ..., "count": ...} line.
     """
+    if wants_ndjson():
+        return stream_simulate()
+    
     try:
         data = request.get_json()
         
@@ -162,9 +493,14 @@ def simulate():
             }), 400
         
         # Get base products (either from request or stored)
-        base_products = data.get('products', product_store)
+        columns = request_columns(data)
+        if columns is None:
+            return jsonify({
+                'success': False,
+                'error': f"Binary catalog '{data['binary_catalog']}' not found"
+            }), 404
         
-        if not base_products:
+        if not columns['name']:
             return jsonify({
                 'success': False,
                 'error': 'No products available. Please provide products or call /recommend first.'
@@ -180,33 +516,15 @@ def simulate():
         
         results = []
         
-        for scenario in scenarios:
-            scenario_name = scenario.get('name', 'Unnamed Scenario')
-            modifications = scenario.get('modifications', {})
-            
-            # Get multipliers with defaults
-            demand_mult = modifications.get('demand_multiplier', 1.0)
-            storage_mult = modifications.get('cost_storage_multiplier', 1.0)
-            restock_mult = modifications.get('cost_restock_multiplier', 1.0)
-            
-            # Create modified products
-            modified_products = []
-            for product in base_products:
-                modified_product = copy.deepcopy(product)
-                modified_product['demand'] = product['demand'] * demand_mult
-                modified_product['cost_storage'] = product['cost_storage'] * storage_mult
-                modified_product['cost_restock'] = product['cost_restock'] * restock_mult
-                modified_products.append(modified_product)
-            
-            # Get recommendations for this scenario
-            recommendations = recommend_stock_levels(modified_products)
-            
+        parallel = use_parallel(len(columns['name']), data.get('parallel'))
+        
+        for spec, recommendations in simulate_scenarios(columns, parse_scenarios(scenarios), parallel):
             results.append({
-                'name': scenario_name,
+                'name': spec['name'],
                 'modifications': {
-                    'demand_multiplier': demand_mult,
-                    'cost_storage_multiplier': storage_mult,
-                    'cost_restock_multiplier': restock_mult
+                    'demand_multiplier': spec['demand_multiplier'],
+                    'cost_storage_multiplier': spec['cost_storage_multiplier'],
+                    'cost_restock_multiplier': spec['cost_restock_multiplier']
                 },
                 'recommendations': recommendations
             })
@@ -224,83 +542,86 @@ def simulate():
         }), 500
 
 
-@app.route('/health', methods=['GET'])
-def health():
-    """Health check endpoint"""
-    return jsonify({
-        'status': 'healthy',
-        'service': 'Inventory Optimization & Stock Game API'
-    }), 200
-
-
-# ========== GAME ENDPOINTS ==========
-
-@app.route('/start_game', methods=['GET'])
-def start_game():
+@app.route('/sensitivity', methods=['POST'])
+def sensitivity():
     """
-    Start a new stock management game.
+    POST endpoint for the analytic sensitivity of EOQ, total inventory cost
+    and reorder point to each input, per product and catalog-wide.
     
-    Returns:
+    Expected JSON body (same product sources as /simulate):
     {
-        "success": true,
-        "message": "New game started!",
-        "state": { ... game state ... }
+        "products": [...],  # Optional: provide products, or use stored ones
+        "catalog_id": "default",  # Optional: stored catalog to use without products
+        "binary_catalog": "big",  # Optional: memory-mapped catalog
+        "aggregate_only": false  # Optional: skip the per-product results
     }
-    """
-    try:
-        global game_instance
-        
-        # Create new game instance
-        game_instance = StockGame()
-        
-        # Get initial state
-        state = game_instance.get_state()
-        
-        return jsonify({
-            'success': True,
-            'message': f'New game started! Starting budget: ${state["budget"]:.2f}',
-            'state': state
-        }), 200
-        
-    except Exception as e:
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 500
-
-
-@app.route('/next_day', methods=['POST'])
-def next_day():
-    """
-    Advance to the next day in the game.
     
     Returns:
     {
         "success": true,
-        "day_summary": { ... day results ... },
-        "state": { ... updated game state ... }
+        "product_count": 2,
+        "aggregate": {
+            "total_inventory_cost": {
+                "total": 1234.5,
+                "sensitivity": {
+                    "demand": {"multiplier_derivative": 617.25, "elasticity": 0.5},
+                    ...
+                }
+            },
+            ...
+        },
+        "products": [
+            {
+                "name": "Product A",
+                "eoq": 40.0,
+                "total_inventory_cost": 200.0,
+                "reorder_point": 1.92,
+                "derivatives": {"eoq": {"demand": 0.2, ...}, ...},
+                "elasticities": {"eoq": {"demand": 0.5, ...}, ...}
+            },
+            ...
+        ]
     }
+    
+    A multiplier_derivative is the change of the catalog total per unit
+    change of a catalog-wide multiplier on that input (at multiplier 1),
+    i.e. what /simulate would show for small multiplier nudges.
     """
     try:
-        global game_instance
+        data = request.get_json()
         
-        if game_instance is None:
+        if not data:
             return jsonify({
                 'success': False,
-                'error': 'No active game. Please start a new game first using /start_game'
+                'error': 'No JSON data provided'
             }), 400
         
-        # Run the next day
-        day_summary = game_instance.next_day()
+        columns = request_columns(data)
+        if columns is None:
+            return jsonify({
+                'success': False,
+                'error': f"Binary catalog '{data['binary_catalog']}' not found"
+            }), 404
         
-        # Get updated state
-        state = game_instance.get_state()
+        if not columns['name']:
+            return jsonify({
+                'success': False,
+                'error': 'No products available. Please provide products or call /recommend first.'
+            }), 400
         
-        return jsonify({
+        sensitivities = compute_sensitivities(
+            columns['demand'], columns['cost_storage'], columns['cost_restock'], cache=eoq_cache
+        )
+        
+        response = {
             'success': True,
-            'day_summary': day_summary,
-            'state': state
-        }), 200
+            'product_count': len(columns['name']),
+            'aggregate': aggregate_sensitivities(sensitivities)
+        }
+        if not data.get('aggregate_only', False):
+            response['products'] = sensitivity_report(columns['name'], sensitivities)
+        
+        return jsonify(response), 200
         
     except Exception as e:
         return jsonify({
@@ -309,78 +630,211 @@ def next_day():
         }), 500
 
 
-@app.route('/restock', methods=['POST'])
-def restock():
+def stream_recommend():
+    """Streaming (NDJSON) implementation of /recommend."""
+    try:
+        chunk_size = parse_chunk_size(request.args.get('chunk_size'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    def generate():
+        count = 0
+        try:
+            for chunk in iter_chunks(iter_ndjson(request.stream), chunk_size):
+                error = invalid_chunk_line(chunk)
+                if error:
+                    yield dump_line({'success': False, 'count': count, 'error': error})
+                    return
+                
+                recommendations = recommend_stock_levels(
+                    [product for _, product in chunk], cache=eoq_cache
+                )
+                count += len(recommendations)
+                yield ''.join(dump_line(r) for r in recommendations)
+            
+            if count == 0:
+                yield dump_line({'success': False, 'count': 0, 'error': 'No products provided in request'})
+            else:
+                yield dump_line({'success': True, 'count': count})
+        except Exception as e:
+            yield dump_line({'success': False, 'count': count, 'error': str(e)})
+    
+    return ndjson_response(generate())
+
+
+def stream_simulate():
+    """Streaming (NDJSON) implementation of /simulate."""
+    try:
+        chunk_size = parse_chunk_size(request.args.get('chunk_size'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    def generate():
+        count = 0
+        try:
+            lines = iter_ndjson(request.stream)
+            header = next(lines, (0, {}))[1]
+            scenario_specs = parse_scenarios(header.get('scenarios', []))
+            if not scenario_specs:
+                yield dump_line({
+                    'success': False,
+                    'count': 0,
+                    'error': 'No scenarios provided (the first line must be {"scenarios": [...]})'
+                })
+                return
+            
+            for chunk in iter_chunks(lines, chunk_size):
+                error = invalid_chunk_line(chunk)
+                if error:
+                    yield dump_line({'success': False, 'count': count, 'error': error})
+                    return
+                
+                columns = product_columns([product for _, product in chunk])
+                for spec, recommendations in simulate_scenarios(columns, scenario_specs):
+                    count += len(recommendations)
+                    yield ''.join(
+                        dump_line(dict(recommendation, scenario=spec['name']))
+                        for recommendation in recommendations
+                    )
+            
+            if count == 0:
+                yield dump_line({'success': False, 'count': 0, 'error': 'No products provided in request'})
+            else:
+                yield dump_line({'success': True, 'count': count})
+        except Exception as e:
+            yield dump_line({'success': False, 'count': count, 'error': str(e)})
+    
+    return ndjson_response(generate())
+
+
+@app.route('/cache_stats', methods=['GET', 'DELETE'])
+def cache_stats():
     """
-    Restock a product.
+    Inspect (GET) or clear (DELETE) the shared EOQ/cost cache.
     
-    Expected JSON body:
+    Returns:
     {
-        "product": "Widget A",
-        "quantity": 50
+        "success": true,
+        "cache": {
+            "size": 120, "maxsize": 100000,
+            "hits": 950, "misses": 120, "evictions": 0,
+            "hit_rate": 0.8879
+        }
     }
+    """
+    if request.method == 'DELETE':
+        eoq_cache.clear()
     
-    Returns:
+    return jsonify({
+        'success': True,
+        'cache': eoq_cache.stats()
+    }), 200
+
+
+@app.route('/catalogs', methods=['GET'])
+def list_catalogs():
+    """List stored catalogs with their product counts and versions."""
+    return jsonify({
+        'success': True,
+        'catalogs': catalog_registry.list()
+    }), 200
+
+
+@app.route('/catalogs/<catalog_id>', methods=['GET', 'PUT', 'PATCH', 'DELETE'])
+def catalog(catalog_id):
+    """
+    Manage one stored catalog.
+    
+    GET: last computed recommendations, optionally ?skus=A,B for a subset
+    PUT: replace the whole catalog, body {"products": [...]}
+    PATCH: delta update, body
     {
-        "success": true,
-        "restock_result": { ... restock details ... },
-        "state": { ... updated game state ... }
+        "upsert": [{"sku": "A", "stock": 40}, ...],  # full or partial products
+        "delete": ["B", ...]
     }
+    Only upserted SKUs are recomputed; the response carries just those.
+    DELETE: drop the catalog
+    
+    Products are identified by their "sku" field, falling back to "name".
     """
     try:
-        global game_instance
-        
-        if game_instance is None:
-            return jsonify({
-                'success': False,
-                'error': 'No active game. Please start a new game first using /start_game'
-            }), 400
-        
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({
-                'success': False,
-                'error': 'No JSON data provided'
-            }), 400
-        
-        product_name = data.get('product')
-        quantity = data.get('quantity')
+        if request.method == 'PUT':
+            data = request.get_json()
+            products = (data or {}).get('products', [])
+            
+            if not products:
+                return jsonify({
+                    'success': False,
+                    'error': 'No products provided in request'
+                }), 400
+            
+            for i, product in enumerate(products):
+                missing_fields = missing_product_fields(product)
+                if missing_fields:
+                    return jsonify({
+                        'success': False,
+                        'error': f'Product {i} missing required fields: {", ".join(missing_fields)}'
+                    }), 400
+            
+            stored = catalog_registry.replace(catalog_id, products)
+            return jsonify(dict(stored.summary(), success=True)), 200
         
-        if not product_name:
-            return jsonify({
-                'success': False,
-                'error': 'Missing required parameter: product'
-            }), 400
+        if request.method == 'PATCH':
+            data = request.get_json()
+            
+            if not data:
+                return jsonify({
+                    'success': False,
+                    'error': 'No JSON data provided'
+                }), 400
+            
+            upsert = data.get('upsert', [])
+            delete = data.get('delete', [])
+            if not isinstance(upsert, list) or not all(isinstance(product, dict) for product in upsert):
+                return jsonify({
+                    'success': False,
+                    'error': 'upsert must be a list of product objects'
+                }), 400
+            if not isinstance(delete, list) or not all(isinstance(sku, str) for sku in delete):
+                return jsonify({
+                    'success': False,
+                    'error': 'delete must be a list of SKU strings'
+                }), 400
+            
+            try:
+                delta = catalog_registry.apply_delta(catalog_id, upsert=upsert, delete=delete)
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 400
+            
+            return jsonify(dict(delta, success=True)), 200
         
-        if quantity is None:
-            return jsonify({
-                'success': False,
-                'error': 'Missing required parameter: quantity'
-            }), 400
+        if request.method == 'DELETE':
+            if not catalog_registry.delete(catalog_id):
+                return jsonify({
+                    'success': False,
+                    'error': f"Catalog '{catalog_id}' not found"
+                }), 404
+            return jsonify({'success': True, 'catalog_id': catalog_id}), 200
         
-        try:
-            quantity = int(quantity)
-        except (ValueError, TypeError):
+        stored = catalog_registry.get(catalog_id)
+        if stored is None:
             return jsonify({
                 'success': False,
-                'error': 'Quantity must be a valid number'
-            }), 400
-        
-        # Perform restock
-        restock_result = game_instance.restock(product_name, quantity)
+                'error': f"Catalog '{catalog_id}' not found"
+            }), 404
         
-        if not restock_result['success']:
-            return jsonify(restock_result), 400
+        skus = request.args.get('skus')
+        recommendations = stored.recommendation_list(skus.split(',') if skus else None)
         
-        # Get updated state
-        state = game_instance.get_state()
-        
-        return jsonify({
-            'success': True,
-            'restock_result': restock_result,
-            'state': state
-        }), 200
+        return jsonify(dict(
+            stored.summary(),
+            success=True,
+            count=len(recommendations),
+            recommendations=recommendations
+        )), 200
         
     except Exception as e:
         return jsonify({
@@ -389,32 +843,844 @@ def restock():
         }), 500
 
 
-@app.route('/get_state', methods=['GET'])
-def get_state():
-    """
-    Get current game state.
+def recommend_binary(catalog_id):
+    """/recommend for a memory-mapped binary catalog."""
+    try:
+        mapped = binary_catalogs.open(catalog_id)
+    except CatalogFormatError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    if mapped is None:
+        return jsonify({
+            'success': False,
+            'error': f"Binary catalog '{catalog_id}' not found"
+        }), 404
+    
+    results = evaluate_stock_levels(
+        mapped.stock, mapped.demand, mapped.cost_storage, mapped.cost_restock,
+        cache=eoq_cache
+    )
+    recommendations = build_recommendations(
+        mapped.names,
+        mapped.echo_values('stock'),
+        mapped.echo_values('demand'),
+        mapped.cost_storage.tolist(),
+        results
+    )
+    
+    return jsonify({
+        'success': True,
+        'count': len(recommendations),
+        'recommendations': recommendations
+    }), 200
+
+
+@app.route('/binary_catalogs/<catalog_id>', methods=['GET', 'PUT', 'DELETE'])
+def binary_catalog(catalog_id):
+    """
+    Manage a binary catalog stored on local disk.
+    
+    PUT: upload either the binary format itself
+         (Content-Type: application/octet-stream, see catalog_format.py)
+         or JSON {"products": [...]}, which is converted once
+    GET: product count and file size
+    DELETE: remove the catalog
+    
+    Stored catalogs are memory-mapped by /recommend and /simulate
+    ({"binary_catalog": "<catalog_id>"}), skipping JSON parsing entirely.
+    """
+    try:
+        if request.method == 'PUT':
+            if request.mimetype == BINARY_MIMETYPE:
+                data = request.get_data()
+            else:
+                body = request.get_json()
+                products = (body or {}).get('products', [])
+                
+                if not products:
+                    return jsonify({
+                        'success': False,
+                        'error': 'No products provided in request'
+                    }), 400
+                
+                for i, product in enumerate(products):
+                    missing_fields = missing_product_fields(product)
+                    if missing_fields:
+                        return jsonify({
+                            'success': False,
+                            'error': f'Product {i} missing required fields: {", ".join(missing_fields)}'
+                        }), 400
+                
+                data = encode_catalog(product_columns(products))
+            
+            info = binary_catalogs.save(catalog_id, data)
+            return jsonify(dict(info, success=True, catalog_id=catalog_id)), 200
+        
+        if request.method == 'DELETE':
+            if not binary_catalogs.delete(catalog_id):
+                return jsonify({
+                    'success': False,
+                    'error': f"Binary catalog '{catalog_id}' not found"
+                }), 404
+            return jsonify({'success': True, 'catalog_id': catalog_id}), 200
+        
+        mapped = binary_catalogs.open(catalog_id)
+        if mapped is None:
+            return jsonify({
+                'success': False,
+                'error': f"Binary catalog '{catalog_id}' not found"
+            }), 404
+        
+        return jsonify(dict(mapped.info(), success=True, catalog_id=catalog_id)), 200
+        
+    except CatalogFormatError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/health', methods=['GET'])
+def health():
+    """Health check endpoint"""
+    return jsonify({
+        'status': 'healthy',
+        'service': 'Inventory Optimization & Stock Game API'
+    }), 200
+
+
+@app.route('/sessions', methods=['GET'])
+def sessions():
+    """
+    Game session metrics.
+    
+    Query parameters:
+        memory: "1" to include estimated memory per session (walks every game)
+        list: "1" to include the live sessions, least recently used first
+              (by session_hash, never by session ID)
+    
+    Returns:
+    {
+        "success": true,
+        "metrics": {
+            "live_sessions": 12,
+            "max_sessions": 10000,
+            "ttl_seconds": 3600,
+            "created": 40,
+            "expired": 27,
+            "evicted": 1,
+            "memory": { "total_bytes": ..., "mean_bytes_per_session": ..., "max_bytes_per_session": ... }
+        }
+    }
+    """
+    try:
+        response = {
+            'success': True,
+            'metrics': game_sessions.metrics(include_memory=request.args.get('memory') in ('1', 'true'))
+        }
+        if request.args.get('list') in ('1', 'true'):
+            response['sessions'] = game_sessions.list()
+        if game_store is not None:
+            response['store'] = game_store.metrics()
+        response['events'] = game_events.metrics()
+        return jsonify(response), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/end_game', methods=['POST'])
+def end_game():
+    """
+    End the caller's game session and free its memory.
+    
+    Returns:
+    {
+        "success": true
+    }
+    """
+    try:
+        session_id = request_session_id()
+        if game_store is not None:
+            game_store.forget(session_id)
+        game_events.close(session_id)
+        
+        if not game_sessions.delete(session_id):
+            return jsonify({
+                'success': False,
+                'error': 'No active game for this session'
+            }), 404
+        
+        return jsonify({'success': True}), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+# ========== GAME ENDPOINTS ==========
+
+@app.route('/start_game', methods=['GET'])
+def start_game():
+    """
+    Start a new stock management game.
+    
+    Query parameters:
+        engine: "classic" (default) or "array" (struct-of-arrays core for
+            large stores and long simulations; same game, same API)
+        new_session: "1" to start in a freshly generated session
+        seed: Integer seed of the game's random generator (random if
+            omitted); the same seed and actions replay the same game
+    
+    The game belongs to the session named by the X-Session-ID header (or
+    session_id query parameter); without one, the shared "default"
+    session is used. Send the returned session_id with every later game
+    request.
+    
+    Returns:
+    {
+        "success": true,
+        "message": "New game started!",
+        "session_id": "3f2a...",
+        "seed": 1234567,
+        "state": { ... game state ... }
+    }
+    """
+    try:
+        if request.args.get('new_session') in ('1', 'true'):
+            session_id = None
+        else:
+            session_id = request_session_id()
+            if not valid_session_id(session_id):
+                return jsonify({
+                    'success': False,
+                    'error': 'Session IDs are 1-64 letters, digits, "_" or "-"'
+                }), 400
+        
+        engine = request.args.get('engine', DEFAULT_GAME_ENGINE)
+        if engine not in GAME_ENGINES:
+            return jsonify({
+                'success': False,
+                'error': f"engine must be one of: {', '.join(GAME_ENGINES)}"
+            }), 400
+        
+        seed = request.args.get('seed')
+        if seed is not None:
+            try:
+                seed = int(seed)
+            except ValueError:
+                return jsonify({
+                    'success': False,
+                    'error': 'seed must be an integer'
+                }), 400
+        
+        # Create new game instance
+        game_class = GAME_ENGINES[engine]
+        session = game_sessions.create(lambda: game_class(seed=seed), session_id)
+        
+        with session.lock:
+            game_changed(session)
+            # Get initial state
+            state = session.game.get_state()
+            seed = session.game.seed
+        
+        response = jsonify({
+            'success': True,
+            'message': f'New game started! Starting budget: ${state["budget"]:.2f}',
+            'session_id': session.session_id,
+            'seed': seed,
+            'state': state
+        })
+        response.headers[SESSION_HEADER] = session.session_id
+        return response, 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/action_log', methods=['GET'])
+def action_log():
+    """
+    Seed and action log of the current game, enough to replay it.
+    
+    Returns:
+    {
+        "success": true,
+        "engine": "classic",
+        "seed": 1234567,
+        "day": 12,
+        "actions": [[1, "advance", {"days": 3, "report_level": "full"}],
+                    [4, "restock", {"product": "Widget A", "quantity": 50}], ...]
+    }
+    """
+    try:
+        session = current_session()
+        
+        if session is None:
+            return jsonify({
+                'success': False,
+                'error': 'No active game. Please start a new game first using /start_game'
+            }), 400
+        
+        with session.lock:
+            game_instance = session.game
+            engine = next(
+                (name for name, cls in GAME_ENGINES.items() if type(game_instance) is cls),
+                DEFAULT_GAME_ENGINE
+            )
+            return jsonify({
+                'success': True,
+                'engine': engine,
+                'seed': game_instance.seed,
+                'day': game_instance.day,
+                'actions': list(game_instance.action_log)
+            }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/replay', methods=['POST'])
+def replay():
+    """
+    Start a game in the current session by replaying a seed and action log.
+    
+    Expected JSON body (as returned by /action_log):
+    {
+        "seed": 1234567,
+        "actions": [[1, "advance", {"days": 3, "report_level": "full"}], ...],
+        "until_day": 10,  # Optional: stop on this day (default: replay everything)
+        "engine": "classic"  # Optional
+    }
+    
+    Returns:
+    {
+        "success": true,
+        "session_id": "3f2a...",
+        "state": { ... game state at that point ... }
+    }
+    """
+    try:
+        session_id = request_session_id()
+        if not valid_session_id(session_id):
+            return jsonify({
+                'success': False,
+                'error': 'Session IDs are 1-64 letters, digits, "_" or "-"'
+            }), 400
+        
+        data = request.get_json(silent=True) or {}
+        seed = data.get('seed')
+        actions = data.get('actions', [])
+        until_day = data.get('until_day')
+        engine = data.get('engine', DEFAULT_GAME_ENGINE)
+        
+        if not isinstance(seed, int) or isinstance(seed, bool):
+            return jsonify({
+                'success': False,
+                'error': 'seed must be an integer'
+            }), 400
+        
+        if not isinstance(actions, list):
+            return jsonify({
+                'success': False,
+                'error': 'actions must be a list'
+            }), 400
+        
+        if until_day is not None and (not isinstance(until_day, int) or isinstance(until_day, bool)):
+            return jsonify({
+                'success': False,
+                'error': 'until_day must be an integer'
+            }), 400
+        
+        if engine not in GAME_ENGINES:
+            return jsonify({
+                'success': False,
+                'error': f"engine must be one of: {', '.join(GAME_ENGINES)}"
+            }), 400
+        
+        game_class = GAME_ENGINES[engine]
+        try:
+            session = game_sessions.create(
+                lambda: game_class.replay(seed, actions, until_day, max_days=MAX_REPLAY_DAYS),
+                session_id
+            )
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        with session.lock:
+            game_changed(session)
+            state = session.game.get_state()
+        
+        response = jsonify({
+            'success': True,
+            'session_id': session.session_id,
+            'state': state
+        })
+        response.headers[SESSION_HEADER] = session.session_id
+        return response, 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/next_day', methods=['POST'])
+def next_day():
+    """
+    Advance to the next day in the game.
+    
+    Returns:
+    {
+        "success": true,
+        "day_summary": { ... day results ... },
+        "state": { ... updated game state ... }
+    }
+    """
+    try:
+        session = current_session()
+        
+        if session is None:
+            return jsonify({
+                'success': False,
+                'error': 'No active game. Please start a new game first using /start_game'
+            }), 400
+        
+        with session.lock:
+            game_instance = session.game
+            
+            # Run the next day
+            day_summary = game_instance.next_day()
+            game_changed(session, 'day', day_summary)
+            
+            # Get updated state
+            state = request_state(game_instance)
+            
+            return jsonify({
+                'success': True,
+                'day_summary': day_summary,
+                'state': state
+            }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/advance', methods=['POST'])
+def advance():
+    """
+    Advance the game by several days in one call.
+    
+    Expected JSON body:
+    {
+        "days": 30,
+        "report_level": "summary",  # "none", "summary" (default) or "full"
+        "include_state": false  # Optional: also return the full game state
+    }
+    
+    Returns:
+    {
+        "success": true,
+        "result": {
+            "days_advanced": 30,
+            "start_day": 1,
+            "end_day": 31,
+            "budget": 512.3,
+            "totals": { ... revenue, storage_cost, units_sold, stockouts ... },
+            "reports": [ ... one per day, unless report_level is "none" ... ]
+        }
+    }
+    """
+    try:
+        session = current_session()
+        
+        if session is None:
+            return jsonify({
+                'success': False,
+                'error': 'No active game. Please start a new game first using /start_game'
+            }), 400
+        
+        with session.lock:
+            game_instance = session.game
+            
+            data = request.get_json(silent=True) or {}
+            days = data.get('days', 1)
+            
+            if not isinstance(days, int) or isinstance(days, bool) or not 1 <= days <= MAX_ADVANCE_DAYS:
+                return jsonify({
+                    'success': False,
+                    'error': f'days must be an integer between 1 and {MAX_ADVANCE_DAYS}'
+                }), 400
+            
+            report_level = data.get('report_level', 'summary')
+            if report_level not in REPORT_LEVELS:
+                return jsonify({
+                    'success': False,
+                    'error': f"report_level must be one of: {', '.join(REPORT_LEVELS)}"
+                }), 400
+            
+            response = {
+                'success': True,
+                'result': game_instance.advance(days, report_level)
+            }
+            game_changed(session, 'advance', {
+                key: value for key, value in response['result'].items() if key != 'reports'
+            })
+            if data.get('include_state', False):
+                response['state'] = request_state(game_instance)
+            
+            return jsonify(response), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/batch', methods=['POST'])
+def batch():
+    """
+    Apply an ordered list of game actions atomically, in one round trip.
+    
+    Expected JSON body:
+    {
+        "actions": [
+            {"type": "restock", "product": "Widget A", "quantity": 50},
+            {"type": "unlock_item", "item_name": "Pen Pack"},
+            {"type": "next_day"},
+            {"type": "advance", "days": 7, "report_level": "none"}
+        ]
+    }
+    
+    Either every action is applied or, if one fails (or raises), none is:
+    the game is rolled back to where it was before the batch and its
+    version does not change.
+    
+    Returns:
+    {
+        "success": true,
+        "results": [ ... one result per action ... ],
+        "state": { ... game state after the last action ... }
+    }
+    
+    On failure (400):
+    {
+        "success": false,
+        "failed_action": 1,
+        "error": "..."
+    }
+    """
+    try:
+        session = current_session()
+        
+        if session is None:
+            return jsonify({
+                'success': False,
+                'error': 'No active game. Please start a new game first using /start_game'
+            }), 400
+        
+        data = request.get_json(silent=True) or {}
+        actions = data.get('actions')
+        
+        if not isinstance(actions, list) or not actions:
+            return jsonify({
+                'success': False,
+                'error': 'actions must be a non-empty list'
+            }), 400
+        
+        if len(actions) > MAX_BATCH_ACTIONS:
+            return jsonify({
+                'success': False,
+                'error': f'At most {MAX_BATCH_ACTIONS} actions per batch'
+            }), 400
+        
+        if not all(isinstance(action, dict) for action in actions):
+            return jsonify({
+                'success': False,
+                'error': 'Every action must be an object'
+            }), 400
+        
+        advance_days = 0
+        for index, action in enumerate(actions):
+            if action.get('type') != 'advance':
+                continue
+            days = action.get('days', 1)
+            # Checked up front: a later negative count must not offset an earlier one
+            if isinstance(days, bool) or not isinstance(days, int) or days < 1:
+                return jsonify({
+                    'success': False,
+                    'failed_action': index,
+                    'error': 'days must be a positive integer'
+                }), 400
+            advance_days += days
+        if advance_days > MAX_ADVANCE_DAYS:
+            return jsonify({
+                'success': False,
+                'error': f'A batch may advance at most {MAX_ADVANCE_DAYS} days'
+            }), 400
+        
+        with session.lock:
+            game_instance = session.game
+            # Products of the array engine point back at their game, so roll
+            # back by swapping in the copy rather than copying state back.
+            # Batches that simulate no day leave the history alone.
+            snapshot = game_instance.checkpoint(
+                include_history=any(action.get('type') in DAY_ACTIONS for action in actions)
+            )
+            
+            results = []
+            for index, action in enumerate(actions):
+                try:
+                    result = game_instance.apply_action(action)
+                except Exception:
+                    session.game = snapshot
+                    raise
+                if not result.get('success', False):
+                    session.game = snapshot
+                    return jsonify({
+                        'success': False,
+                        'failed_action': index,
+                        'error': result.get('error', 'Action failed')
+                    }), 400
+                results.append(result)
+            game_changed(session, 'batch', {'actions': [action.get('type') for action in actions]})
+            
+            return jsonify({
+                'success': True,
+                'results': results,
+                'state': request_state(game_instance)
+            }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/restock', methods=['POST'])
+def restock():
+    """
+    Restock a product.
+    
+    Expected JSON body:
+    {
+        "product": "Widget A",
+        "quantity": 50
+    }
+    
+    Returns:
+    {
+        "success": true,
+        "restock_result": { ... restock details ... },
+        "state": { ... updated game state ... }
+    }
+    """
+    try:
+        session = current_session()
+        
+        if session is None:
+            return jsonify({
+                'success': False,
+                'error': 'No active game. Please start a new game first using /start_game'
+            }), 400
+        
+        with session.lock:
+            game_instance = session.game
+            
+            data = request.get_json()
+            
+            if not data:
+                return jsonify({
+                    'success': False,
+                    'error': 'No JSON data provided'
+                }), 400
+            
+            product_name = data.get('product')
+            quantity = data.get('quantity')
+            
+            if not product_name:
+                return jsonify({
+                    'success': False,
+                    'error': 'Missing required parameter: product'
+                }), 400
+            
+            if quantity is None:
+                return jsonify({
+                    'success': False,
+                    'error': 'Missing required parameter: quantity'
+                }), 400
+            
+            try:
+                quantity = int(quantity)
+            except (ValueError, TypeError):
+                return jsonify({
+                    'success': False,
+                    'error': 'Quantity must be a valid number'
+                }), 400
+            
+            # Perform restock
+            restock_result = game_instance.restock(product_name, quantity)
+            
+            if not restock_result['success']:
+                return jsonify(restock_result), 400
+            game_changed(session, 'restock', restock_result)
+            
+            # Get updated state
+            state = request_state(game_instance)
+            
+            return jsonify({
+                'success': True,
+                'restock_result': restock_result,
+                'state': state
+            }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/get_state', methods=['GET'])
+def get_state():
+    """
+    Get current game state.
+    
+    Query parameters (optional):
+        since_version: State version the client already holds; only the
+            sections changed since then and the new history points are
+            returned (also accepted by /next_day, /advance, /restock and
+            /unlock_item)
+        game_id: The game that version belongs to; a full state is
+            returned if the session has started a different game since
+    
+    The response carries an ETag; a request whose If-None-Match matches
+    the current state gets 304 Not Modified with no body.
     
     Returns:
     {
         "success": true,
-        "state": { ... current game state ... }
+        "state": { ... current game state, with game_id and version ... }
     }
     """
     try:
-        global game_instance
+        session = current_session()
         
-        if game_instance is None:
+        if session is None:
             return jsonify({
                 'success': False,
                 'error': 'No active game. Please start a new game first using /start_game',
                 'state': None
             }), 400
         
-        state = game_instance.get_state()
+        with session.lock:
+            game_instance = session.game
+            
+            etag = state_etag(game_instance)
+            if etag in request.if_none_match:
+                not_modified = Response(status=304)
+                not_modified.set_etag(etag)
+                return not_modified
+            
+            state = request_state(game_instance)
         
-        return jsonify({
+        response = jsonify({
             'success': True,
             'state': state
+        })
+        response.set_etag(etag)
+        return response, 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/history', methods=['GET'])
+def history():
+    """
+    Chart history of the current game, optionally downsampled.
+    
+    Query parameters (all optional):
+        start_day, end_day: Inclusive day range (default: all retained days)
+        products: Comma-separated product names (default: all products)
+        max_points: Downsample each series to at most this many points
+            with LTTB (2 to MAX_HISTORY_POINTS)
+    
+    Returns:
+    {
+        "success": true,
+        "history": {
+            "retained_days": [first_day, last_day],
+            "budget": {"days": [...], "values": [...]},
+            "stock": {"Office Chair": {"days": [...], "values": [...]}, ...}
+        }
+    }
+    """
+    try:
+        session = current_session()
+        
+        if session is None:
+            return jsonify({
+                'success': False,
+                'error': 'No active game. Please start a new game first using /start_game'
+            }), 400
+        
+        start_day = request.args.get('start_day', type=int)
+        end_day = request.args.get('end_day', type=int)
+        max_points = request.args.get('max_points', type=int)
+        products = request.args.get('products')
+        
+        if max_points is not None and not 2 <= max_points <= MAX_HISTORY_POINTS:
+            return jsonify({
+                'success': False,
+                'error': f'max_points must be between 2 and {MAX_HISTORY_POINTS}'
+            }), 400
+        
+        with session.lock:
+            try:
+                result = session.game.query_history(
+                    start_day=start_day,
+                    end_day=end_day,
+                    products=[name.strip() for name in products.split(',')] if products else None,
+                    max_points=max_points
+                )
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 400
+        
+        return jsonify({
+            'success': True,
+            'history': result
         }), 200
         
     except Exception as e:
@@ -442,44 +1708,127 @@ def unlock_item():
     }
     """
     try:
-        global game_instance
+        session = current_session()
         
-        if game_instance is None:
+        if session is None:
             return jsonify({
                 'success': False,
                 'error': 'No active game. Please start a new game first using /start_game'
             }), 400
         
-        data = request.get_json()
-        
-        if not data:
+        with session.lock:
+            game_instance = session.game
+            
+            data = request.get_json()
+            
+            if not data:
+                return jsonify({
+                    'success': False,
+                    'error': 'No JSON data provided'
+                }), 400
+            
+            item_name = data.get('item_name')
+            
+            if not item_name:
+                return jsonify({
+                    'success': False,
+                    'error': 'Missing required parameter: item_name'
+                }), 400
+            
+            # Perform unlock
+            unlock_result = game_instance.unlock_item(item_name)
+            
+            if not unlock_result['success']:
+                return jsonify(unlock_result), 400
+            game_changed(session, 'unlock', unlock_result)
+            
+            # Get updated state
+            state = request_state(game_instance)
+            
             return jsonify({
-                'success': False,
-                'error': 'No JSON data provided'
-            }), 400
+                'success': True,
+                'unlock_result': unlock_result,
+                'state': state
+            }), 200
         
-        item_name = data.get('item_name')
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/events', methods=['GET'])
+def events():
+    """
+    Server-Sent Events stream of the current session's game.
+    
+    EventSource cannot send headers, so pass the session as
+    ?session_id=. The stream starts with a full "state" message, then
+    carries, as they happen:
+        day: the next_day() report (with its alerts)
+        advance: /advance totals (without per-day reports)
+        restock, unlock, batch: action results
+        state: only the sections and history points changed since the
+            previous state message (see /get_state?since_version=)
+        end: the session ended; the stream closes
+    
+    Reconnecting clients send Last-Event-ID (EventSource does this
+    automatically) and get the messages they missed, or a fresh full
+    state if those are gone.
+    """
+    try:
+        session = current_session()
         
-        if not item_name:
+        if session is None:
             return jsonify({
                 'success': False,
-                'error': 'Missing required parameter: item_name'
+                'error': 'No active game. Please start a new game first using /start_game'
             }), 400
         
-        # Perform unlock
-        unlock_result = game_instance.unlock_item(item_name)
+        session_id = session.session_id
+        try:
+            last_event_id = int(request.headers.get('Last-Event-ID', ''))
+        except ValueError:
+            last_event_id = None
         
-        if not unlock_result['success']:
-            return jsonify(unlock_result), 400
+        with session.lock:
+            try:
+                subscriber, initial = game_events.subscribe(session_id, session.game, last_event_id)
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 429
         
-        # Get updated state
-        state = game_instance.get_state()
+        def generate():
+            try:
+                for message in initial:
+                    yield message
+                while True:
+                    try:
+                        message = subscriber.queue.get(timeout=EVENTS_KEEPALIVE)
+                    except queue.Empty:
+                        yield ': keepalive\n\n'
+                        continue
+                    if message is CLOSED:
+                        break
+                    if message is RESYNC:
+                        # The session may have been replaced (/start_game, /replay)
+                        # or ended since the stream started
+                        current = game_sessions.get(session_id)
+                        if current is None:
+                            break
+                        with current.lock:
+                            message = game_events.resync_message(session_id, subscriber, current.game)
+                    yield message
+            finally:
+                game_events.unsubscribe(session_id, subscriber)
         
-        return jsonify({
-            'success': True,
-            'unlock_result': unlock_result,
-            'state': state
-        }), 200
+        return Response(generate(), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
         
     except Exception as e:
         return jsonify({
@@ -500,20 +1849,23 @@ def get_daily_report():
     }
     """
     try:
-        global game_instance
+        session = current_session()
         
-        if game_instance is None:
+        if session is None:
             return jsonify({
                 'success': False,
                 'error': 'No active game. Please start a new game first using /start_game'
             }), 400
         
-        report = game_instance.get_daily_report()
-        
-        return jsonify({
-            'success': True,
-            'report': report
-        }), 200
+        with session.lock:
+            game_instance = session.game
+            
+            report = game_instance.get_daily_report()
+            
+            return jsonify({
+                'success': True,
+                'report': report
+            }), 200
         
     except Exception as e:
         return jsonify({
@@ -541,36 +1893,253 @@ def apply_multipliers():
     }
     """
     try:
-        global game_instance
+        session = current_session()
         
-        if game_instance is None:
+        if session is None:
             return jsonify({
                 'success': False,
                 'error': 'No active game. Please start a new game first using /start_game'
             }), 400
         
-        data = request.get_json()
+        with session.lock:
+            game_instance = session.game
+            
+            data = request.get_json()
+            
+            if not data:
+                return jsonify({
+                    'success': False,
+                    'error': 'No JSON data provided'
+                }), 400
+            
+            demand_factor = data.get('demand_factor', 1.0)
+            storage_factor = data.get('storage_factor', 1.0)
+            restock_factor = data.get('restock_factor', 1.0)
+            
+            # Get preview
+            preview = game_instance.apply_multipliers(
+                demand_factor=demand_factor,
+                storage_factor=storage_factor,
+                restock_factor=restock_factor
+            )
+            
+            return jsonify({
+                'success': True,
+                'preview': preview
+            }), 200
         
-        if not data:
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/evaluate_policy', methods=['POST'])
+def evaluate_policy():
+    """
+    Score a restocking policy over many seeded, simulated games.
+    
+    Expected JSON body:
+    {
+        "policy": {  # Optional: defaults to the demo auto-restock rule
+            "reorder_days": 3,  # Reorder at or below this many days of demand
+            "max_stock": 10,  # ...and below this many units (null = no limit)
+            "quantity": "eoq",  # "eoq" or a fixed number of units
+            "order_factor": 1.0  # EOQ multiplier
+        },
+        "episodes": 1000,
+        "days": 365,
+        "seed": 0,
+        "engine": "classic",  # Optional: one of POLICY_ENGINES
+        "parallel": true  # Optional: shard episodes across the process pool
+    }
+    
+    Returns:
+    {
+        "success": true,
+        "evaluation": {
+            "simulated_days": 365000,
+            "metrics": {
+                "final_budget": {"mean": ..., "std": ..., "min": ..., "max": ...,
+                                 "percentiles": {"p5": ..., ...}, "ci95": [lo, hi]},
+                "profit": {...}, "roi": {...}, "stockouts": {...}
+            },
+            ...
+        }
+    }
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        episodes = data.get('episodes', 1000)
+        days = data.get('days', 365)
+        seed = data.get('seed', 0)
+        for name, value in (('episodes', episodes), ('days', days), ('seed', seed)):
+            if not isinstance(value, int) or isinstance(value, bool):
+                return jsonify({
+                    'success': False,
+                    'error': f'{name} must be an integer'
+                }), 400
+        
+        if not 1 <= episodes <= MAX_POLICY_EPISODES:
             return jsonify({
                 'success': False,
-                'error': 'No JSON data provided'
+                'error': f'episodes must be between 1 and {MAX_POLICY_EPISODES}'
+            }), 400
+        
+        if episodes * days > MAX_POLICY_DAYS:
+            return jsonify({
+                'success': False,
+                'error': f'episodes x days must be at most {MAX_POLICY_DAYS}'
             }), 400
         
-        demand_factor = data.get('demand_factor', 1.0)
-        storage_factor = data.get('storage_factor', 1.0)
-        restock_factor = data.get('restock_factor', 1.0)
+        policy_spec = data.get('policy') or {}
+        if not isinstance(policy_spec, dict):
+            return jsonify({
+                'success': False,
+                'error': 'policy must be an object'
+            }), 400
         
-        # Get preview
-        preview = game_instance.apply_multipliers(
-            demand_factor=demand_factor,
-            storage_factor=storage_factor,
-            restock_factor=restock_factor
-        )
+        engine = data.get('engine', 'classic')
+        if engine not in POLICY_ENGINES:
+            return jsonify({
+                'success': False,
+                'error': f"engine must be one of: {', '.join(POLICY_ENGINES)}"
+            }), 400
+        
+        parallel = data.get('parallel')
+        try:
+            policy = RestockPolicy.from_dict(policy_spec)
+            evaluation = run_policy_evaluation(
+                policy, episodes=episodes, days=days, seed=seed,
+                engine=engine, parallel=None if parallel is None else bool(parallel)
+            )
+        except (ValueError, TypeError) as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'evaluation': evaluation
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/optimize_policy', methods=['POST'])
+def optimize_policy():
+    """
+    Search per-product (reorder point, order quantity) pairs maximizing an
+    expected game result, on seeded simulated games.
+    
+    Expected JSON body:
+    {
+        "method": "cross_entropy",  # Optional: "cross_entropy", "successive_halving" or "grid"
+        "days": 365,
+        "seed": 0,
+        "engine": "classic",  # Optional: one of POLICY_ENGINES
+        "objective": "profit",  # Optional: "profit", "final_budget" or "roi"
+        "reorder_days": [0.5, 1, 2, 3, 4],  # Optional: candidate reorder points (days of demand)
+        "order_factors": [0.5, 1, 1.5, 2, 3],  # Optional: candidate quantities (x EOQ)
+        "options": {"iterations": 10, "samples": 32, "episodes": 32},  # Optional: method arguments
+        "parallel": true  # Optional: shard rollouts across the process pool
+    }
+    
+    Returns:
+    {
+        "success": true,
+        "search": {
+            "best": {"policy": {...}, "selection": {...}, "validation": {...}},
+            "baseline": {...},
+            "improvement": {"mean": ..., "ci95": [lo, hi], ...},
+            "rounds": [...],
+            "simulated_days": ...
+        },
+        "cache": {"policies": ..., "episodes_reused": ..., ...}
+    }
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        method = data.get('method', 'cross_entropy')
+        if method not in POLICY_SEARCH_METHODS:
+            return jsonify({
+                'success': False,
+                'error': f"method must be one of: {', '.join(POLICY_SEARCH_METHODS)}"
+            }), 400
+        
+        days = data.get('days', 365)
+        seed = data.get('seed', 0)
+        for name, value in (('days', days), ('seed', seed)):
+            if not isinstance(value, int) or isinstance(value, bool):
+                return jsonify({
+                    'success': False,
+                    'error': f'{name} must be an integer'
+                }), 400
+        
+        options = data.get('options') or {}
+        if not isinstance(options, dict):
+            return jsonify({
+                'success': False,
+                'error': 'options must be an object'
+            }), 400
+        option_types = POLICY_SEARCH_OPTIONS[method]
+        for name, value in options.items():
+            if name not in option_types:
+                return jsonify({
+                    'success': False,
+                    'error': f"Unknown {method} option '{name}'; expected one of: {', '.join(option_types)}"
+                }), 400
+            # Integers are valid floats, booleans are neither
+            accepted = (int, float) if option_types[name] is float else int
+            if not isinstance(value, accepted) or isinstance(value, bool):
+                return jsonify({
+                    'success': False,
+                    'error': f"Option '{name}' must be {'a number' if option_types[name] is float else 'an integer'}"
+                }), 400
+        
+        engine = data.get('engine', 'classic')
+        if engine not in POLICY_ENGINES:
+            return jsonify({
+                'success': False,
+                'error': f"engine must be one of: {', '.join(POLICY_ENGINES)}"
+            }), 400
+        
+        parallel = data.get('parallel')
+        try:
+            space = candidate_space(
+                reorder_days=data.get('reorder_days') or DEFAULT_REORDER_DAYS,
+                order_factors=data.get('order_factors') or DEFAULT_ORDER_FACTORS
+            )
+            search = PolicySearch(
+                days=days, seed=seed, engine=engine,
+                objective=data.get('objective', 'profit'), cache=rollout_cache,
+                parallel=None if parallel is None else bool(parallel),
+                max_simulated_days=MAX_POLICY_DAYS, max_episodes=MAX_POLICY_EPISODES
+            )
+            method_function = {
+                'cross_entropy': search.cross_entropy,
+                'successive_halving': search.successive_halving,
+                'grid': search.grid_search
+            }[method]
+            result = method_function(space, **options)
+        except (ValueError, TypeError) as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
         
         return jsonify({
             'success': True,
-            'preview': preview
+            'search': result,
+            'cache': rollout_cache.metrics()
         }), 200
         
     except Exception as e:
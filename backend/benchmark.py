@@ -0,0 +1,446 @@
+"""
+Benchmarks for the optimization path.
+
+Measures wall time, throughput and peak memory of recommend_stock_levels()
+and of the /recommend and /simulate endpoints (through the Flask test
+client) on synthetic catalogs, and compares two result files. The
+engines command times the classic and array game engines on stores of
+growing size, to show from how many products the array engine pays off.
+
+Usage:
+    python benchmark.py run --preset quick --output before.json
+    python benchmark.py run --sizes 100 10000 --scenarios 1 50 --output after.json
+    python benchmark.py compare before.json after.json --threshold 0.10
+    python benchmark.py engines --products 13 50 100 1000 --days 100
+"""
+
+import argparse
+import gc
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from game_data import StoreIndex, StoreItem, StoreItemSpec
+from inventory_optimization import recommend_stock_levels
+from policy_evaluation import ENGINES, RestockPolicy
+
+
+RESULT_FORMAT_VERSION = 1
+
+PRESETS = {
+    'quick': {'sizes': [100, 1000, 10000], 'scenarios': [1, 10, 50]},
+    'full': {'sizes': [100, 1000, 10000, 100000, 1000000], 'scenarios': [1, 10, 100, 500]}
+}
+
+# /simulate cases above this many (product, scenario) pairs are skipped;
+# their JSON responses would not fit in memory
+DEFAULT_MAX_CELLS = 5000000
+
+BENCHMARKS = ('recommend_stock_levels', '/recommend', '/simulate', '/simulate uncached')
+
+# Store sizes of the engine comparison (the game's own catalog has 13 products)
+DEFAULT_ENGINE_PRODUCTS = [3, 13, 50, 100, 1000, 10000]
+
+# Engine workloads: days advanced without orders, and days of a policy episode
+ENGINE_BENCHMARKS = ('advance', 'policy episode')
+
+
+def generate_catalog(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Synthetic product catalog.
+
+    Demand and costs are log-uniform over realistic ranges; about 2% of
+    the products have no demand, so the zero-demand branch is exercised.
+    """
+    rng = random.Random(seed)
+    products = []
+    for i in range(count):
+        demand = 0 if rng.random() < 0.02 else int(10 ** rng.uniform(1, 5))
+        products.append({
+            'name': f'SKU-{i:07d}',
+            'stock': rng.randint(0, 500),
+            'demand': demand,
+            'cost_storage': round(10 ** rng.uniform(-1, 1.5), 2),
+            'cost_restock': round(10 ** rng.uniform(1, 3), 2)
+        })
+    return products
+
+
+def generate_scenarios(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Synthetic /simulate scenarios with multipliers between 0.5 and 2."""
+    rng = random.Random(seed)
+    return [
+        {
+            'name': f'Scenario {i + 1}',
+            'modifications': {
+                'demand_multiplier': round(rng.uniform(0.5, 2.0), 3),
+                'cost_storage_multiplier': round(rng.uniform(0.5, 2.0), 3),
+                'cost_restock_multiplier': round(rng.uniform(0.5, 2.0), 3)
+            }
+        }
+        for i in range(count)
+    ]
+
+
+def measure(func: Callable[[], Any], repeat: int = 3,
+            setup: Optional[Callable[[], None]] = None) -> Dict[str, float]:
+    """
+    Time func and record its peak traced memory.
+
+    The timed runs use the best of `repeat`; peak memory comes from one
+    extra run under tracemalloc (which slows execution, so it is not timed).
+    `setup` runs before every call, outside the measurement.
+
+    Returns:
+        Dictionary with seconds, mean_seconds and peak_memory_bytes
+    """
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    if setup is not None:
+        setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'seconds': min(timings),
+        'mean_seconds': sum(timings) / len(timings),
+        'peak_memory_bytes': peak
+    }
+
+
+def _post_json(client, path: str, body: bytes) -> None:
+    response = client.post(path, data=body, content_type='application/json')
+    if response.status_code != 200:
+        raise RuntimeError(f'{path} returned {response.status_code}: {response.get_data(as_text=True)[:200]}')
+
+
+def run_benchmarks(sizes: List[int], scenario_counts: List[int], repeat: int = 3,
+                   max_cells: int = DEFAULT_MAX_CELLS, seed: int = 0,
+                   benchmarks=BENCHMARKS, log=print) -> List[Dict[str, Any]]:
+    """
+    Run every selected benchmark for every catalog size.
+
+    /simulate runs once per scenario count. Catalogs are generated with
+    the same seed for every run, so two result files are comparable.
+    The shared EOQ cache is cleared before every endpoint call, so
+    repeats measure cold-cache evaluations. '/simulate uncached' runs the
+    same requests with the cache disabled, so the two show what the cache
+    costs or saves.
+
+    Returns:
+        One result dict per (benchmark, products, scenarios) case
+    """
+    import app as app_module
+
+    client = app_module.app.test_client()
+    clear_cache = app_module.eoq_cache.clear
+
+    results = []
+
+    def record(benchmark, products, scenarios, measurement):
+        cells = products * scenarios
+        result = {
+            'benchmark': benchmark,
+            'products': products,
+            'scenarios': scenarios,
+            'seconds': round(measurement['seconds'], 6),
+            'mean_seconds': round(measurement['mean_seconds'], 6),
+            'throughput': round(cells / measurement['seconds'], 1) if measurement['seconds'] else None,
+            'peak_memory_bytes': measurement['peak_memory_bytes']
+        }
+        results.append(result)
+        log(f"{benchmark:<24} products={products:<8} scenarios={scenarios:<4} "
+            f"{result['seconds']:>10.4f}s  {result['throughput'] or 0:>14,.0f}/s  "
+            f"peak {result['peak_memory_bytes'] / 2 ** 20:>9.1f} MiB")
+
+    for size in sizes:
+        products = generate_catalog(size, seed)
+
+        if 'recommend_stock_levels' in benchmarks:
+            record('recommend_stock_levels', size, 1,
+                   measure(lambda: recommend_stock_levels(products), repeat))
+
+        if '/recommend' in benchmarks:
+            body = json.dumps({'products': products}).encode('utf-8')
+            record('/recommend', size, 1,
+                   measure(lambda: _post_json(client, '/recommend', body), repeat, clear_cache))
+
+        simulate_benchmarks = [name for name in ('/simulate', '/simulate uncached') if name in benchmarks]
+        for scenario_count in scenario_counts if simulate_benchmarks else []:
+            if size * scenario_count > max_cells:
+                log(f"{'/simulate':<24} products={size:<8} scenarios={scenario_count:<4} "
+                    f"skipped (over --max-cells {max_cells})")
+                continue
+            body = json.dumps({
+                'products': products,
+                'scenarios': generate_scenarios(scenario_count, seed)
+            }).encode('utf-8')
+            for name in simulate_benchmarks:
+                maxsize = app_module.eoq_cache.maxsize
+                if name == '/simulate uncached':
+                    app_module.eoq_cache.maxsize = 0
+                try:
+                    record(name, size, scenario_count,
+                           measure(lambda: _post_json(client, '/simulate', body), repeat, clear_cache))
+                finally:
+                    app_module.eoq_cache.maxsize = maxsize
+
+        del products
+
+    return results
+
+
+def game_with_products(engine: str, count: int, seed: int = 0):
+    """
+    Game of an engine whose store was grown to `count` unlocked products
+    with free synthetic store items (stores with fewer products are left
+    as they start).
+    """
+    game = ENGINES[engine](history_retention=1, report_retention=1, seed=seed)
+    rng = random.Random(seed)
+    items = [
+        StoreItem(StoreItemSpec(
+            name=f'Bench item {i}',
+            unlock_price=0,
+            starting_stock=rng.randint(0, 100),
+            cost_storage=round(rng.uniform(0.1, 2.0), 2),
+            cost_restock=rng.randint(10, 80),
+            sale_price=rng.randint(5, 40),
+            daily_demand=rng.randint(1, 30)
+        ))
+        for i in range(count - len(game.unlocked_products))
+    ]
+    game.store_items.extend(items)
+    game.store = StoreIndex(game.store_items)
+    game._index_products()
+    for item in items:
+        game.unlock_item(item.name)
+    return game
+
+
+def run_engine_benchmarks(product_counts: List[int], days: int = 100, repeat: int = 3,
+                          seed: int = 0, log=print) -> List[Dict[str, Any]]:
+    """
+    Time the classic and array engines on the same stores.
+
+    'advance' advances days with report level 'none' and no orders (the
+    /advance path); 'policy episode' also applies the default
+    RestockPolicy after every day (the /evaluate_policy path). Every run
+    starts from a freshly built game; the best of `repeat` runs counts.
+
+    Returns:
+        One result dict per (benchmark, products) case, with the seconds
+        per simulated day of both engines and the array engine's speedup
+    """
+    policy = RestockPolicy()
+    results = []
+    for benchmark in ENGINE_BENCHMARKS:
+        for count in product_counts:
+            seconds = {}
+            for engine in ('classic', 'array'):
+                timings = []
+                for _ in range(repeat):
+                    game = game_with_products(engine, count, seed)
+                    gc.collect()
+                    start = time.perf_counter()
+                    for _ in range(days):
+                        game.advance(1, 'none')
+                        if benchmark == 'policy episode':
+                            policy.apply(game)
+                    timings.append(time.perf_counter() - start)
+                seconds[engine] = min(timings) / days
+            result = {
+                'benchmark': benchmark,
+                'products': count,
+                'classic_seconds_per_day': round(seconds['classic'], 9),
+                'array_seconds_per_day': round(seconds['array'], 9),
+                'array_speedup': round(seconds['classic'] / seconds['array'], 3)
+            }
+            results.append(result)
+            log(f"{benchmark:<16} products={count:<8} classic {seconds['classic'] * 1e6:>10.1f} us/day  "
+                f"array {seconds['array'] * 1e6:>10.1f} us/day  speedup {result['array_speedup']:.2f}x")
+    return results
+
+
+def engine_crossover(results: List[Dict[str, Any]], benchmark: str) -> Optional[int]:
+    """
+    Fewest products from which the array engine is faster in every larger
+    measured store of a benchmark (None if it never is).
+    """
+    crossover = None
+    for result in sorted((r for r in results if r['benchmark'] == benchmark), key=lambda r: -r['products']):
+        if result['array_speedup'] <= 1:
+            break
+        crossover = result['products']
+    return crossover
+
+
+def environment_info() -> Dict[str, Any]:
+    """Interpreter, library and commit information stored with every run."""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'commit': commit,
+        'timestamp': datetime.now().isoformat(timespec='seconds')
+    }
+
+
+def compare_results(baseline: Dict[str, Any], candidate: Dict[str, Any],
+                    threshold: float = 0.10) -> List[Dict[str, Any]]:
+    """
+    Match the cases of two result files and compute their ratios.
+
+    A case is a regression when it is slower (or uses more peak memory)
+    than the baseline by more than `threshold` (0.10 = 10%).
+
+    Returns:
+        One dict per case present in both files
+    """
+    def key(result):
+        return (result['benchmark'], result['products'], result['scenarios'])
+
+    baseline_cases = {key(result): result for result in baseline['results']}
+    rows = []
+    for result in candidate['results']:
+        before = baseline_cases.get(key(result))
+        if before is None:
+            continue
+        time_ratio = result['seconds'] / before['seconds'] if before['seconds'] else None
+        memory_ratio = (result['peak_memory_bytes'] / before['peak_memory_bytes']
+                        if before['peak_memory_bytes'] else None)
+        rows.append({
+            'benchmark': result['benchmark'],
+            'products': result['products'],
+            'scenarios': result['scenarios'],
+            'baseline_seconds': before['seconds'],
+            'seconds': result['seconds'],
+            'time_ratio': time_ratio,
+            'memory_ratio': memory_ratio,
+            'regression': any(ratio is not None and ratio > 1 + threshold
+                              for ratio in (time_ratio, memory_ratio))
+        })
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the inventory optimization path.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Run the benchmarks')
+    run_parser.add_argument('--preset', choices=sorted(PRESETS), default='quick')
+    run_parser.add_argument('--sizes', type=int, nargs='+', help='Catalog sizes (overrides the preset)')
+    run_parser.add_argument('--scenarios', type=int, nargs='+',
+                            help='/simulate scenario counts (overrides the preset)')
+    run_parser.add_argument('--benchmarks', nargs='+', choices=BENCHMARKS, default=list(BENCHMARKS))
+    run_parser.add_argument('--repeat', type=int, default=3)
+    run_parser.add_argument('--max-cells', type=int, default=DEFAULT_MAX_CELLS)
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument('--output', help='Write the results as JSON to this file')
+
+    compare_parser = commands.add_parser('compare', help='Compare two result files')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('candidate')
+    compare_parser.add_argument('--threshold', type=float, default=0.10,
+                                help='Relative slowdown reported as a regression (default 0.10)')
+
+    engines_parser = commands.add_parser('engines', help='Compare the classic and array game engines')
+    engines_parser.add_argument('--products', type=int, nargs='+', default=DEFAULT_ENGINE_PRODUCTS)
+    engines_parser.add_argument('--days', type=int, default=100)
+    engines_parser.add_argument('--repeat', type=int, default=3)
+    engines_parser.add_argument('--seed', type=int, default=0)
+    engines_parser.add_argument('--output', help='Write the results as JSON to this file')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'engines':
+        results = run_engine_benchmarks(args.products, days=args.days, repeat=args.repeat, seed=args.seed)
+        for benchmark in ENGINE_BENCHMARKS:
+            crossover = engine_crossover(results, benchmark)
+            print(f'{benchmark}: ' + (f'array engine faster from {crossover} products' if crossover
+                                      else 'classic engine faster at every measured size'))
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump({
+                    'format_version': RESULT_FORMAT_VERSION,
+                    'environment': environment_info(),
+                    'parameters': {'products': args.products, 'days': args.days,
+                                   'repeat': args.repeat, 'seed': args.seed},
+                    'results': results
+                }, f, indent=2)
+            print(f'Results written to {args.output}')
+        return 0
+
+    if args.command == 'run':
+        preset = PRESETS[args.preset]
+        sizes = args.sizes or preset['sizes']
+        scenario_counts = args.scenarios or preset['scenarios']
+        results = run_benchmarks(sizes, scenario_counts, repeat=args.repeat,
+                                 max_cells=args.max_cells, seed=args.seed,
+                                 benchmarks=args.benchmarks)
+        report = {
+            'format_version': RESULT_FORMAT_VERSION,
+            'environment': environment_info(),
+            'parameters': {
+                'sizes': sizes,
+                'scenarios': scenario_counts,
+                'repeat': args.repeat,
+                'seed': args.seed,
+                'max_cells': args.max_cells
+            },
+            'results': results
+        }
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(report, f, indent=2)
+            print(f'Results written to {args.output}')
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    rows = compare_results(baseline, candidate, args.threshold)
+    print(f"{'benchmark':<24} {'products':>9} {'scenarios':>9} {'before':>10} {'after':>10} "
+          f"{'time':>7} {'memory':>7}")
+    for row in rows:
+        memory = f"{row['memory_ratio']:.2f}x" if row['memory_ratio'] is not None else 'n/a'
+        timing = f"{row['time_ratio']:.2f}x" if row['time_ratio'] is not None else 'n/a'
+        flag = '  REGRESSION' if row['regression'] else ''
+        print(f"{row['benchmark']:<24} {row['products']:>9} {row['scenarios']:>9} "
+              f"{row['baseline_seconds']:>9.4f}s {row['seconds']:>9.4f}s {timing:>7} {memory:>7}{flag}")
+
+    # Non-zero exit status lets CI fail on regressions
+    return 1 if any(row['regression'] for row in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
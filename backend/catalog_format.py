@@ -0,0 +1,254 @@
+"""
+Compact binary columnar catalog format, memory-mapped for repeated
+recommendation and simulation runs.
+
+Layout (little-endian):
+    header      32 bytes: magic, product count, name table size, flags
+    columns     stock, demand, cost_storage, cost_restock as float64[count]
+    offsets     uint64[count + 1] byte offsets into the name table
+    name table  UTF-8 encoded product names, back to back
+
+Numeric columns are 8-byte aligned, so a mapped file is used in place
+by NumPy without parsing or copying.
+"""
+
+import mmap
+import os
+import re
+import struct
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+MAGIC = b'DSSCAT\x01\x00'
+HEADER = struct.Struct('<8sQQB7x')
+NUMERIC_COLUMNS = ('stock', 'demand', 'cost_storage', 'cost_restock')
+FILE_EXTENSION = '.dsscat'
+BINARY_MIMETYPE = 'application/octet-stream'
+
+_CATALOG_ID = re.compile(r'^[A-Za-z0-9_-][A-Za-z0-9_.-]{0,127}$')
+
+
+class CatalogFormatError(ValueError):
+    """Raised for malformed binary catalogs."""
+
+
+def encode_catalog(columns: Dict[str, List[Any]]) -> bytes:
+    """
+    Encode product columns into the binary catalog format.
+
+    Args:
+        columns: Output of inventory_optimization.product_columns()
+
+    Returns:
+        The encoded catalog
+    """
+    count = len(columns['name'])
+    flags = 0
+    numeric = []
+    for bit, field in enumerate(NUMERIC_COLUMNS):
+        values = columns[field]
+        # Remember all-integer columns so they are echoed back as integers
+        if all(isinstance(value, int) and not isinstance(value, bool) for value in values):
+            flags |= 1 << bit
+        numeric.append(np.asarray(values, dtype='<f8').tobytes())
+
+    names = [str(name).encode('utf-8') for name in columns['name']]
+    offsets = np.zeros(count + 1, dtype='<u8')
+    np.cumsum([len(name) for name in names], out=offsets[1:])
+    name_table = b''.join(names)
+
+    return b''.join([
+        HEADER.pack(MAGIC, count, len(name_table), flags),
+        *numeric,
+        offsets.tobytes(),
+        name_table
+    ])
+
+
+def _layout(buffer, size: int) -> Dict[str, Any]:
+    """Validate the header and return the section offsets of a catalog."""
+    if size < HEADER.size:
+        raise CatalogFormatError('File too small for a catalog header')
+    magic, count, name_table_size, flags = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise CatalogFormatError('Not a binary catalog (bad magic number)')
+
+    columns_offset = HEADER.size
+    offsets_offset = columns_offset + 8 * count * len(NUMERIC_COLUMNS)
+    names_offset = offsets_offset + 8 * (count + 1)
+    if names_offset + name_table_size != size:
+        raise CatalogFormatError('Catalog size does not match its header')
+
+    return {
+        'count': count,
+        'flags': flags,
+        'columns_offset': columns_offset,
+        'offsets_offset': offsets_offset,
+        'names_offset': names_offset,
+        'name_table_size': name_table_size
+    }
+
+
+def validate_catalog(data: bytes) -> int:
+    """
+    Check that `data` is a well-formed binary catalog.
+
+    Returns:
+        Number of products in the catalog
+    """
+    layout = _layout(data, len(data))
+    offsets = np.frombuffer(data, dtype='<u8', count=layout['count'] + 1,
+                            offset=layout['offsets_offset'])
+    lengths = np.diff(offsets.astype(np.int64))
+    if offsets[0] != 0 or offsets[-1] != layout['name_table_size'] or np.any(lengths < 0):
+        raise CatalogFormatError('Corrupt name table offsets')
+    return layout['count']
+
+
+class MappedCatalog:
+    """
+    Read-only, memory-mapped binary catalog.
+
+    The numeric columns are NumPy views onto the mapping. Names are
+    decoded once, on first use.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            self.signature = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+            if stat.st_size == 0:
+                raise CatalogFormatError('Empty catalog file')
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        layout = _layout(self._mmap, stat.st_size)
+        self.count = layout['count']
+        self._flags = layout['flags']
+        self._layout = layout
+        self._names: Optional[List[str]] = None
+        self._names_lock = threading.Lock()
+
+        def column(index):
+            offset = layout['columns_offset'] + 8 * self.count * index
+            return np.frombuffer(self._mmap, dtype='<f8', count=self.count, offset=offset)
+
+        self.stock = column(0)
+        self.demand = column(1)
+        self.cost_storage = column(2)
+        self.cost_restock = column(3)
+
+    @property
+    def names(self) -> List[str]:
+        """Product names, decoded from the name table."""
+        with self._names_lock:
+            if self._names is None:
+                layout = self._layout
+                offsets = np.frombuffer(self._mmap, dtype='<u8', count=self.count + 1,
+                                        offset=layout['offsets_offset']).tolist()
+                table = self._mmap[layout['names_offset']:layout['names_offset'] + layout['name_table_size']]
+                self._names = [
+                    table[start:end].decode('utf-8')
+                    for start, end in zip(offsets[:-1], offsets[1:])
+                ]
+            return self._names
+
+    def echo_values(self, field: str) -> List[Any]:
+        """Column values as a list, integers for columns stored from integers."""
+        values = getattr(self, field)
+        if self._flags & (1 << NUMERIC_COLUMNS.index(field)):
+            return values.astype(np.int64).tolist()
+        return values.tolist()
+
+    def columns(self) -> Dict[str, Any]:
+        """
+        Columns in the shape of inventory_optimization.product_columns().
+
+        'name' and 'stock' are lists (they are echoed in the output); the
+        cost and demand columns are zero-copy arrays.
+        """
+        return {
+            'name': self.names,
+            'stock': self.echo_values('stock'),
+            'demand': self.demand,
+            'cost_storage': self.cost_storage,
+            'cost_restock': self.cost_restock
+        }
+
+    def info(self) -> Dict[str, Any]:
+        """Product count and file size."""
+        return {
+            'product_count': self.count,
+            'size_bytes': self.signature[1]
+        }
+
+
+class BinaryCatalogStore:
+    """
+    Binary catalogs stored on local disk, one file per catalog ID.
+
+    Opened mappings are kept and reused until the file changes.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._mapped: Dict[str, MappedCatalog] = {}
+        self._lock = threading.Lock()
+
+    def path_for(self, catalog_id: str) -> str:
+        """Return the file path of a catalog, rejecting unsafe IDs."""
+        if not _CATALOG_ID.match(catalog_id):
+            raise CatalogFormatError(
+                'Catalog IDs may only contain letters, digits, "_", "-" and "."'
+            )
+        return os.path.join(self.directory, catalog_id + FILE_EXTENSION)
+
+    def save(self, catalog_id: str, data: bytes) -> Dict[str, Any]:
+        """
+        Validate and atomically store an encoded catalog.
+
+        Returns:
+            Product count and file size of the stored catalog
+        """
+        path = self.path_for(catalog_id)
+        count = validate_catalog(data)
+
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            # Release our mapping first; some platforms refuse to replace mapped files
+            self._mapped.pop(catalog_id, None)
+            temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+
+        return {'product_count': count, 'size_bytes': len(data)}
+
+    def open(self, catalog_id: str) -> Optional[MappedCatalog]:
+        """Return the mapped catalog, or None if it does not exist."""
+        path = self.path_for(catalog_id)
+        with self._lock:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                self._mapped.pop(catalog_id, None)
+                return None
+
+            mapped = self._mapped.get(catalog_id)
+            if mapped is None or mapped.signature != (stat.st_ino, stat.st_size, stat.st_mtime_ns):
+                mapped = self._mapped[catalog_id] = MappedCatalog(path)
+            return mapped
+
+    def delete(self, catalog_id: str) -> bool:
+        """Remove a stored catalog. Returns False if it did not exist."""
+        path = self.path_for(catalog_id)
+        with self._lock:
+            self._mapped.pop(catalog_id, None)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                return False
+            return True
@@ -0,0 +1,234 @@
+"""
+In-memory catalog registry for the optimization endpoints.
+
+Catalogs are keyed by catalog ID and products by SKU. Each catalog keeps
+the last computed recommendation per SKU, so delta updates only
+recompute the products that actually changed, with the reorder-point
+options the catalog was loaded with.
+"""
+
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from inventory_optimization import recommend_stock_levels
+from safety_stock import recommend_with_safety_stock
+
+
+DEFAULT_CATALOG_ID = 'default'
+
+# Reorder-point options of catalogs loaded without any (plain EOQ reorder points)
+DETERMINISTIC_OPTIONS = {'mode': 'deterministic'}
+
+
+def product_sku(product: Dict[str, Any]) -> str:
+    """Return the SKU of a product dict ('sku' field, falling back to 'name')."""
+    sku = product.get('sku', product.get('name'))
+    return str(sku) if sku is not None else ''
+
+
+class Catalog:
+    """
+    One catalog: products and their last recommendations, both by SKU.
+    """
+
+    def __init__(self, catalog_id: str):
+        self.catalog_id = catalog_id
+        self.products: Dict[str, Dict[str, Any]] = {}
+        self.recommendations: Dict[str, Dict[str, Any]] = {}
+        # Keyword arguments of recommend_with_safety_stock() every
+        # recommendation of the catalog was computed with
+        self.reorder_options: Dict[str, Any] = dict(DETERMINISTIC_OPTIONS)
+        self.version = 0
+        self.lock = threading.RLock()
+
+    def product_list(self) -> List[Dict[str, Any]]:
+        """Products in insertion order."""
+        with self.lock:
+            return list(self.products.values())
+
+    def recommendation_list(self, skus: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Stored recommendations, in product order or for the given SKUs.
+        Unknown SKUs are skipped.
+        """
+        with self.lock:
+            if skus is None:
+                return [self.recommendations[sku] for sku in self.products]
+            return [self.recommendations[sku] for sku in skus if sku in self.recommendations]
+
+    def summary(self) -> Dict[str, Any]:
+        """Catalog ID, product count, reorder mode and version."""
+        with self.lock:
+            return {
+                'catalog_id': self.catalog_id,
+                'product_count': len(self.products),
+                'reorder_mode': self.reorder_options['mode'],
+                'version': self.version
+            }
+
+
+class CatalogRegistry:
+    """
+    Thread-safe registry of catalogs keyed by catalog ID.
+    """
+
+    def __init__(self, cache=None, required_fields: Iterable[str] = ()):
+        """
+        Args:
+            cache: Optional EOQCache used for every recomputation
+            required_fields: Fields every product must have after a delta
+        """
+        self.cache = cache
+        self.required_fields = list(required_fields)
+        self._catalogs: Dict[str, Catalog] = {}
+        self._lock = threading.Lock()
+
+    def get(self, catalog_id: str) -> Optional[Catalog]:
+        """Return a catalog, or None if it does not exist."""
+        with self._lock:
+            return self._catalogs.get(catalog_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Summaries of all catalogs."""
+        with self._lock:
+            catalogs = list(self._catalogs.values())
+        return [catalog.summary() for catalog in catalogs]
+
+    def delete(self, catalog_id: str) -> bool:
+        """Drop a catalog. Returns False if it did not exist."""
+        with self._lock:
+            return self._catalogs.pop(catalog_id, None) is not None
+
+    def _get_or_create(self, catalog_id: str) -> Catalog:
+        with self._lock:
+            catalog = self._catalogs.get(catalog_id)
+            if catalog is None:
+                catalog = self._catalogs[catalog_id] = Catalog(catalog_id)
+            return catalog
+
+    def _recommend(self, products: List[Dict[str, Any]],
+                   reorder_options: Dict[str, Any]) -> List[Dict[str, Any]]:
+        if not products:
+            return []
+        if reorder_options['mode'] == 'deterministic':
+            return recommend_stock_levels(products, cache=self.cache)
+        return recommend_with_safety_stock(products, cache=self.cache, **reorder_options)
+
+    def replace(self, catalog_id: str, products: List[Dict[str, Any]],
+                recommendations: Optional[List[Dict[str, Any]]] = None,
+                reorder_options: Optional[Dict[str, Any]] = None) -> Catalog:
+        """
+        Load a full catalog, replacing any previous content.
+
+        Args:
+            catalog_id: Catalog to (re)load
+            products: Full product list; a later SKU overrides an earlier one
+            recommendations: Already computed recommendations for `products`
+                (same order), to avoid computing them twice
+            reorder_options: recommend_with_safety_stock() keyword arguments
+                (mode, service_level, samples, seed) the recommendations are
+                computed with, also used by later deltas; deterministic if None
+
+        Returns:
+            The updated catalog
+        """
+        reorder_options = dict(reorder_options or DETERMINISTIC_OPTIONS)
+        if recommendations is None:
+            recommendations = self._recommend(products, reorder_options)
+
+        stored_products = {}
+        stored_recommendations = {}
+        for product, recommendation in zip(products, recommendations):
+            sku = product_sku(product)
+            stored_products[sku] = dict(product)
+            stored_recommendations[sku] = recommendation
+
+        catalog = self._get_or_create(catalog_id)
+        with catalog.lock:
+            catalog.products = stored_products
+            catalog.recommendations = stored_recommendations
+            catalog.reorder_options = reorder_options
+            catalog.version += 1
+        return catalog
+
+    def apply_delta(self, catalog_id: str,
+                    upsert: Optional[List[Dict[str, Any]]] = None,
+                    delete: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Upsert and delete individual SKUs, recomputing only what changed.
+
+        Upserted fields are merged into the existing product, so a delta may
+        carry just the SKU and the fields that changed. Products whose merged
+        fields are unchanged are not recomputed; the others are recomputed
+        with the catalog's reorder_options, so every stored recommendation
+        uses the same reorder-point model.
+
+        Args:
+            catalog_id: Catalog to update (created if missing, once the
+                delta has succeeded)
+            upsert: Product dicts (full or partial) identified by SKU
+            delete: SKUs to remove
+
+        Returns:
+            Dictionary with the changed/deleted SKUs, their fresh
+            recommendations and the new catalog version
+
+        Raises:
+            ValueError: If an upserted product lacks a required field;
+                nothing is applied in that case
+        """
+        catalog = self.get(catalog_id)
+        created = catalog is None
+        if created:
+            # Registered only after the delta succeeded, so a rejected one creates nothing
+            catalog = Catalog(catalog_id)
+
+        with catalog.lock:
+            changed: Dict[str, Dict[str, Any]] = {}
+            for patch in upsert or []:
+                sku = product_sku(patch)
+                current = changed.get(sku, catalog.products.get(sku))
+                merged = dict(current, **patch) if current is not None else dict(patch)
+                missing_fields = [field for field in self.required_fields if field not in merged]
+                if missing_fields:
+                    raise ValueError(
+                        f"Product '{sku}' missing required fields: {', '.join(missing_fields)}"
+                    )
+                if merged != catalog.products.get(sku):
+                    changed[sku] = merged
+
+            deleted = []
+            for sku in delete or []:
+                sku = str(sku)
+                changed.pop(sku, None)
+                if sku in catalog.products and sku not in deleted:
+                    deleted.append(sku)
+
+            # Compute before mutating, so a failing delta leaves the catalog intact
+            recommendations = self._recommend(list(changed.values()), catalog.reorder_options)
+
+            for sku in deleted:
+                del catalog.products[sku]
+                catalog.recommendations.pop(sku, None)
+            for (sku, product), recommendation in zip(changed.items(), recommendations):
+                catalog.products[sku] = product
+                catalog.recommendations[sku] = recommendation
+
+            if changed or deleted:
+                catalog.version += 1
+
+            if created:
+                with self._lock:
+                    registered = self._catalogs.setdefault(catalog_id, catalog)
+                if registered is not catalog:
+                    # Created concurrently: apply the delta to that catalog instead
+                    return self.apply_delta(catalog_id, upsert, delete)
+
+            return {
+                'catalog_id': catalog_id,
+                'version': catalog.version,
+                'product_count': len(catalog.products),
+                'upserted': list(changed),
+                'deleted': deleted,
+                'recommendations': recommendations
+            }
@@ -0,0 +1,146 @@
+"""
+Active daily events of a game.
+
+Events last duration_days days from the day they start and may overlap.
+Active events sit in a heap keyed by the day they expire, and events
+scheduled ahead of time in a heap keyed by the day they start, so moving
+to a new day only pops what starts or ends.
+
+The demand and restock effects of all active events are combined
+(multiplied) into per-product multiplier vectors, recomputed only when
+the set of active events or of products changes.
+"""
+
+import heapq
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from game_data import DailyEvent, EventType
+
+
+# Event types multiplying the demand / the restock cost of their targets
+DEMAND_EVENTS = (EventType.DEMAND_SPIKE, EventType.CALM_DAY)
+RESTOCK_EVENTS = (EventType.SUPPLIER_DISCOUNT,)
+
+
+def targets(event: DailyEvent, name: str, category: Optional[str]) -> bool:
+    """True if an event applies to a product (events without a target apply to all)."""
+    if event.affected_product is not None and event.affected_product != name:
+        return False
+    return event.affected_category is None or event.affected_category == category
+
+
+class EventScheduler:
+    """
+    Scheduled and active events of one game.
+
+    Spoilage is a one-off loss on the day its event starts; demand and
+    restock events act on every day they are active.
+    """
+
+    def __init__(self):
+        # (expiry day, sequence, event) of active events
+        self._active: List[Tuple[int, int, DailyEvent]] = []
+        # (start day, sequence, event) of events that have not started yet
+        self._pending: List[Tuple[int, int, DailyEvent]] = []
+        self._sequence = 0
+        # Combined multipliers: (product count, demand, restock), None when stale
+        self._multipliers: Optional[Tuple[int, List[float], List[float]]] = None
+
+    def __len__(self) -> int:
+        """Number of active events."""
+        return len(self._active)
+
+    @property
+    def active(self) -> List[DailyEvent]:
+        """Active events, oldest first."""
+        return [event for _, _, event in sorted(self._active, key=lambda entry: entry[1])]
+
+    @property
+    def latest(self) -> Optional[DailyEvent]:
+        """The most recently started active event, if any."""
+        if not self._active:
+            return None
+        return max(self._active, key=lambda entry: entry[1])[2]
+
+    @property
+    def pending(self) -> List[Tuple[int, DailyEvent]]:
+        """(start day, event) of the events that have not started yet, soonest first."""
+        return [(day, event) for day, _, event in sorted(self._pending)]
+
+    def schedule(self, event: DailyEvent, start_day: int) -> None:
+        """Start an event on a later day (see start_day())."""
+        self._sequence += 1
+        heapq.heappush(self._pending, (start_day, self._sequence, event))
+
+    def start(self, event: DailyEvent, day: int) -> None:
+        """Make an event active from a day for its duration_days."""
+        self._sequence += 1
+        heapq.heappush(self._active, (day + max(1, event.duration_days), self._sequence, event))
+        self._multipliers = None
+
+    def start_day(self, day: int) -> List[DailyEvent]:
+        """
+        Move to a new day: drop the events that have run out and start the
+        scheduled events due.
+
+        Returns:
+            The events started, in the order they were scheduled
+        """
+        while self._active and self._active[0][0] <= day:
+            heapq.heappop(self._active)
+            self._multipliers = None
+        started = []
+        while self._pending and self._pending[0][0] <= day:
+            _, _, event = heapq.heappop(self._pending)
+            self.start(event, day)
+            started.append(event)
+        return started
+
+    def multipliers(self, products: Sequence,
+                    categories: Dict[str, str]) -> Tuple[List[float], List[float]]:
+        """
+        Combined demand and restock multipliers per product.
+
+        Args:
+            products: The game's products, in order
+            categories: Category of each product name (if it has one)
+
+        Returns:
+            (demand, restock) multiplier lists aligned with products; the
+            same lists are returned until the events or products change
+        """
+        cached = self._multipliers
+        if cached is not None and cached[0] == len(products):
+            return cached[1], cached[2]
+
+        demand = [1.0] * len(products)
+        restock = [1.0] * len(products)
+        for _, _, event in sorted(self._active, key=lambda entry: entry[1]):
+            if event.event_type in DEMAND_EVENTS:
+                factors = demand
+            elif event.event_type in RESTOCK_EVENTS:
+                factors = restock
+            else:
+                continue
+            for i, product in enumerate(products):
+                if targets(event, product.name, categories.get(product.name)):
+                    factors[i] *= event.impact_multiplier
+        self._multipliers = (len(products), demand, restock)
+        return demand, restock
+
+    def restock_multiplier(self, name: str, category: Optional[str]) -> float:
+        """Combined restock cost multiplier of one product."""
+        multiplier = 1.0
+        for _, _, event in sorted(self._active, key=lambda entry: entry[1]):
+            if event.event_type in RESTOCK_EVENTS and targets(event, name, category):
+                multiplier *= event.impact_multiplier
+        return multiplier
+
+
+def spoilage_losses(events: Sequence[DailyEvent]) -> Dict[str, int]:
+    """Units lost per product name to the spoilage events among events."""
+    losses: Dict[str, int] = {}
+    for event in events:
+        if event.event_type == EventType.SPOILAGE and event.affected_product is not None:
+            losses[event.affected_product] = losses.get(event.affected_product, 0) + int(event.impact_multiplier)
+    return losses
@@ -5,9 +5,118 @@ Includes unlockable products, daily events, and comprehensive tracking.
 
 import math
 import random
-from typing import List, Dict, Any, Optional
+import uuid
+from collections import deque
+from typing import List, Dict, Any, Optional, Sequence, Tuple
 from copy import deepcopy
-from game_data import BaseProduct, StoreItem, DailyEvent, GameCatalog, EventType
+
+import numpy as np
+
+from game_data import BaseProduct, StoreItem, StoreIndex, DailyEvent, GameCatalog
+from event_scheduler import EventScheduler, spoilage_losses
+from game_history import (
+    HistoryBuffer, series_query, DEFAULT_HISTORY_RETENTION, DEFAULT_REPORT_RETENTION
+)
+
+
+# Detail levels of StockGame.advance() reports
+REPORT_LEVELS = ('none', 'summary', 'full')
+
+# Independently versioned parts of get_state() (history is versioned per point)
+STATE_SECTIONS = ('day', 'budget', 'products', 'recommendations',
+                  'store_items', 'current_event', 'statistics')
+
+# Sections changed by a new day, and by a restock or an unlock. store_items
+# only changes when an item is unlocked or the budget crosses an unlock price.
+DAY_SECTIONS = tuple(section for section in STATE_SECTIONS if section != 'store_items')
+ACTION_SECTIONS = ('budget', 'products', 'recommendations', 'statistics')
+
+# apply_action() types that simulate days (and so append to the history)
+DAY_ACTIONS = ('next_day', 'advance')
+
+# Action log entry: (day the action was taken on, action type, apply_action() args)
+LoggedAction = Tuple[int, str, Dict[str, Any]]
+
+# Lead time of every restock, in days (reorder point = daily demand x lead time)
+LEAD_TIME_DAYS = 3
+
+
+def recommendation_entry(name: str, stock: int, daily_demand: float,
+                         eoq: float) -> Dict[str, Any]:
+    """
+    Reorder recommendation of one product, with its alerts in the formats
+    of get_state() and of the day reports.
+    
+    Both formats share one status: critical at or below the reorder point
+    (including out of stock), warning below the EOQ, ok otherwise.
+    
+    Args:
+        name: Product name
+        stock: Current stock
+        daily_demand: Units demanded per day
+        eoq: Economic order quantity (0 if undefined)
+        
+    Returns:
+        Dictionary with 'recommendation', 'alert' and 'report_alert' (the
+        alerts are None for products with status ok)
+    """
+    reorder_point = daily_demand * LEAD_TIME_DAYS
+    eoq = eoq if eoq > 0 else 0
+    recommendation = {
+        'product': name,
+        'current_stock': stock,
+        'reorder_point': round(reorder_point, 2),
+        'eoq': round(eoq, 2),
+        'daily_demand': daily_demand,
+        'days_of_stock': round(stock / daily_demand, 1) if daily_demand > 0 else float('inf'),
+        'status': 'ok'
+    }
+    alert = None
+    report_alert = None
+    
+    if stock <= reorder_point:
+        recommendation['status'] = 'critical'
+        if stock == 0:
+            state_message = f"🔴 {name}: OUT OF STOCK! Restock immediately!"
+            report_message = f"🔴 OUT OF STOCK: {name}! Order {eoq:.0f} units immediately."
+        else:
+            state_message = f"🔴 {name}: Stock critical ({stock}). Restock {eoq:.0f} units now."
+            report_message = f"🔴 CRITICAL: {name} stock ({stock}) at reorder point! Order {eoq:.0f} units immediately."
+        alert = {
+            'type': 'critical',
+            'product': name,
+            'message': state_message
+        }
+        report_alert = {
+            'type': 'low_stock',
+            'severity': 'critical',
+            'product': name,
+            'message': report_message,
+            'current_stock': stock,
+            'reorder_point': reorder_point,
+            'recommended_order': round(eoq, 0)
+        }
+    elif stock < eoq:
+        recommendation['status'] = 'warning'
+        alert = {
+            'type': 'warning',
+            'product': name,
+            'message': f"🟡 {name}: Stock low ({stock}). Consider restocking."
+        }
+        report_alert = {
+            'type': 'low_stock',
+            'severity': 'medium',
+            'product': name,
+            'message': f"🟡 WARNING: {name} stock below optimal level. Consider ordering {eoq:.0f} units.",
+            'current_stock': stock,
+            'recommended_order': round(eoq, 0)
+        }
+    
+    return {
+        'recommendation': recommendation,
+        'alert': alert,
+        'report_alert': report_alert
+    }
 
 
 class StockGame:
@@ -16,20 +125,47 @@ class StockGame:
     daily events, and comprehensive game mechanics.
     """
     
-    def __init__(self):
-        """Initialize the game with default settings."""
+    def __init__(self, history_retention: Optional[int] = DEFAULT_HISTORY_RETENTION,
+                 report_retention: Optional[int] = DEFAULT_REPORT_RETENTION,
+                 seed: Optional[int] = None):
+        """
+        Initialize the game with default settings.
+        
+        Args:
+            history_retention: Days of chart history and events kept (0 or
+                None keeps everything)
+            report_retention: Full daily reports kept (0 or None keeps all)
+            seed: Seed of the game's random generator (random if None).
+                Games with the same seed and actions play out identically.
+        """
+        # Own random generator: reproducible, and not shared between threads
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.rng = random.Random(self.seed)
+        
+        # Successful actions, enough to replay the game (see replay())
+        self.action_log: List[LoggedAction] = []
+        
         # Core game state
         self.day = 1
-        self.budget = random.randint(120, 300)
+        self.budget = self.rng.randint(120, 300)
         self.initial_budget = self.budget
         
         # Products and store
         self.unlocked_products: List[BaseProduct] = GameCatalog.get_base_products()
         self.store_items: List[StoreItem] = GameCatalog.get_store_items()
+        self.store = StoreIndex(self.store_items)
+        self._index_products()
+        
+        # Recommendations per product, recomputed only for dirty products
+        self._recommendation_cache: Dict[str, Dict[str, Any]] = {}
+        self._dirty_products = {product.name for product in self.unlocked_products}
+        self._recommendation_lists: Optional[Dict[str, List[Dict[str, Any]]]] = None
         
         # Events
         self.current_event: Optional[DailyEvent] = None
-        self.event_history: List[DailyEvent] = []
+        self.events = EventScheduler()
+        self.event_history = deque(maxlen=history_retention or None)
+        self.total_events = 0
         
         # Game statistics
         self.total_revenue = 0.0
@@ -39,27 +175,59 @@ class StockGame:
         self.total_sales = 0
         self.total_stockouts = 0
         
-        # History tracking for charts
-        self.budget_history = [self.budget]
-        self.day_history = [self.day]
-        self.stock_history: Dict[str, List[int]] = {}
+        # History tracking for charts: one point per day, point i is day i + 1
+        self.history_retention = history_retention or None
+        self._budget_series = HistoryBuffer(np.float64, self.history_retention)
+        self._budget_series.append(self.budget)
+        self._stock_series: Dict[str, HistoryBuffer] = {}
         
         # Initialize stock history
         for product in self.unlocked_products:
-            self.stock_history[product.name] = [product.stock]
+            self._start_stock_series(product)
         
         # Daily reports
-        self.daily_reports = []
+        self.daily_reports = deque(maxlen=report_retention or None)
         
         # New unlocks tracking
         self.newly_unlocked_items = []
+        
+        # State versioning: bumped by every change, stamped per section
+        self.game_id = uuid.uuid4().hex[:12]
+        self.version = 0
+        self._section_versions = {section: 0 for section in STATE_SECTIONS}
+        # Version at which each history point / unlocked product was added
+        self._history_versions = HistoryBuffer(np.int64, self.history_retention)
+        self._history_versions.append(0)
+        self._product_versions: Dict[str, int] = {}
+    
+    @property
+    def budget_history(self) -> List[float]:
+        """Retained end-of-day budgets, oldest first."""
+        return self._budget_series.tolist()
+    
+    @property
+    def day_history(self) -> List[int]:
+        """Days of the retained history points."""
+        return list(range(self._budget_series.first_index + 1, self._budget_series.end_index + 1))
+    
+    @property
+    def stock_history(self) -> Dict[str, List[int]]:
+        """Retained end-of-day stock per product, oldest first."""
+        return {name: series.tolist() for name, series in self._stock_series.items()}
+    
+    def _start_stock_series(self, product) -> None:
+        """Start a product's stock series at the latest history point."""
+        series = HistoryBuffer(np.int64, self.history_retention,
+                               first_index=self._budget_series.end_index - 1)
+        series.append(product.stock)
+        self._stock_series[product.name] = series
     
     def next_day(self) -> Dict[str, Any]:
         """
         Simulate one day of operations with full game mechanics.
         
         Steps:
-        1. Apply daily event (10% chance)
+        1. Start daily events (scheduled ones, and a random one 50% of the time)
         2. Reduce stock by demand
         3. Compute sales revenue
         4. Compute storage costs
@@ -71,56 +239,125 @@ class StockGame:
         Returns:
             Dictionary containing day summary and all game state changes
         """
-        day_report = {
-            'day': self.day,
-            'event': None,
-            'sales': [],
-            'revenue': 0.0,
-            'storage_cost': 0.0,
-            'net_change': 0.0,
-            'alerts': [],
-            'recommendations': [],
-            'new_unlocks': []
-        }
+        day_report = self._run_day('full')
+        self._log_days(1, 'full')
+        return day_report
+    
+    def advance(self, days: int, report_level: str = 'summary') -> Dict[str, Any]:
+        """
+        Simulate several days in one call.
+        
+        Every day runs exactly the same mechanics as next_day(); only the
+        amount of reporting differs. With report_level 'none' no per-day
+        reports are built at all, which makes long runs a tight loop.
+        
+        Args:
+            days: Number of days to simulate (at least 1)
+            report_level: 'none' (totals only), 'summary' (one compact dict
+                per day) or 'full' (the next_day() report for every day,
+                also stored for get_daily_report())
+            
+        Returns:
+            Dictionary with the day range, totals over the run, final budget
+            and, unless report_level is 'none', the per-day reports
+        """
+        if report_level not in REPORT_LEVELS:
+            raise ValueError(f"report_level must be one of: {', '.join(REPORT_LEVELS)}")
+        if not isinstance(days, int) or isinstance(days, bool) or days < 1:
+            raise ValueError('days must be a positive integer')
         
-        # === STEP 1: Apply Daily Event (50% chance) ===
-        self.current_event = GameCatalog.generate_random_event(self.unlocked_products)
-        if self.current_event:
-            self.event_history.append(self.current_event)
-            day_report['event'] = self.current_event.to_dict()
+        start_day = self.day
+        revenue_before = self.total_revenue
+        storage_before = self.total_storage_costs
+        sales_before = self.total_sales
+        stockouts_before = self.total_stockouts
+        events_before = self.total_events
         
-        # Get event multipliers
-        demand_multiplier = 1.0
-        restock_multiplier = 1.0
+        reports = []
+        for remaining in range(days - 1, -1, -1):
+            # Affordable unlocks only matter after the last day
+            report = self._run_day(report_level, check_unlocks=remaining == 0)
+            if report is not None:
+                reports.append(report)
+        # Only full reports are kept, so 'summary' and 'none' replay alike
+        self._log_days(days, 'full' if report_level == 'full' else 'none')
         
-        if self.current_event:
-            if self.current_event.event_type == EventType.DEMAND_SPIKE:
-                demand_multiplier = self.current_event.impact_multiplier
-            elif self.current_event.event_type == EventType.CALM_DAY:
-                demand_multiplier = self.current_event.impact_multiplier
-            elif self.current_event.event_type == EventType.SUPPLIER_DISCOUNT:
-                restock_multiplier = self.current_event.impact_multiplier
+        revenue = self.total_revenue - revenue_before
+        storage_cost = self.total_storage_costs - storage_before
+        result = {
+            'days_advanced': days,
+            'start_day': start_day,
+            'end_day': self.day,
+            'budget': round(self.budget, 2),
+            'totals': {
+                'revenue': round(revenue, 2),
+                'storage_cost': round(storage_cost, 2),
+                'net_change': round(revenue - storage_cost, 2),
+                'units_sold': self.total_sales - sales_before,
+                'stockouts': self.total_stockouts - stockouts_before,
+                'events': self.total_events - events_before
+            },
+            'new_unlocks': [item.name for item in self.newly_unlocked_items]
+        }
+        if report_level != 'none':
+            result['reports'] = reports
+        return result
+    
+    def _run_day(self, report_level: str = 'full',
+                 check_unlocks: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Advance the game by one day, building only the requested report.
+        
+        Args:
+            report_level: 'full' (next_day() report), 'summary' or 'none'
+            check_unlocks: Refresh newly_unlocked_items (always done for 'full')
+            
+        Returns:
+            The day report, a summary dict, or None for 'none'
+        """
+        full = report_level == 'full'
+        day_report = None
+        if full:
+            day_report = {
+                'day': self.day,
+                'event': None,
+                'active_events': [],
+                'sales': [],
+                'revenue': 0.0,
+                'storage_cost': 0.0,
+                'net_change': 0.0,
+                'alerts': [],
+                'recommendations': [],
+                'new_unlocks': []
+            }
+        
+        # === STEP 1: Start Daily Events (random one: 50% chance) ===
+        started = self._start_events(day_report)
+        demand_multipliers, _ = self.events.multipliers(self.unlocked_products, self._categories)
+        spoilage = spoilage_losses(started)
         
         # === STEP 2 & 3: Process Sales for Each Product ===
         day_revenue = 0.0
+        day_sold = 0
+        day_stockouts = 0
         
-        for product in self.unlocked_products:
+        for product, demand_multiplier in zip(self.unlocked_products, demand_multipliers):
             # Apply event-based demand modifier
             effective_demand = product.daily_demand * demand_multiplier
             
             # Handle spoilage event
-            if (self.current_event and 
-                self.current_event.event_type == EventType.SPOILAGE and
-                self.current_event.affected_product == product.name):
-                spoilage_amount = int(self.current_event.impact_multiplier)
+            if spoilage and product.name in spoilage:
+                spoilage_amount = spoilage[product.name]
                 product.stock = max(0, product.stock - spoilage_amount)
-                day_report['alerts'].append({
-                    'type': 'spoilage',
-                    'severity': 'high',
-                    'product': product.name,
-                    'message': f"⚠️ SPOILAGE: {product.name} lost {spoilage_amount} units due to quality issues!",
-                    'units_lost': spoilage_amount
-                })
+                self._mark_dirty(product.name)
+                if full:
+                    day_report['alerts'].append({
+                        'type': 'spoilage',
+                        'severity': 'high',
+                        'product': product.name,
+                        'message': f"⚠️ SPOILAGE: {product.name} lost {spoilage_amount} units due to quality issues!",
+                        'units_lost': spoilage_amount
+                    })
             
             # Calculate actual sold (limited by stock)
             actual_sold = min(product.stock, int(effective_demand))
@@ -128,34 +365,40 @@ class StockGame:
             # Calculate revenue
             revenue = actual_sold * product.sale_price
             day_revenue += revenue
-            
-            # Track statistics
-            self.total_sales += actual_sold
+            day_sold += actual_sold
             
             # Check for stockout
             if actual_sold < effective_demand:
-                lost_sales = effective_demand - actual_sold
-                self.total_stockouts += 1
-                day_report['alerts'].append({
-                    'type': 'stockout',
-                    'severity': 'critical',
-                    'product': product.name,
-                    'message': f"🔴 STOCKOUT: {product.name} - Could not fulfill {lost_sales:.1f} units of demand!",
-                    'lost_sales': lost_sales,
-                    'lost_revenue': lost_sales * product.sale_price
-                })
+                day_stockouts += 1
+                if full:
+                    lost_sales = effective_demand - actual_sold
+                    day_report['alerts'].append({
+                        'type': 'stockout',
+                        'severity': 'critical',
+                        'product': product.name,
+                        'message': f"🔴 STOCKOUT: {product.name} - Could not fulfill {lost_sales:.1f} units of demand!",
+                        'lost_sales': lost_sales,
+                        'lost_revenue': lost_sales * product.sale_price
+                    })
             
             # Reduce stock
-            product.stock -= actual_sold
+            if actual_sold:
+                product.stock -= actual_sold
+                self._mark_dirty(product.name)
             
             # Record sale
-            day_report['sales'].append({
-                'product': product.name,
-                'demand': round(effective_demand, 1),
-                'sold': actual_sold,
-                'revenue': round(revenue, 2),
-                'remaining_stock': product.stock
-            })
+            if full:
+                day_report['sales'].append({
+                    'product': product.name,
+                    'demand': round(effective_demand, 1),
+                    'sold': actual_sold,
+                    'revenue': round(revenue, 2),
+                    'remaining_stock': product.stock
+                })
+        
+        # Track statistics
+        self.total_sales += day_sold
+        self.total_stockouts += day_stockouts
         
         # === STEP 4: Compute Storage Costs ===
         day_storage_cost = sum(p.stock * p.cost_storage for p in self.unlocked_products)
@@ -165,60 +408,46 @@ class StockGame:
         self.total_revenue += day_revenue
         self.total_storage_costs += day_storage_cost
         
-        day_report['revenue'] = round(day_revenue, 2)
-        day_report['storage_cost'] = round(day_storage_cost, 2)
-        day_report['net_change'] = round(day_revenue - day_storage_cost, 2)
-        day_report['budget_after'] = round(self.budget, 2)
-        
-        # === STEP 6: Update Reorder Recommendations ===
-        for product in self.unlocked_products:
-            # Calculate Reorder Point (lead time = 3 days)
-            reorder_point = product.daily_demand * 3
-            
-            # Calculate EOQ
-            if product.cost_storage > 0 and product.daily_demand > 0:
-                eoq = math.sqrt(
-                    (2 * product.daily_demand * product.cost_restock) / product.cost_storage
-                )
-            else:
-                eoq = 0
+        if full:
+            day_report['revenue'] = round(day_revenue, 2)
+            day_report['storage_cost'] = round(day_storage_cost, 2)
+            day_report['net_change'] = round(day_revenue - day_storage_cost, 2)
+            day_report['budget_after'] = round(self.budget, 2)
             
-            recommendation = {
-                'product': product.name,
-                'current_stock': product.stock,
-                'reorder_point': round(reorder_point, 2),
-                'eoq': round(eoq, 2),
-                'daily_demand': product.daily_demand,
-                'days_of_stock': round(product.stock / product.daily_demand, 1) if product.daily_demand > 0 else float('inf'),
-                'status': 'ok'
+            # === STEP 6 & 7: Reorder Recommendations and Alerts ===
+            self._add_recommendations(day_report)
+        
+        # === STEP 8: Check for New Unlockable Items ===
+        if full or check_unlocks:
+            self._check_unlocks(day_report)
+        
+        # === STEP 9: Update History ===
+        summary = None
+        if report_level == 'summary':
+            summary = {
+                'day': self.day,
+                'event': self.current_event.event_type.value if self.current_event else None,
+                'revenue': round(day_revenue, 2),
+                'storage_cost': round(day_storage_cost, 2),
+                'net_change': round(day_revenue - day_storage_cost, 2),
+                'budget_after': round(self.budget, 2),
+                'units_sold': day_sold,
+                'stockouts': day_stockouts
             }
-            
-            # === STEP 7: Generate Alerts ===
-            # Critical: At or below reorder point
-            if product.stock <= reorder_point:
-                recommendation['status'] = 'critical'
-                day_report['alerts'].append({
-                    'type': 'low_stock',
-                    'severity': 'critical',
-                    'product': product.name,
-                    'message': f"🔴 CRITICAL: {product.name} stock ({product.stock}) at reorder point! Order {eoq:.0f} units immediately.",
-                    'current_stock': product.stock,
-                    'reorder_point': reorder_point,
-                    'recommended_order': round(eoq, 0)
-                })
-            # Warning: Below EOQ
-            elif product.stock < eoq:
-                recommendation['status'] = 'warning'
-                day_report['alerts'].append({
-                    'type': 'low_stock',
-                    'severity': 'medium',
-                    'product': product.name,
-                    'message': f"🟡 WARNING: {product.name} stock below optimal level. Consider ordering {eoq:.0f} units.",
-                    'current_stock': product.stock,
-                    'recommended_order': round(eoq, 0)
-                })
-            
-            day_report['recommendations'].append(recommendation)
+        
+        self._end_day()
+        
+        if full:
+            # Store daily report
+            self.daily_reports.append(day_report)
+            return day_report
+        return summary
+    
+    def _add_recommendations(self, day_report: Dict[str, Any]) -> None:
+        """Add the end-of-day reorder recommendations and alerts to a full day report."""
+        lists = self._cached_recommendations()
+        day_report['recommendations'] = lists['recommendations']
+        day_report['alerts'].extend(lists['report_alerts'])
         
         # Budget alert
         if self.budget < 0:
@@ -228,16 +457,108 @@ class StockGame:
                 'message': f"💰 BUDGET ALERT: Operating at a loss! Budget: ${self.budget:.2f}",
                 'budget': round(self.budget, 2)
             })
+    
+    def _mark_dirty(self, *names: str) -> None:
+        """Invalidate the cached recommendations of products whose stock or parameters changed."""
+        self._dirty_products.update(names)
+        self._recommendation_lists = None
+    
+    def _refresh_recommendations(self) -> None:
+        """Recompute the cached recommendation entries of the dirty products."""
+        for name in self._dirty_products:
+            product = self._products_by_name[name]
+            if product.cost_storage > 0 and product.daily_demand > 0:
+                eoq = math.sqrt(
+                    (2 * product.daily_demand * product.cost_restock) / product.cost_storage
+                )
+            else:
+                eoq = 0
+            self._recommendation_cache[name] = recommendation_entry(
+                name, product.stock, product.daily_demand, eoq)
+        self._dirty_products.clear()
+    
+    def _cached_recommendations(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Recommendations and per-product alerts of all products, in product
+        order, for both get_state() and the day reports.
         
-        # === STEP 8: Check for New Unlockable Items ===
-        affordable_items = [
-            item for item in self.store_items
-            if not item.unlocked and item.unlock_price <= self.budget
-        ]
-        
-        # Notify about newly affordable items
-        self.newly_unlocked_items = affordable_items
-        if affordable_items:
+        Only dirty products are recomputed; the lists are rebuilt only
+        after a change. Callers must not modify the returned lists.
+        """
+        self._refresh_recommendations()
+        if self._recommendation_lists is None:
+            entries = [self._recommendation_cache[product.name] for product in self.unlocked_products]
+            self._recommendation_lists = {
+                'recommendations': [entry['recommendation'] for entry in entries],
+                'alerts': [entry['alert'] for entry in entries if entry['alert'] is not None],
+                'report_alerts': [entry['report_alert'] for entry in entries if entry['report_alert'] is not None]
+            }
+        return self._recommendation_lists
+    
+    def _end_day(self, stock_levels: Optional[List[int]] = None) -> None:
+        """
+        Move to the next day: append a history point and bump the version.
+        
+        Args:
+            stock_levels: Current stock per unlocked product, if already at hand
+        """
+        self.day += 1
+        self._budget_series.append(self.budget)
+        point = self._budget_series.end_index - 1
+        
+        if stock_levels is None:
+            stock_levels = [product.stock for product in self.unlocked_products]
+        for product, stock in zip(self.unlocked_products, stock_levels):
+            series = self._stock_series.get(product.name)
+            if series is None:
+                series = self._stock_series[product.name] = HistoryBuffer(
+                    np.int64, self.history_retention, first_index=point)
+            series.append(stock)
+        
+        self._touch_budget(*DAY_SECTIONS)
+        self._history_versions.append(self.version)
+    
+    def _touch(self, *sections: str) -> None:
+        """Bump the state version and stamp the given sections with it."""
+        self.version += 1
+        for section in sections:
+            self._section_versions[section] = self.version
+    
+    def _start_events(self, day_report: Optional[Dict[str, Any]]) -> List[DailyEvent]:
+        """
+        Start today's events: the scheduled ones due and, half of the time,
+        a random one. current_event becomes the latest active event.
+        
+        Returns:
+            The events started today
+        """
+        started = self.events.start_day(self.day)
+        event = GameCatalog.generate_random_event(self.unlocked_products, self.rng)
+        if event:
+            self.events.start(event, self.day)
+            started.append(event)
+        self.event_history.extend(started)
+        self.total_events += len(started)
+        self.current_event = self.events.latest
+        if day_report is not None:
+            if self.current_event:
+                day_report['event'] = self.current_event.to_dict()
+            day_report['active_events'] = [active.to_dict() for active in self.events.active]
+        return started
+    
+    def _touch_budget(self, *sections: str) -> None:
+        """_touch() after a budget change, adding store_items if an item's affordability flipped."""
+        if self.store.set_budget(self.budget):
+            sections += ('store_items',)
+        self._touch(*sections)
+    
+    def _check_unlocks(self, day_report: Optional[Dict[str, Any]]) -> None:
+        """
+        Refresh newly_unlocked_items (affordable locked items, cheapest
+        first) and list the cheapest three in a full day report.
+        """
+        self.newly_unlocked_items = self.store.affordable(self.budget)
+        if day_report is not None and self.newly_unlocked_items:
             day_report['new_unlocks'] = [
                 {
                     'name': item.name,
@@ -245,23 +566,185 @@ class StockGame:
                     'category': item.category,
                     'description': item.description
                 }
-                for item in affordable_items[:3]  # Show top 3
+                for item in self.newly_unlocked_items[:3]  # Show top 3
             ]
+    
+    def _log_action(self, action_type: str, args: Dict[str, Any]) -> None:
+        """Record a successful action for replay()."""
+        self.action_log.append((self.day, action_type, args))
+    
+    def _log_days(self, days: int, report_level: str) -> None:
+        """Record simulated days, merged into the previous entry when possible."""
+        if self.action_log:
+            day, action_type, args = self.action_log[-1]
+            if (action_type == 'advance' and args['report_level'] == report_level
+                    and day + args['days'] == self.day - days):
+                self.action_log[-1] = (day, action_type, {
+                    'days': args['days'] + days, 'report_level': report_level
+                })
+                return
+        self.action_log.append((self.day - days, 'advance', {
+            'days': days, 'report_level': report_level
+        }))
+    
+    @classmethod
+    def replay(cls, seed: int, action_log: Sequence[Sequence[Any]],
+               until_day: Optional[int] = None, max_days: Optional[int] = None,
+               **kwargs) -> 'StockGame':
+        """
+        Rebuild a game from its seed and action log.
         
-        # === STEP 9: Update History ===
-        self.day += 1
-        self.budget_history.append(self.budget)
-        self.day_history.append(self.day)
+        The whole log is parsed before anything is simulated, so a malformed
+        entry or one over the day budget costs nothing.
+        
+        Args:
+            seed: Seed the original game was started with
+            action_log: Its action_log (entries may be lists, as after JSON)
+            until_day: Stop on this day, after the actions taken on it but
+                before advancing past it (None replays the whole log)
+            max_days: Most days the log may advance in total (None: no limit)
+            **kwargs: Other constructor arguments (retention)
+            
+        Returns:
+            The game, in the same state as the original at that point
+        
+        Raises:
+            ValueError: If an entry is malformed, the log advances more than
+                max_days days, or an action fails, i.e. the log does not
+                belong to this seed
+        """
+        entries = []
+        total_days = 0
+        for position, entry in enumerate(action_log):
+            try:
+                day, action_type, args = entry
+                if isinstance(day, bool) or not isinstance(action_type, str):
+                    raise TypeError
+                day = int(day)
+                action = dict(args, type=action_type)
+            except (TypeError, ValueError):
+                raise ValueError(f'Malformed action log entry {position}: {entry!r}')
+            if action_type == 'advance':
+                days = action.get('days', 1)
+                if not isinstance(days, int) or isinstance(days, bool) or days < 1:
+                    raise ValueError(f'Action log entry {position} must advance a whole number of days >= 1')
+                total_days += days
+                if max_days is not None and total_days > max_days:
+                    raise ValueError(f'A replay may simulate at most {max_days} days')
+            entries.append((position, day, action_type, action))
         
+        game = cls(seed=seed, **kwargs)
+        for position, day, action_type, action in entries:
+            if until_day is not None:
+                if day > until_day:
+                    break
+                if action_type == 'advance':
+                    action['days'] = min(action.get('days', 1), until_day - day)
+                    if action['days'] < 1:
+                        break
+            if day != game.day:
+                raise ValueError(f'Action log entry {position} is for day {day}, game is on day {game.day}')
+            result = game.apply_action(action)
+            if not result.get('success', False):
+                raise ValueError(f"Action log entry {position} failed: {result.get('error')}")
+        return game
+    
+    def _index_products(self) -> None:
+        """Rebuild the name -> product / store item lookups (first entry wins)."""
+        self._products_by_name: Dict[str, BaseProduct] = {}
         for product in self.unlocked_products:
-            if product.name not in self.stock_history:
-                self.stock_history[product.name] = []
-            self.stock_history[product.name].append(product.stock)
+            self._products_by_name.setdefault(product.name, product)
+        self._store_items_by_name: Dict[str, StoreItem] = {}
+        for item in self.store_items:
+            self._store_items_by_name.setdefault(item.name, item)
+        # Categories of products that come from the store, for event targeting
+        self._categories = {name: item.category for name, item in self._store_items_by_name.items()}
+    
+    def checkpoint(self, include_history: bool = True) -> 'StockGame':
+        """
+        Independent copy of the game, to roll back to after failed actions.
         
-        # Store daily report
-        self.daily_reports.append(day_report)
+        Events, daily reports, action log entries and recommendation
+        entries are never modified once recorded, so their containers are
+        copied shallowly; everything else is deep copied.
         
-        return day_report
+        Args:
+            include_history: Also copy the history buffers, events and
+                reports. Only days (DAY_ACTIONS) change those, so without
+                them the copy costs O(products) instead of O(days kept),
+                but it shares them with the game: it is only a valid
+                rollback target if no day is simulated in between.
+        """
+        rng = random.Random()
+        rng.setstate(self.rng.getstate())
+        memo = {
+            id(self.rng): rng,
+            id(self.action_log): list(self.action_log),
+            id(self._recommendation_cache): dict(self._recommendation_cache),
+            id(self._recommendation_lists): self._recommendation_lists
+        }
+        if include_history:
+            memo[id(self.event_history)] = deque(self.event_history, maxlen=self.event_history.maxlen)
+            memo[id(self.daily_reports)] = deque(self.daily_reports, maxlen=self.daily_reports.maxlen)
+        else:
+            shared = [self.event_history, self.daily_reports, self._budget_series, self._history_versions]
+            shared.extend(self._stock_series.values())
+            for container in shared:
+                memo[id(container)] = container
+        if self.current_event is not None:
+            memo[id(self.current_event)] = self.current_event
+        return deepcopy(self, memo)
+    
+    def apply_action(self, action: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Apply one player action given as a dict.
+        
+        Supported actions:
+            {"type": "restock", "product": name, "quantity": n}
+            {"type": "unlock_item", "item_name": name}
+            {"type": "next_day"}
+            {"type": "advance", "days": n, "report_level": "summary"}
+            {"type": "schedule_event", "event": DailyEvent dict, "start_day": n}
+        
+        Returns:
+            The result of the underlying method, always with a 'success' flag
+        """
+        action_type = action.get('type')
+        if action_type == 'restock':
+            product_name = action.get('product')
+            quantity = action.get('quantity')
+            if not product_name or quantity is None:
+                return {'success': False, 'error': 'restock needs product and quantity'}
+            try:
+                quantity = int(quantity)
+            except (ValueError, TypeError):
+                return {'success': False, 'error': 'Quantity must be a valid number'}
+            return self.restock(product_name, quantity)
+        if action_type == 'unlock_item':
+            if not action.get('item_name'):
+                return {'success': False, 'error': 'unlock_item needs item_name'}
+            return self.unlock_item(action['item_name'])
+        if action_type == 'next_day':
+            return {'success': True, 'day_summary': self.next_day()}
+        if action_type == 'advance':
+            try:
+                result = self.advance(action.get('days', 1), action.get('report_level', 'summary'))
+            except ValueError as e:
+                return {'success': False, 'error': str(e)}
+            return {'success': True, 'result': result}
+        if action_type == 'schedule_event':
+            if not isinstance(action.get('event'), dict):
+                return {'success': False, 'error': 'schedule_event needs an event'}
+            try:
+                event = DailyEvent.from_dict(action['event'])
+            except ValueError as e:
+                return {'success': False, 'error': str(e)}
+            return self.schedule_event(event, action.get('start_day'))
+        return {
+            'success': False,
+            'error': f"Unknown action type: {action_type!r} "
+                     f"(expected restock, unlock_item, next_day, advance or schedule_event)"
+        }
     
     def restock(self, product_name: str, quantity: int) -> Dict[str, Any]:
         """
@@ -275,11 +758,7 @@ class StockGame:
             Dictionary with restock details and updated status
         """
         # Find the product
-        product = None
-        for p in self.unlocked_products:
-            if p.name == product_name:
-                product = p
-                break
+        product = self._products_by_name.get(product_name)
         
         if product is None:
             return {
@@ -296,12 +775,12 @@ class StockGame:
         # Calculate total cost (fixed restock cost per order)
         total_cost = product.cost_restock
         
-        # Apply supplier discount if active
-        if (self.current_event and 
-            self.current_event.event_type == EventType.SUPPLIER_DISCOUNT):
-            total_cost *= self.current_event.impact_multiplier
+        # Apply supplier discounts if active
+        restock_multiplier = self.events.restock_multiplier(product.name, self._categories.get(product.name))
+        if restock_multiplier != 1.0:
+            total_cost *= restock_multiplier
             discount_applied = True
-            discount_saved = product.cost_restock * (1 - self.current_event.impact_multiplier)
+            discount_saved = product.cost_restock * (1 - restock_multiplier)
         else:
             discount_applied = False
             discount_saved = 0
@@ -318,6 +797,9 @@ class StockGame:
         # Increase stock
         old_stock = product.stock
         product.stock += quantity
+        self._mark_dirty(product.name)
+        self._touch_budget(*ACTION_SECTIONS)
+        self._log_action('restock', {'product': product_name, 'quantity': quantity})
         
         return {
             'success': True,
@@ -343,11 +825,7 @@ class StockGame:
             Dictionary with unlock details and new product info
         """
         # Find the store item
-        store_item = None
-        for item in self.store_items:
-            if item.name == item_name:
-                store_item = item
-                break
+        store_item = self._store_items_by_name.get(item_name)
         
         if store_item is None:
             return {
@@ -372,13 +850,18 @@ class StockGame:
         self.total_unlock_costs += store_item.unlock_price
         
         # Unlock the item and convert to BaseProduct
-        new_product = store_item.unlock()
+        new_product = self.store.unlock(store_item)
         
         # Add to unlocked products
         self.unlocked_products.append(new_product)
+        self._products_by_name.setdefault(new_product.name, new_product)
+        self._mark_dirty(new_product.name)
         
         # Initialize stock history for new product
-        self.stock_history[new_product.name] = [new_product.stock]
+        self._start_stock_series(new_product)
+        self._touch_budget(*ACTION_SECTIONS, 'store_items')
+        self._product_versions[new_product.name] = self.version
+        self._log_action('unlock_item', {'item_name': item_name})
         
         return {
             'success': True,
@@ -389,10 +872,47 @@ class StockGame:
             'message': f"🎉 Successfully unlocked {item_name}! Added to your inventory with {new_product.stock} units."
         }
     
-    def get_state(self) -> Dict[str, Any]:
+    def schedule_event(self, event: DailyEvent, start_day: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Schedule an event, on top of the random daily events.
+        
+        The event is active for its duration_days from start_day and
+        overlapping events stack.
+        
+        Args:
+            event: Event to schedule
+            start_day: First day it affects (default: the next simulated
+                day, the current one)
+            
+        Returns:
+            Dictionary with the event and its start day
+        """
+        if start_day is None:
+            start_day = self.day
+        if not isinstance(start_day, int) or isinstance(start_day, bool) or start_day < self.day:
+            return {
+                'success': False,
+                'error': f"start_day must be a day from {self.day} on"
+            }
+        
+        self.events.schedule(event, start_day)
+        self._log_action('schedule_event', {'event': event.to_dict(), 'start_day': start_day})
+        return {
+            'success': True,
+            'event': event.to_dict(),
+            'start_day': start_day
+        }
+    
+    def get_state(self, since_version: Optional[int] = None) -> Dict[str, Any]:
         """
         Get current complete game state.
         
+        Args:
+            since_version: Version the caller already holds. If given (and
+                not newer than the current version), only the sections
+                changed since then are included, and history holds only
+                the points appended since then (see history_since())
+        
         Returns:
             Dictionary containing all game data including:
             - Day, budget, statistics
@@ -401,61 +921,136 @@ class StockGame:
             - Current event
             - Alerts and recommendations
             - History data for charts
+            - game_id and version, identifying this exact state
         """
-        # Calculate recommendations for all products
-        recommendations = []
-        alerts = []
+        delta = since_version is not None and 0 <= since_version <= self.version
         
-        for product in self.unlocked_products:
-            # Reorder Point
-            reorder_point = product.daily_demand * 3
-            
-            # EOQ
-            if product.cost_storage > 0 and product.daily_demand > 0:
-                eoq = math.sqrt(
-                    (2 * product.daily_demand * product.cost_restock) / product.cost_storage
-                )
-            else:
-                eoq = 0
-            
-            # Days of stock remaining
-            days_of_stock = product.stock / product.daily_demand if product.daily_demand > 0 else float('inf')
-            
-            recommendation = {
-                'product': product.name,
-                'current_stock': product.stock,
-                'reorder_point': round(reorder_point, 2),
-                'eoq': round(eoq, 2),
-                'daily_demand': product.daily_demand,
-                'days_of_stock': round(days_of_stock, 1)
+        state = {
+            'game_id': self.game_id,
+            'version': self.version
+        }
+        
+        for section in STATE_SECTIONS:
+            if not delta or self._section_versions[section] > since_version:
+                state.update(self._state_section(section))
+        
+        if delta:
+            state['since_version'] = since_version
+            state['history'] = self.history_since(since_version)
+        else:
+            state['history'] = {
+                'budget': self.budget_history,
+                'days': self.day_history,
+                'stock': self.stock_history
             }
-            
-            # Status and alerts
-            if product.stock == 0:
-                recommendation['status'] = 'critical'
-                alerts.append({
-                    'type': 'critical',
-                    'product': product.name,
-                    'message': f"🔴 {product.name}: OUT OF STOCK! Restock immediately!"
-                })
-            elif product.stock <= reorder_point:
-                recommendation['status'] = 'critical'
-                alerts.append({
-                    'type': 'critical',
-                    'product': product.name,
-                    'message': f"🔴 {product.name}: Stock critical ({product.stock}). Restock {eoq:.0f} units now."
-                })
-            elif product.stock < eoq:
-                recommendation['status'] = 'warning'
-                alerts.append({
-                    'type': 'warning',
-                    'product': product.name,
-                    'message': f"🟡 {product.name}: Stock low ({product.stock}). Consider restocking."
-                })
+        return state
+    
+    def history_since(self, since_version: int) -> Dict[str, Any]:
+        """
+        History points appended after a state version.
+        
+        Args:
+            since_version: Version the caller already holds
+        
+        Returns:
+            Dictionary with start_index (position of the first returned
+            point in the full history), the new budget/day points, and
+            per-product stock points. Products unlocked after
+            since_version come with their whole series and are listed
+            in new_products.
+        """
+        versions = self._history_versions
+        start = versions.first_index + int(np.searchsorted(versions.values(), since_version, side='right'))
+        stock = {}
+        new_products = []
+        for name, series in self._stock_series.items():
+            if self._product_versions.get(name, 0) > since_version:
+                new_products.append(name)
+                stock[name] = series.tolist()
             else:
-                recommendation['status'] = 'ok'
+                stock[name] = series.tolist(start)
+        return {
+            'start_index': start,
+            'budget': self._budget_series.tolist(start),
+            'days': list(range(start + 1, self._budget_series.end_index + 1)),
+            'stock': stock,
+            'new_products': new_products
+        }
+    
+    def query_history(self, start_day: Optional[int] = None, end_day: Optional[int] = None,
+                      products: Optional[List[str]] = None,
+                      max_points: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Chart series over a day range, optionally downsampled.
+        
+        Args:
+            start_day, end_day: Inclusive day range (defaults: all retained days)
+            products: Products whose stock series to include (default: all)
+            max_points: Downsample every series to at most this many points
+                with LTTB (None = every point)
             
-            recommendations.append(recommendation)
+        Returns:
+            Dictionary with the retained day range, the budget series and
+            one stock series per product, each as {'days': [...], 'values': [...]}
+        """
+        start = 0 if start_day is None else max(start_day - 1, 0)
+        stop = self._budget_series.end_index if end_day is None else max(end_day, 0)
+        
+        if products is None:
+            products = list(self._stock_series)
+        unknown = [name for name in products if name not in self._stock_series]
+        if unknown:
+            raise ValueError(f"Unknown products: {', '.join(unknown)}")
+        
+        return {
+            'retained_days': [self._budget_series.first_index + 1, self._budget_series.end_index],
+            'budget': series_query(self._budget_series, start, stop, max_points),
+            'stock': {
+                name: series_query(self._stock_series[name], start, stop, max_points)
+                for name in products
+            }
+        }
+    
+    def _state_section(self, section: str) -> Dict[str, Any]:
+        """The get_state() entries of one STATE_SECTIONS section."""
+        if section == 'day':
+            return {'day': self.day}
+        if section == 'budget':
+            return {
+                'budget': round(self.budget, 2),
+                'initial_budget': self.initial_budget
+            }
+        if section == 'products':
+            return {
+                'products': [
+                    {
+                        'name': p.name,
+                        'stock': p.stock,
+                        'demand_rate': p.daily_demand,
+                        'cost_storage': p.cost_storage,
+                        'cost_restock': p.cost_restock,
+                        'sale_price': p.sale_price
+                    }
+                    for p in self.unlocked_products
+                ]
+            }
+        if section == 'recommendations':
+            return self._recommendations_and_alerts()
+        if section == 'store_items':
+            return {'store_items': self._store_items_state()}
+        if section == 'current_event':
+            return {
+                'current_event': self.current_event.to_dict() if self.current_event else None,
+                'active_events': [event.to_dict() for event in self.events.active]
+            }
+        if section == 'statistics':
+            return {'statistics': self._statistics()}
+        raise ValueError(f'Unknown state section: {section}')
+    
+    def _recommendations_and_alerts(self) -> Dict[str, Any]:
+        """Reorder recommendations and alerts for get_state()."""
+        lists = self._cached_recommendations()
+        alerts = list(lists['alerts'])
         
         # Budget alerts
         if self.budget < 0:
@@ -469,64 +1064,33 @@ class StockGame:
                 'message': f"💰 Budget is low: ${self.budget:.2f}"
             })
         
-        # Available store items
-        available_store_items = [
-            {
-                'name': item.name,
-                'unlock_price': item.unlock_price,
-                'starting_stock': item.starting_stock,
-                'daily_demand': item.daily_demand,
-                'sale_price': item.sale_price,
-                'category': item.category,
-                'description': item.description,
-                'unlocked': item.unlocked,
-                'affordable': self.budget >= item.unlock_price
-            }
-            for item in self.store_items
-        ]
-        
+        return {
+            'alerts': alerts,
+            'recommendations': lists['recommendations']
+        }
+    
+    def _store_items_state(self) -> List[Dict[str, Any]]:
+        """Store items with their affordability, for get_state()."""
+        return self.store.state(self.budget)
+    
+    def _statistics(self) -> Dict[str, Any]:
+        """Running totals, profit and ROI, for get_state()."""
         # Calculate profit
         profit = (self.total_revenue - self.total_storage_costs - 
                  self.total_restock_costs - self.total_unlock_costs)
         
         # Calculate ROI
-        total_investment = self.initial_budget + self.total_restock_costs + self.total_unlock_costs
         roi = ((self.budget - self.initial_budget) / self.initial_budget * 100) if self.initial_budget > 0 else 0
         
         return {
-            'day': self.day,
-            'budget': round(self.budget, 2),
-            'initial_budget': self.initial_budget,
-            'products': [
-                {
-                    'name': p.name,
-                    'stock': p.stock,
-                    'demand_rate': p.daily_demand,
-                    'cost_storage': p.cost_storage,
-                    'cost_restock': p.cost_restock,
-                    'sale_price': p.sale_price
-                }
-                for p in self.unlocked_products
-            ],
-            'store_items': available_store_items,
-            'current_event': self.current_event.to_dict() if self.current_event else None,
-            'alerts': alerts,
-            'recommendations': recommendations,
-            'statistics': {
-                'total_revenue': round(self.total_revenue, 2),
-                'total_storage_costs': round(self.total_storage_costs, 2),
-                'total_restock_costs': round(self.total_restock_costs, 2),
-                'total_unlock_costs': round(self.total_unlock_costs, 2),
-                'total_sales': self.total_sales,
-                'total_stockouts': self.total_stockouts,
-                'profit': round(profit, 2),
-                'roi': round(roi, 2)
-            },
-            'history': {
-                'budget': self.budget_history,
-                'days': self.day_history,
-                'stock': self.stock_history
-            }
+            'total_revenue': round(self.total_revenue, 2),
+            'total_storage_costs': round(self.total_storage_costs, 2),
+            'total_restock_costs': round(self.total_restock_costs, 2),
+            'total_unlock_costs': round(self.total_unlock_costs, 2),
+            'total_sales': self.total_sales,
+            'total_stockouts': self.total_stockouts,
+            'profit': round(profit, 2),
+            'roi': round(roi, 2)
         }
     
     def get_daily_report(self) -> Dict[str, Any]:
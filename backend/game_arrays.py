@@ -0,0 +1,398 @@
+"""
+Struct-of-arrays game core for large stores and long simulation runs.
+
+ArrayStockGame plays exactly like StockGame, but keeps the per-product
+numbers in contiguous NumPy arrays, so a day's sales, stockouts, storage
+cost and reorder status are a handful of array operations instead of
+several Python loops over product objects. The API still sees
+BaseProduct-like objects through ProductView.
+"""
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from event_scheduler import spoilage_losses
+from game import StockGame, LEAD_TIME_DAYS, recommendation_entry
+from game_data import BaseProduct
+
+
+# Reorder point lead time of the game (days), as in StockGame
+GAME_LEAD_TIME_DAYS = LEAD_TIME_DAYS
+
+# Per-product array columns: (product attribute, dtype)
+COLUMNS = (
+    ('stock', np.int64),
+    ('daily_demand', np.float64),
+    ('cost_storage', np.float64),
+    ('cost_restock', np.float64),
+    ('sale_price', np.float64)
+)
+
+
+class ProductView:
+    """
+    BaseProduct-compatible view of one product row of an ArrayStockGame.
+
+    The static attributes keep their original Python values (so API output
+    keeps its int/float types); stock lives in the game's stock array.
+    """
+
+    __slots__ = ('_game', '_index', 'name', 'unlocked',
+                 '_cost_storage', '_cost_restock', '_sale_price', '_daily_demand')
+
+    def __init__(self, game: 'ArrayStockGame', index: int, product: BaseProduct):
+        self._game = game
+        self._index = index
+        self.name = product.name
+        self.unlocked = product.unlocked
+        self._cost_storage = product.cost_storage
+        self._cost_restock = product.cost_restock
+        self._sale_price = product.sale_price
+        self._daily_demand = product.daily_demand
+
+    @property
+    def stock(self) -> int:
+        return int(self._game.stock[self._index])
+
+    @stock.setter
+    def stock(self, value: int) -> None:
+        self._game.stock[self._index] = value
+
+    @property
+    def cost_storage(self) -> float:
+        return self._cost_storage
+
+    @cost_storage.setter
+    def cost_storage(self, value: float) -> None:
+        self._cost_storage = value
+        self._game.cost_storage[self._index] = value
+        self._game._refresh_targets()
+        self._game._mark_dirty(self.name)
+
+    @property
+    def cost_restock(self) -> float:
+        return self._cost_restock
+
+    @cost_restock.setter
+    def cost_restock(self, value: float) -> None:
+        self._cost_restock = value
+        self._game.cost_restock[self._index] = value
+        self._game._refresh_targets()
+        self._game._mark_dirty(self.name)
+
+    @property
+    def sale_price(self) -> float:
+        return self._sale_price
+
+    @sale_price.setter
+    def sale_price(self, value: float) -> None:
+        self._sale_price = value
+        self._game.sale_price[self._index] = value
+
+    @property
+    def daily_demand(self) -> float:
+        return self._daily_demand
+
+    @daily_demand.setter
+    def daily_demand(self, value: float) -> None:
+        self._daily_demand = value
+        self._game.daily_demand[self._index] = value
+        self._game._refresh_targets()
+        self._game._mark_dirty(self.name)
+
+    def to_dict(self) -> Dict:
+        """Convert to dictionary representation"""
+        return {
+            'name': self.name,
+            'stock': self.stock,
+            'cost_storage': self.cost_storage,
+            'cost_restock': self.cost_restock,
+            'sale_price': self.sale_price,
+            'daily_demand': self.daily_demand,
+            'unlocked': self.unlocked
+        }
+
+    def __repr__(self) -> str:
+        return f'ProductView(name={self.name!r}, stock={self.stock})'
+
+
+class ArrayStockGame(StockGame):
+    """
+    StockGame with struct-of-arrays product state.
+
+    Arrays (one entry per unlocked product, in unlock order):
+        stock (int64), daily_demand, cost_storage, cost_restock, sale_price
+        (float64), plus the derived reorder_point and eoq, which only change
+        when a product is unlocked or its parameters change.
+        name_row (int64): row of the first product with the row's name; a
+        name shared by several products refers to that one, as in StockGame.
+        dirty (bool): rows whose recommendation entry is stale.
+
+    These columns are views of buffers with spare capacity, doubled when an
+    unlock fills them, so unlocking stays amortized O(1).
+
+    unlocked_products holds a ProductView per row, so restock(), get_state()
+    and the other StockGame methods work unchanged.
+    """
+
+    def __init__(self, **kwargs):
+        """Same arguments as StockGame."""
+        super().__init__(**kwargs)
+        products = self.unlocked_products
+        self._size = len(products)
+        self._product_index: Dict[str, int] = {}
+        for index, product in enumerate(products):
+            self._product_index.setdefault(product.name, index)
+        self._buffers: Dict[str, np.ndarray] = {
+            column: np.array([getattr(product, column) for product in products], dtype=dtype)
+            for column, dtype in COLUMNS
+        }
+        self._buffers['name_row'] = np.array(
+            [self._product_index[product.name] for product in products], dtype=np.int64)
+        # Stale recommendations are tracked by row (see _mark_rows_dirty())
+        self._buffers['dirty'] = np.ones(self._size, dtype=bool)
+        del self._dirty_products
+        # Demand multipliers of the scheduler, and their array
+        self._demand_multiplier_list: Optional[List[float]] = None
+        self._demand_multipliers = np.ones(0)
+        self._set_views()
+        self._refresh_targets()
+        self.unlocked_products = [ProductView(self, index, product) for index, product in enumerate(products)]
+        self._index_products()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The column views are rebuilt from the buffers on load
+        state = self.__dict__.copy()
+        for column in self._buffers:
+            del state[column]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._set_views()
+
+    def _set_views(self) -> None:
+        """Point the column attributes at the used part of their buffers."""
+        for column, buffer in self._buffers.items():
+            setattr(self, column, buffer[:self._size])
+
+    def _add_product(self, product: BaseProduct) -> ProductView:
+        """Append a product row to the arrays and return its view."""
+        index = self._size
+        if index == len(self._buffers['stock']):
+            capacity = max(2 * index, 8)
+            for column, buffer in self._buffers.items():
+                grown = np.zeros(capacity, dtype=buffer.dtype)
+                grown[:index] = buffer
+                self._buffers[column] = grown
+        for column, _ in COLUMNS:
+            self._buffers[column][index] = getattr(product, column)
+        name_row = self._product_index.setdefault(product.name, index)
+        self._buffers['name_row'][index] = name_row
+        self._buffers['dirty'][name_row] = True
+        self._size += 1
+        self._set_views()
+        self._refresh_targets()
+        return ProductView(self, index, product)
+
+    def _refresh_targets(self) -> None:
+        """Recompute the reorder point and EOQ arrays from the product parameters."""
+        self.reorder_point = self.daily_demand * GAME_LEAD_TIME_DAYS
+        has_eoq = (self.cost_storage > 0) & (self.daily_demand > 0)
+        radicand = np.zeros(len(self.stock))
+        np.divide(2 * self.daily_demand * self.cost_restock, self.cost_storage,
+                  out=radicand, where=has_eoq)
+        self.eoq = np.sqrt(radicand)
+
+    def unlock_item(self, item_name: str) -> Dict[str, Any]:
+        """Unlock a store item (see StockGame.unlock_item) and add its array row."""
+        result = super().unlock_item(item_name)
+        if result['success']:
+            view = self.unlocked_products[-1] = self._add_product(self.unlocked_products[-1])
+            if self._product_index[view.name] == view._index:
+                self._products_by_name[view.name] = view
+        return result
+
+    def product_status(self) -> Dict[str, np.ndarray]:
+        """
+        Reorder status of every product, from the current stock.
+
+        Returns:
+            Dictionary of boolean arrays: critical (at or below the reorder
+            point) and warning (above it, but below the EOQ)
+        """
+        critical = self.stock <= self.reorder_point
+        return {
+            'critical': critical,
+            'warning': ~critical & (self.stock < self.eoq)
+        }
+
+    def _run_day(self, report_level: str = 'full',
+                 check_unlocks: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Array version of StockGame._run_day().
+
+        Same mechanics and report shapes; totals may differ from StockGame
+        in the last floating-point digits, since sums are taken over arrays.
+        """
+        full = report_level == 'full'
+        day_report = None
+        if full:
+            day_report = {
+                'day': self.day,
+                'event': None,
+                'active_events': [],
+                'sales': [],
+                'revenue': 0.0,
+                'storage_cost': 0.0,
+                'net_change': 0.0,
+                'alerts': [],
+                'recommendations': [],
+                'new_unlocks': []
+            }
+
+        # === STEP 1: Start Daily Events ===
+        started = self._start_events(day_report)
+        demand_multipliers, _ = self.events.multipliers(self.unlocked_products, self._categories)
+        if demand_multipliers is not self._demand_multiplier_list:
+            self._demand_multiplier_list = demand_multipliers
+            self._demand_multipliers = np.array(demand_multipliers)
+
+        stock = self.stock
+        spoilage = {}
+        for name, units in spoilage_losses(started).items():
+            index = self._product_index.get(name)
+            if index is not None:
+                spoilage[index] = units
+                stock[index] = max(0, int(stock[index]) - units)
+                self._mark_dirty(name)
+
+        # === STEP 2 & 3: Sales, stockouts and revenue for all products ===
+        effective_demand = self.daily_demand * self._demand_multipliers
+        # astype truncates toward zero, like int()
+        sold = np.minimum(stock, effective_demand.astype(np.int64))
+        stockout = sold < effective_demand
+        revenue = sold * self.sale_price
+        stock -= sold
+        self._mark_rows_dirty(np.flatnonzero(sold))
+
+        day_revenue = float(revenue.sum())
+        day_sold = int(sold.sum())
+        day_stockouts = int(np.count_nonzero(stockout))
+        self.total_sales += day_sold
+        self.total_stockouts += day_stockouts
+
+        # === STEP 4 & 5: Storage costs and budget ===
+        day_storage_cost = float(np.dot(stock, self.cost_storage))
+        self.budget += day_revenue - day_storage_cost
+        self.total_revenue += day_revenue
+        self.total_storage_costs += day_storage_cost
+
+        if full:
+            day_report['revenue'] = round(day_revenue, 2)
+            day_report['storage_cost'] = round(day_storage_cost, 2)
+            day_report['net_change'] = round(day_revenue - day_storage_cost, 2)
+            day_report['budget_after'] = round(self.budget, 2)
+            self._add_sales_report(day_report, effective_demand, sold, stockout, spoilage)
+            # === STEP 6 & 7: Reorder Recommendations and Alerts ===
+            self._add_recommendations(day_report)
+
+        # === STEP 8: Check for New Unlockable Items ===
+        if full or check_unlocks:
+            self._check_unlocks(day_report)
+
+        # === STEP 9: Update History ===
+        summary = None
+        if report_level == 'summary':
+            summary = {
+                'day': self.day,
+                'event': self.current_event.event_type.value if self.current_event else None,
+                'revenue': round(day_revenue, 2),
+                'storage_cost': round(day_storage_cost, 2),
+                'net_change': round(day_revenue - day_storage_cost, 2),
+                'budget_after': round(self.budget, 2),
+                'units_sold': day_sold,
+                'stockouts': day_stockouts
+            }
+
+        self._end_day(stock.tolist())
+
+        if full:
+            self.daily_reports.append(day_report)
+            return day_report
+        return summary
+
+    def _add_sales_report(self, day_report: Dict[str, Any], effective_demand: np.ndarray,
+                          sold: np.ndarray, stockout: np.ndarray,
+                          spoilage: Dict[int, int]) -> None:
+        """
+        Add the per-product sales lines and spoilage/stockout alerts to a full
+        report (spoilage: units lost per product row).
+        """
+        demand_values = effective_demand.tolist()
+        sold_values = sold.tolist()
+        stockout_values = stockout.tolist()
+        remaining = self.stock.tolist()
+
+        for i, product in enumerate(self.unlocked_products):
+            if i in spoilage:
+                spoilage_amount = spoilage[i]
+                day_report['alerts'].append({
+                    'type': 'spoilage',
+                    'severity': 'high',
+                    'product': product.name,
+                    'message': f"⚠️ SPOILAGE: {product.name} lost {spoilage_amount} units due to quality issues!",
+                    'units_lost': spoilage_amount
+                })
+
+            actual_sold = sold_values[i]
+            revenue = actual_sold * product.sale_price
+            if stockout_values[i]:
+                lost_sales = demand_values[i] - actual_sold
+                day_report['alerts'].append({
+                    'type': 'stockout',
+                    'severity': 'critical',
+                    'product': product.name,
+                    'message': f"🔴 STOCKOUT: {product.name} - Could not fulfill {lost_sales:.1f} units of demand!",
+                    'lost_sales': lost_sales,
+                    'lost_revenue': lost_sales * product.sale_price
+                })
+
+            day_report['sales'].append({
+                'product': product.name,
+                'demand': round(demand_values[i], 1),
+                'sold': actual_sold,
+                'revenue': round(revenue, 2),
+                'remaining_stock': remaining[i]
+            })
+
+    def _mark_dirty(self, *names: str) -> None:
+        """Invalidate the cached recommendations of products by name (see StockGame)."""
+        dirty = self.dirty
+        for name in names:
+            # A name unlocked just now has no row yet; _add_product() marks it
+            row = self._product_index.get(name)
+            if row is not None:
+                dirty[row] = True
+        self._recommendation_lists = None
+
+    def _mark_rows_dirty(self, rows: np.ndarray) -> None:
+        """Invalidate the cached recommendations of product rows."""
+        if len(rows):
+            self.dirty[self.name_row[rows]] = True
+            self._recommendation_lists = None
+
+    def _refresh_recommendations(self) -> None:
+        """Recompute the dirty recommendation entries from the stock and EOQ arrays."""
+        rows = np.flatnonzero(self.dirty)
+        if not len(rows):
+            return
+        self.dirty[rows] = False
+        products = self.unlocked_products
+        stock_values = self.stock[rows].tolist()
+        eoq_values = self.eoq[rows].tolist()
+        for row, stock, eoq in zip(rows.tolist(), stock_values, eoq_values):
+            product = products[row]
+            self._recommendation_cache[product.name] = recommendation_entry(
+                product.name, stock, product.daily_demand, eoq)
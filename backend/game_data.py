@@ -3,9 +3,12 @@ Game data structures for stock management game.
 Contains product definitions, store items, and daily events.
 """
 
-from dataclasses import dataclass
-from typing import List, Dict, Optional
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, fields
+from typing import List, Dict, Optional, Union
 from enum import Enum
+from operator import attrgetter
+import math
 import random
 
 
@@ -21,6 +24,42 @@ class EventType(Enum):
 
 # ========== DATA CLASSES ==========
 
+def _slotted(cls):
+    """
+    Recreate a dataclass with __slots__ instead of a per-instance __dict__
+    (dataclass(slots=True) needs Python 3.10).
+    
+    Frozen classes are immutable, so copying returns the instance itself.
+    """
+    field_names = tuple(f.name for f in fields(cls))
+    namespace = {
+        key: value for key, value in cls.__dict__.items()
+        if key not in field_names and key not in ('__dict__', '__weakref__')
+    }
+    namespace['__slots__'] = field_names
+    
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in field_names)
+    
+    def __setstate__(self, state):
+        # object.__setattr__ also works on frozen instances
+        for name, value in zip(field_names, state):
+            object.__setattr__(self, name, value)
+    
+    namespace['__getstate__'] = __getstate__
+    namespace['__setstate__'] = __setstate__
+    if cls.__dataclass_params__.frozen:
+        namespace['__copy__'] = lambda self: self
+        namespace['__deepcopy__'] = lambda self, memo: self
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
+
+
+def _spec_field(name: str) -> property:
+    """Read-only attribute of a per-game object, taken from its shared spec"""
+    return property(attrgetter('spec.' + name))
+
+
+@_slotted
 @dataclass
 class BaseProduct:
     """
@@ -48,11 +87,30 @@ class BaseProduct:
         }
 
 
-@dataclass
-class StoreItem:
+@_slotted
+@dataclass(frozen=True)
+class ProductSpec:
     """
-    Store items that can be unlocked/purchased.
-    These expand the player's product catalog.
+    Immutable template of a starting product, shared by all games.
+    """
+    name: str
+    starting_stock: int  # Stock at the start of a game
+    cost_storage: float
+    cost_restock: float
+    sale_price: float
+    daily_demand: float
+    
+    def new_product(self) -> BaseProduct:
+        """Create a game's own product from this template"""
+        return BaseProduct(self.name, self.starting_stock, self.cost_storage,
+                           self.cost_restock, self.sale_price, self.daily_demand)
+
+
+@_slotted
+@dataclass(frozen=True)
+class StoreItemSpec:
+    """
+    Immutable template of a store item, shared by all games.
     """
     name: str
     unlock_price: float      # One-time cost to unlock this product
@@ -61,10 +119,48 @@ class StoreItem:
     cost_restock: float      # Fixed cost per restock order
     sale_price: float        # Revenue per unit sold
     daily_demand: float      # Average units demanded per day
-    unlocked: bool = False   # Starts locked
     description: str = ""    # Description shown in store
     category: str = "General"  # Category for organization
     
+    def new_product(self) -> BaseProduct:
+        """Create a game's own product from this template"""
+        return BaseProduct(self.name, self.starting_stock, self.cost_storage,
+                           self.cost_restock, self.sale_price, self.daily_demand)
+
+
+class StoreItem:
+    """
+    Store items that can be unlocked/purchased.
+    These expand the player's product catalog.
+    
+    A game's store item only holds its unlocked flag; everything else is
+    read from the shared StoreItemSpec.
+    """
+    __slots__ = ('spec', 'unlocked')
+    
+    name = _spec_field('name')
+    unlock_price = _spec_field('unlock_price')
+    starting_stock = _spec_field('starting_stock')
+    cost_storage = _spec_field('cost_storage')
+    cost_restock = _spec_field('cost_restock')
+    sale_price = _spec_field('sale_price')
+    daily_demand = _spec_field('daily_demand')
+    description = _spec_field('description')
+    category = _spec_field('category')
+    
+    def __init__(self, spec: StoreItemSpec, unlocked: bool = False):
+        self.spec = spec
+        self.unlocked = unlocked  # Starts locked
+    
+    def __getstate__(self):
+        return self.spec, self.unlocked
+    
+    def __setstate__(self, state):
+        self.spec, self.unlocked = state
+    
+    def __repr__(self) -> str:
+        return f'StoreItem(name={self.name!r}, unlocked={self.unlocked})'
+    
     def to_dict(self) -> Dict:
         """Convert to dictionary representation"""
         return {
@@ -86,22 +182,19 @@ class StoreItem:
         Returns the newly created product.
         """
         self.unlocked = True
-        return BaseProduct(
-            name=self.name,
-            stock=self.starting_stock,
-            cost_storage=self.cost_storage,
-            cost_restock=self.cost_restock,
-            sale_price=self.sale_price,
-            daily_demand=self.daily_demand,
-            unlocked=True
-        )
+        return self.spec.new_product()
 
 
-@dataclass
+@_slotted
+@dataclass(frozen=True)
 class DailyEvent:
     """
     Random events that can occur during gameplay.
     Each event affects game mechanics in different ways.
+    
+    Events are immutable, so identical events are shared between games.
+    Demand and discount events apply to every product unless they target
+    a product or a category of store items.
     """
     event_type: EventType
     name: str
@@ -109,6 +202,7 @@ class DailyEvent:
     impact_multiplier: float = 1.0  # Multiplier for the effect
     affected_product: Optional[str] = None  # Specific product affected (for spoilage)
     duration_days: int = 1  # How many days the event lasts
+    affected_category: Optional[str] = None  # Category of products affected
     
     def to_dict(self) -> Dict:
         """Convert to dictionary representation"""
@@ -118,8 +212,174 @@ class DailyEvent:
             'description': self.description,
             'impact_multiplier': self.impact_multiplier,
             'affected_product': self.affected_product,
+            'affected_category': self.affected_category,
             'duration_days': self.duration_days
         }
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'DailyEvent':
+        """
+        Create an event from its to_dict() form.
+        
+        Raises:
+            ValueError: If a field is missing or invalid
+        """
+        try:
+            event_type = EventType(data['event_type'])
+            impact_multiplier = float(data.get('impact_multiplier', 1.0))
+            duration_days = int(data.get('duration_days', 1))
+            name = str(data.get('name') or event_type.value)
+        except (KeyError, TypeError, ValueError, OverflowError) as e:
+            raise ValueError(f'Invalid event: {e}')
+        if duration_days < 1:
+            raise ValueError('duration_days must be at least 1')
+        if not math.isfinite(impact_multiplier) or impact_multiplier < 0:
+            raise ValueError('impact_multiplier must be a finite, non-negative number')
+        for field in ('affected_product', 'affected_category'):
+            if not isinstance(data.get(field), (str, type(None))):
+                raise ValueError(f'{field} must be a name or null')
+        return cls(
+            event_type=event_type,
+            name=name,
+            description=str(data.get('description', '')),
+            impact_multiplier=impact_multiplier,
+            affected_product=data.get('affected_product'),
+            duration_days=duration_days,
+            affected_category=data.get('affected_category')
+        )
+
+
+# ========== STORE INDEX ==========
+
+class StoreIndex:
+    """
+    A game's store items sorted by unlock price, split into a locked and
+    an unlocked partition and bucketed by category.
+    
+    "Affordable and locked" is a bisection of the locked partition's
+    prices, so the cheapest N new unlocks are a slice. The affordable
+    flags of state() are kept between calls and only flipped for the
+    items whose unlock price the budget crossed.
+    """
+    
+    def __init__(self, items: List[StoreItem]):
+        """
+        Args:
+            items: The game's store items, in catalog order
+        """
+        self.items = items
+        # Stable sort: items of the same price stay in catalog order
+        order = sorted(range(len(items)), key=lambda i: items[i].unlock_price)
+        self._by_price = [items[i] for i in order]
+        self._prices = [item.unlock_price for item in self._by_price]
+        self._catalog_positions = order
+        self._locked = [item for item in self._by_price if not item.unlocked]
+        self._locked_prices = [item.unlock_price for item in self._locked]
+        self.unlocked = [item for item in items if item.unlocked]
+        self.categories: Dict[str, List[StoreItem]] = {}
+        for item in self._by_price:
+            self.categories.setdefault(item.category, []).append(item)
+        
+        # Items (cheapest first) that were affordable at the last set_budget()
+        self._affordable_count = 0
+        # state() entries in catalog order, built on first use; copied
+        # before a change once handed out
+        self._state: Optional[List[Dict]] = None
+        self._state_shared = False
+    
+    @property
+    def locked(self) -> List[StoreItem]:
+        """Locked items, cheapest first."""
+        return list(self._locked)
+    
+    def affordable(self, budget: float, limit: Optional[int] = None) -> List[StoreItem]:
+        """
+        Locked items that cost at most the budget, cheapest first.
+        
+        Args:
+            budget: Budget available for unlocks
+            limit: Return at most this many items
+        """
+        end = bisect_right(self._locked_prices, budget)
+        if limit is not None:
+            end = min(end, limit)
+        return self._locked[:end]
+    
+    def affordable_count(self, budget: float) -> int:
+        """Number of locked items that cost at most the budget."""
+        return bisect_right(self._locked_prices, budget)
+    
+    def unlock(self, item: StoreItem) -> BaseProduct:
+        """
+        Unlock one of the index's locked items (see StoreItem.unlock()).
+        
+        Returns:
+            The newly created product
+        """
+        position = bisect_left(self._locked_prices, item.unlock_price)
+        while self._locked[position] is not item:
+            position += 1
+        del self._locked[position]
+        del self._locked_prices[position]
+        self.unlocked.append(item)
+        product = item.unlock()
+        
+        if self._state is not None:
+            position = bisect_left(self._prices, item.unlock_price)
+            while self._by_price[position] is not item:
+                position += 1
+            self._update_entry(self._catalog_positions[position], unlocked=True)
+        return product
+    
+    def set_budget(self, budget: float) -> bool:
+        """
+        Move the affordability threshold to a new budget.
+        
+        Returns:
+            True if any item's affordable flag changed
+        """
+        count = bisect_right(self._prices, budget)
+        previous = self._affordable_count
+        if count == previous:
+            return False
+        self._affordable_count = count
+        if self._state is not None:
+            affordable = count > previous
+            for position in self._catalog_positions[min(count, previous):max(count, previous)]:
+                self._update_entry(position, affordable=affordable)
+        return True
+    
+    def _update_entry(self, position: int, **changes) -> None:
+        if self._state_shared:
+            self._state = list(self._state)
+            self._state_shared = False
+        self._state[position] = dict(self._state[position], **changes)
+    
+    def state(self, budget: float) -> List[Dict]:
+        """
+        Store items with their affordability, in catalog order.
+        
+        The entries are shared between calls and must not be modified.
+        """
+        self.set_budget(budget)
+        if self._state is None:
+            affordable = set(self._catalog_positions[:self._affordable_count])
+            self._state = [
+                {
+                    'name': item.name,
+                    'unlock_price': item.unlock_price,
+                    'starting_stock': item.starting_stock,
+                    'daily_demand': item.daily_demand,
+                    'sale_price': item.sale_price,
+                    'category': item.category,
+                    'description': item.description,
+                    'unlocked': item.unlocked,
+                    'affordable': position in affordable
+                }
+                for position, item in enumerate(self.items)
+            ]
+        self._state_shared = True
+        return self._state
 
 
 # ========== GAME DATA CATALOG ==========
@@ -127,205 +387,232 @@ class DailyEvent:
 class GameCatalog:
     """
     Central catalog containing all base products, store items, and possible events.
+    
+    The catalog is built once into immutable templates; games only create
+    the objects holding their own stock and unlocked flags.
     """
     
+    # Starting products of every game
+    BASE_PRODUCTS = (
+        ProductSpec(
+            name="Office Chair",
+            starting_stock=50,
+            cost_storage=0.5,
+            cost_restock=50,
+            sale_price=10,
+            daily_demand=15
+        ),
+        ProductSpec(
+            name="Desk Lamp",
+            starting_stock=30,
+            cost_storage=0.3,
+            cost_restock=30,
+            sale_price=15,
+            daily_demand=8
+        ),
+        ProductSpec(
+            name="Water Bottle",
+            starting_stock=20,
+            cost_storage=0.8,
+            cost_restock=40,
+            sale_price=20,
+            daily_demand=5
+        )
+    )
+    
+    # Unlockable store items, organized by category and difficulty
+    STORE_ITEMS = (
+        # === ELECTRONICS CATEGORY ===
+        StoreItemSpec(
+            name="Smartphone",
+            unlock_price=500,
+            starting_stock=10,
+            cost_storage=2.0,
+            cost_restock=200,
+            sale_price=150,
+            daily_demand=3,
+            description="High-value electronics with steady demand",
+            category="Electronics"
+        ),
+        StoreItemSpec(
+            name="Laptop",
+            unlock_price=1000,
+            starting_stock=5,
+            cost_storage=3.5,
+            cost_restock=400,
+            sale_price=300,
+            daily_demand=2,
+            description="Premium product with high profit margins",
+            category="Electronics"
+        ),
+        StoreItemSpec(
+            name="Headphones",
+            unlock_price=200,
+            starting_stock=25,
+            cost_storage=0.4,
+            cost_restock=80,
+            sale_price=30,
+            daily_demand=10,
+            description="Popular accessory with high turnover",
+            category="Electronics"
+        ),
+        
+        # === FOOD & BEVERAGE CATEGORY ===
+        StoreItemSpec(
+            name="Energy Drink",
+            unlock_price=150,
+            starting_stock=100,
+            cost_storage=0.2,
+            cost_restock=50,
+            sale_price=5,
+            daily_demand=25,
+            description="Fast-moving consumable with high demand",
+            category="Food & Beverage"
+        ),
+        StoreItemSpec(
+            name="Snack Box",
+            unlock_price=100,
+            starting_stock=80,
+            cost_storage=0.15,
+            cost_restock=40,
+            sale_price=4,
+            daily_demand=30,
+            description="Low-cost, high-volume product",
+            category="Food & Beverage"
+        ),
+        StoreItemSpec(
+            name="Premium Coffee",
+            unlock_price=300,
+            starting_stock=40,
+            cost_storage=0.6,
+            cost_restock=100,
+            sale_price=12,
+            daily_demand=15,
+            description="Specialty item with loyal customers",
+            category="Food & Beverage"
+        ),
+        
+        # === OFFICE SUPPLIES CATEGORY ===
+        StoreItemSpec(
+            name="Notebook Set",
+            unlock_price=80,
+            starting_stock=60,
+            cost_storage=0.25,
+            cost_restock=35,
+            sale_price=8,
+            daily_demand=12,
+            description="Steady seller for students and professionals",
+            category="Office Supplies"
+        ),
+        StoreItemSpec(
+            name="Pen Pack",
+            unlock_price=50,
+            starting_stock=100,
+            cost_storage=0.1,
+            cost_restock=20,
+            sale_price=3,
+            daily_demand=20,
+            description="Essential item with consistent demand",
+            category="Office Supplies"
+        ),
+        
+        # === PREMIUM CATEGORY ===
+        StoreItemSpec(
+            name="Designer Watch",
+            unlock_price=2000,
+            starting_stock=3,
+            cost_storage=5.0,
+            cost_restock=800,
+            sale_price=500,
+            daily_demand=1,
+            description="Luxury item with exceptional profit potential",
+            category="Premium"
+        ),
+        StoreItemSpec(
+            name="Gaming Console",
+            unlock_price=1500,
+            starting_stock=8,
+            cost_storage=4.0,
+            cost_restock=600,
+            sale_price=400,
+            daily_demand=2,
+            description="High-demand gaming product",
+            category="Premium"
+        )
+    )
+    
+    # Events without random parameters are shared; discounts by percent
+    DEMAND_SPIKE_EVENT = DailyEvent(
+        event_type=EventType.DEMAND_SPIKE,
+        name="📈 Demand Surge!",
+        description="Market trends boost demand by 20% today!",
+        impact_multiplier=1.2
+    )
+    CALM_DAY_EVENT = DailyEvent(
+        event_type=EventType.CALM_DAY,
+        name="😴 Slow Business Day",
+        description="Customer traffic is down. Demand reduced by 20% today.",
+        impact_multiplier=0.8
+    )
+    DISCOUNT_EVENTS = {
+        discount_percent: DailyEvent(
+            event_type=EventType.SUPPLIER_DISCOUNT,
+            name="💰 Supplier Sale!",
+            description=f"Your suppliers offer a {discount_percent}% discount on restock costs today!",
+            impact_multiplier=1.0 - (discount_percent / 100.0)
+        )
+        for discount_percent in range(10, 21)
+    }
+    EVENT_TYPES = tuple(EventType)
+    
     @staticmethod
     def get_base_products() -> List[BaseProduct]:
         """
         Returns the starting products available in the game.
         """
-        return [
-            BaseProduct(
-                name="Office Chair",
-                stock=50,
-                cost_storage=0.5,
-                cost_restock=50,
-                sale_price=10,
-                daily_demand=15
-            ),
-            BaseProduct(
-                name="Desk Lamp",
-                stock=30,
-                cost_storage=0.3,
-                cost_restock=30,
-                sale_price=15,
-                daily_demand=8
-            ),
-            BaseProduct(
-                name="Water Bottle",
-                stock=20,
-                cost_storage=0.8,
-                cost_restock=40,
-                sale_price=20,
-                daily_demand=5
-            )
-        ]
+        return [spec.new_product() for spec in GameCatalog.BASE_PRODUCTS]
     
     @staticmethod
     def get_store_items() -> List[StoreItem]:
         """
-        Returns all unlockable store items.
+        Returns all unlockable store items, locked.
         Organized by category and difficulty.
         """
-        return [
-            # === ELECTRONICS CATEGORY ===
-            StoreItem(
-                name="Smartphone",
-                unlock_price=500,
-                starting_stock=10,
-                cost_storage=2.0,
-                cost_restock=200,
-                sale_price=150,
-                daily_demand=3,
-                description="High-value electronics with steady demand",
-                category="Electronics"
-            ),
-            StoreItem(
-                name="Laptop",
-                unlock_price=1000,
-                starting_stock=5,
-                cost_storage=3.5,
-                cost_restock=400,
-                sale_price=300,
-                daily_demand=2,
-                description="Premium product with high profit margins",
-                category="Electronics"
-            ),
-            StoreItem(
-                name="Headphones",
-                unlock_price=200,
-                starting_stock=25,
-                cost_storage=0.4,
-                cost_restock=80,
-                sale_price=30,
-                daily_demand=10,
-                description="Popular accessory with high turnover",
-                category="Electronics"
-            ),
-            
-            # === FOOD & BEVERAGE CATEGORY ===
-            StoreItem(
-                name="Energy Drink",
-                unlock_price=150,
-                starting_stock=100,
-                cost_storage=0.2,
-                cost_restock=50,
-                sale_price=5,
-                daily_demand=25,
-                description="Fast-moving consumable with high demand",
-                category="Food & Beverage"
-            ),
-            StoreItem(
-                name="Snack Box",
-                unlock_price=100,
-                starting_stock=80,
-                cost_storage=0.15,
-                cost_restock=40,
-                sale_price=4,
-                daily_demand=30,
-                description="Low-cost, high-volume product",
-                category="Food & Beverage"
-            ),
-            StoreItem(
-                name="Premium Coffee",
-                unlock_price=300,
-                starting_stock=40,
-                cost_storage=0.6,
-                cost_restock=100,
-                sale_price=12,
-                daily_demand=15,
-                description="Specialty item with loyal customers",
-                category="Food & Beverage"
-            ),
-            
-            # === OFFICE SUPPLIES CATEGORY ===
-            StoreItem(
-                name="Notebook Set",
-                unlock_price=80,
-                starting_stock=60,
-                cost_storage=0.25,
-                cost_restock=35,
-                sale_price=8,
-                daily_demand=12,
-                description="Steady seller for students and professionals",
-                category="Office Supplies"
-            ),
-            StoreItem(
-                name="Pen Pack",
-                unlock_price=50,
-                starting_stock=100,
-                cost_storage=0.1,
-                cost_restock=20,
-                sale_price=3,
-                daily_demand=20,
-                description="Essential item with consistent demand",
-                category="Office Supplies"
-            ),
-            
-            # === PREMIUM CATEGORY ===
-            StoreItem(
-                name="Designer Watch",
-                unlock_price=2000,
-                starting_stock=3,
-                cost_storage=5.0,
-                cost_restock=800,
-                sale_price=500,
-                daily_demand=1,
-                description="Luxury item with exceptional profit potential",
-                category="Premium"
-            ),
-            StoreItem(
-                name="Gaming Console",
-                unlock_price=1500,
-                starting_stock=8,
-                cost_storage=4.0,
-                cost_restock=600,
-                sale_price=400,
-                daily_demand=2,
-                description="High-demand gaming product",
-                category="Premium"
-            )
-        ]
+        return [StoreItem(spec) for spec in GameCatalog.STORE_ITEMS]
     
     @staticmethod
-    def generate_random_event(products: List[BaseProduct]) -> Optional[DailyEvent]:
+    def generate_random_event(products: List[BaseProduct],
+                              rng: Optional[random.Random] = None) -> Optional[DailyEvent]:
         """
         Generates a random daily event.
         Returns None for "no event" days (50% chance).
         
         Args:
             products: List of current products for spoilage targeting
+            rng: Random generator to draw from (the global one if None)
             
         Returns:
             DailyEvent or None
         """
+        if rng is None:
+            rng = random
+        
         # 50% chance of no event
-        if random.random() < 0.5:
+        if rng.random() < 0.5:
             return None
         
-        event_type = random.choice(list(EventType))
+        event_type = rng.choice(GameCatalog.EVENT_TYPES)
         
         if event_type == EventType.DEMAND_SPIKE:
-            return DailyEvent(
-                event_type=EventType.DEMAND_SPIKE,
-                name="📈 Demand Surge!",
-                description="Market trends boost demand by 20% today!",
-                impact_multiplier=1.2
-            )
+            return GameCatalog.DEMAND_SPIKE_EVENT
         
         elif event_type == EventType.SUPPLIER_DISCOUNT:
-            discount_percent = random.randint(10, 20)
-            return DailyEvent(
-                event_type=EventType.SUPPLIER_DISCOUNT,
-                name="💰 Supplier Sale!",
-                description=f"Your suppliers offer a {discount_percent}% discount on restock costs today!",
-                impact_multiplier=1.0 - (discount_percent / 100.0)
-            )
+            return GameCatalog.DISCOUNT_EVENTS[rng.randint(10, 20)]
         
         elif event_type == EventType.SPOILAGE:
             if products:
-                affected = random.choice(products)
-                spoilage_amount = random.randint(1, max(1, int(affected.stock * 0.15)))  # Up to 15% loss
+                affected = rng.choice(products)
+                spoilage_amount = rng.randint(1, max(1, int(affected.stock * 0.15)))  # Up to 15% loss
                 return DailyEvent(
                     event_type=EventType.SPOILAGE,
                     name="⚠️ Product Spoilage!",
@@ -337,12 +624,7 @@ class GameCatalog:
                 return None
         
         elif event_type == EventType.CALM_DAY:
-            return DailyEvent(
-                event_type=EventType.CALM_DAY,
-                name="😴 Slow Business Day",
-                description="Customer traffic is down. Demand reduced by 20% today.",
-                impact_multiplier=0.8
-            )
+            return GameCatalog.CALM_DAY_EVENT
         
         return None
     
@@ -359,16 +641,19 @@ class GameCatalog:
 
 # ========== HELPER FUNCTIONS ==========
 
-def get_products_by_category(store_items: List[StoreItem]) -> Dict[str, List[StoreItem]]:
+def get_products_by_category(store_items: Union[List[StoreItem], StoreIndex]) -> Dict[str, List[StoreItem]]:
     """
     Organize store items by category.
     
     Args:
-        store_items: List of store items to organize
+        store_items: List of store items to organize, or a StoreIndex
+            (whose buckets are sorted by unlock price)
         
     Returns:
         Dictionary mapping category names to lists of items
     """
+    if isinstance(store_items, StoreIndex):
+        return {category: list(items) for category, items in store_items.categories.items()}
     categories = {}
     for item in store_items:
         if item.category not in categories:
@@ -377,17 +662,21 @@ def get_products_by_category(store_items: List[StoreItem]) -> Dict[str, List[Sto
     return categories
 
 
-def get_unlockable_items(store_items: List[StoreItem], max_budget: float) -> List[StoreItem]:
+def get_unlockable_items(store_items: Union[List[StoreItem], StoreIndex],
+                         max_budget: float) -> List[StoreItem]:
     """
     Get store items that can be unlocked with the current budget.
     
     Args:
-        store_items: List of all store items
+        store_items: List of all store items, or a StoreIndex (bisected
+            instead of scanned; items come cheapest first)
         max_budget: Current player budget
         
     Returns:
         List of affordable, locked items
     """
+    if isinstance(store_items, StoreIndex):
+        return store_items.affordable(max_budget)
     return [
         item for item in store_items
         if not item.unlocked and item.unlock_price <= max_budget
@@ -0,0 +1,227 @@
+"""
+Server-Sent Events channels for watching game sessions.
+
+Every session with watchers has a channel. Changes to its game are
+published once as preformatted SSE messages (state deltas since the
+previous message, day reports, action results) and fanned out to the
+bounded queue of every subscriber. A subscriber that falls too far
+behind is resynchronized with a full state instead of blocking the game.
+"""
+
+import json
+import threading
+from collections import deque
+from queue import Full, Queue
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Messages a subscriber may have waiting before it is resynchronized
+DEFAULT_SUBSCRIBER_QUEUE = 256
+
+# Recent messages kept per channel for reconnecting clients (Last-Event-ID)
+DEFAULT_BACKLOG = 64
+
+# Watchers allowed per session
+DEFAULT_MAX_SUBSCRIBERS = 16
+
+# Queue markers: the channel was closed / the subscriber must resync
+CLOSED = object()
+RESYNC = object()
+
+
+def sse_message(event: str, data: Any, event_id: Optional[int] = None) -> str:
+    """Format one Server-Sent Events message with a JSON payload."""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append('data: ' + json.dumps(data, separators=(',', ':')))
+    return '\n'.join(lines) + '\n\n'
+
+
+class Subscriber:
+    """One watcher's queue of pending messages."""
+
+    def __init__(self, max_queue: int):
+        self.queue: 'Queue' = Queue(max_queue)
+
+
+class _Channel:
+    def __init__(self, backlog: int):
+        self.subscribers: List[Subscriber] = []
+        self.last_id = 0
+        self.backlog: 'deque[Tuple[int, str]]' = deque(maxlen=backlog)
+        # State (game and version) the last state message brought watchers to
+        self.game_id: Optional[str] = None
+        self.version: Optional[int] = None
+
+
+class EventBroker:
+    """
+    Thread-safe SSE channels keyed by session ID.
+
+    Publishing costs nothing for sessions nobody watches, so the game
+    endpoints can publish unconditionally.
+    """
+
+    def __init__(self, max_queue: int = DEFAULT_SUBSCRIBER_QUEUE,
+                 backlog: int = DEFAULT_BACKLOG,
+                 max_subscribers: int = DEFAULT_MAX_SUBSCRIBERS):
+        """
+        Args:
+            max_queue: Pending messages per subscriber before a resync
+            backlog: Messages kept per channel for reconnecting clients
+            max_subscribers: Watchers allowed per session
+        """
+        self.max_queue = max_queue
+        self.backlog = backlog
+        self.max_subscribers = max_subscribers
+        self._channels: Dict[str, _Channel] = {}
+        self._lock = threading.Lock()
+        self.published = 0
+        self.resyncs = 0
+
+    def watched(self, session_id: str) -> bool:
+        """True if the session has at least one subscriber."""
+        with self._lock:
+            return session_id in self._channels
+
+    def publish(self, session_id: str, event: str, data: Any) -> None:
+        """Send a message to every watcher of a session (no-op if unwatched)."""
+        with self._lock:
+            channel = self._channels.get(session_id)
+            if channel is not None:
+                self._send(channel, event, data)
+
+    def publish_state(self, session_id: str, game, event: Optional[str] = None,
+                      data: Any = None) -> None:
+        """
+        Send an optional event, then the state changes since the last state
+        message, to a session's watchers.
+
+        Call with the session lock held, after every change to the game.
+        """
+        with self._lock:
+            channel = self._channels.get(session_id)
+            if channel is None:
+                return
+            if event is not None:
+                self._send(channel, event, data)
+            since = channel.version if channel.game_id == game.game_id else None
+            if since == game.version:
+                return
+            self._send(channel, 'state', game.get_state(since_version=since))
+            channel.game_id = game.game_id
+            channel.version = game.version
+
+    def _send(self, channel: _Channel, event: str, data: Any) -> None:
+        channel.last_id += 1
+        message = sse_message(event, data, channel.last_id)
+        channel.backlog.append((channel.last_id, message))
+        self.published += 1
+        for subscriber in channel.subscribers:
+            try:
+                subscriber.queue.put_nowait(message)
+            except Full:
+                # Too slow: drop what it has not read and resync it
+                self._drain(subscriber)
+                subscriber.queue.put_nowait(RESYNC)
+                self.resyncs += 1
+
+    @staticmethod
+    def _drain(subscriber: Subscriber) -> None:
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+
+    def subscribe(self, session_id: str, game,
+                  last_event_id: Optional[int] = None) -> Tuple[Subscriber, List[str]]:
+        """
+        Add a watcher to a session. Call with the session lock held.
+
+        Args:
+            session_id: Session to watch
+            game: The session's game
+            last_event_id: ID of the last message a reconnecting client got
+
+        Returns:
+            The subscriber and the messages to send it first: the ones it
+            missed if they are all still in the backlog, otherwise a full
+            state
+
+        Raises:
+            ValueError: If the session already has max_subscribers watchers
+        """
+        with self._lock:
+            channel = self._channels.get(session_id)
+            if channel is None:
+                channel = self._channels[session_id] = _Channel(self.backlog)
+            if len(channel.subscribers) >= self.max_subscribers:
+                raise ValueError(f'At most {self.max_subscribers} watchers per session')
+
+            subscriber = Subscriber(self.max_queue)
+            channel.subscribers.append(subscriber)
+
+            oldest = channel.backlog[0][0] if channel.backlog else channel.last_id + 1
+            if (last_event_id is not None and oldest - 1 <= last_event_id <= channel.last_id
+                    and channel.game_id == game.game_id):
+                initial = [message for event_id, message in channel.backlog if event_id > last_event_id]
+            else:
+                initial = [self.state_message(channel, game)]
+            return subscriber, initial
+
+    def resync_message(self, session_id: str, subscriber: Subscriber, game) -> str:
+        """
+        Full state message for a subscriber that fell behind. Call with the
+        session lock held.
+
+        Messages still queued for the subscriber predate this state, so
+        they are dropped.
+        """
+        with self._lock:
+            channel = self._channels.get(session_id)
+            if channel is None or subscriber not in channel.subscribers:
+                # Closed meanwhile: keep the CLOSED marker for the stream
+                return sse_message('state', game.get_state())
+            self._drain(subscriber)
+            return self.state_message(channel, game)
+
+    @staticmethod
+    def state_message(channel: _Channel, game) -> str:
+        channel.game_id = game.game_id
+        channel.version = game.version
+        return sse_message('state', game.get_state(), channel.last_id)
+
+    def unsubscribe(self, session_id: str, subscriber: Subscriber) -> None:
+        """Remove a watcher; the channel goes away with its last watcher."""
+        with self._lock:
+            channel = self._channels.get(session_id)
+            if channel is None:
+                return
+            if subscriber in channel.subscribers:
+                channel.subscribers.remove(subscriber)
+            if not channel.subscribers:
+                del self._channels[session_id]
+
+    def close(self, session_id: str) -> None:
+        """Tell a session's watchers the game ended and end their streams."""
+        with self._lock:
+            channel = self._channels.pop(session_id, None)
+            if channel is None:
+                return
+            self._send(channel, 'end', {'session_id': session_id})
+            for subscriber in channel.subscribers:
+                try:
+                    subscriber.queue.put_nowait(CLOSED)
+                except Full:
+                    self._drain(subscriber)
+                    subscriber.queue.put_nowait(CLOSED)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Channel and subscriber counts and message counters."""
+        with self._lock:
+            return {
+                'watched_sessions': len(self._channels),
+                'subscribers': sum(len(channel.subscribers) for channel in self._channels.values()),
+                'published': self.published,
+                'resyncs': self.resyncs
+            }
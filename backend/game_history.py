@@ -0,0 +1,172 @@
+"""
+Bounded, typed history storage for games.
+
+Each time series is a HistoryBuffer: a NumPy ring buffer addressed by
+absolute point index (point i is the end of game day i + 1), keeping at
+most `retention` points. Old points are dropped from the front, so the
+memory of a game no longer grows with its length.
+
+Also provides LTTB downsampling for chart queries.
+"""
+
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+# History points kept per series (0 keeps everything)
+DEFAULT_HISTORY_RETENTION = int(os.environ.get('GAME_HISTORY_RETENTION', 3650))
+
+# Full daily reports kept for get_daily_report()
+DEFAULT_REPORT_RETENTION = int(os.environ.get('GAME_REPORT_RETENTION', 30))
+
+_INITIAL_CAPACITY = 64
+
+
+class HistoryBuffer:
+    """
+    Append-only time series with absolute indices and bounded retention.
+
+    Points are addressed by absolute index; first_index is the oldest
+    retained point and end_index is one past the newest.
+    """
+
+    def __init__(self, dtype=np.float64, retention: Optional[int] = None,
+                 first_index: int = 0):
+        """
+        Args:
+            dtype: NumPy dtype of the values
+            retention: Points kept at most (None or 0 = unbounded)
+            first_index: Absolute index of the first point to be appended
+        """
+        self.retention = retention or None
+        capacity = _INITIAL_CAPACITY
+        if self.retention is not None:
+            capacity = min(capacity, self.retention)
+        self._data = np.empty(capacity, dtype=dtype)
+        self._head = 0
+        self._count = 0
+        self.first_index = first_index
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def end_index(self) -> int:
+        """Absolute index one past the newest point."""
+        return self.first_index + self._count
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes allocated for the values."""
+        return self._data.nbytes
+
+    def append(self, value) -> None:
+        """Append a point, dropping the oldest one when retention is reached."""
+        capacity = len(self._data)
+        if self._count == capacity:
+            if self.retention is not None and capacity >= self.retention:
+                # Full ring: overwrite the oldest point
+                self._data[self._head] = value
+                self._head = (self._head + 1) % capacity
+                self.first_index += 1
+                return
+            # Still growing (the ring has not wrapped yet, so head is 0)
+            new_capacity = capacity * 2
+            if self.retention is not None:
+                new_capacity = min(new_capacity, self.retention)
+            grown = np.empty(new_capacity, dtype=self._data.dtype)
+            grown[:capacity] = self._data
+            self._data = grown
+        self._data[(self._head + self._count) % len(self._data)] = value
+        self._count += 1
+
+    def values(self, start: Optional[int] = None, stop: Optional[int] = None) -> np.ndarray:
+        """
+        Retained points with absolute indices in [start, stop), in order.
+
+        Bounds default to, and are clamped to, the retained range.
+        """
+        start = self.first_index if start is None else max(start, self.first_index)
+        stop = self.end_index if stop is None else min(stop, self.end_index)
+        if stop <= start:
+            return self._data[:0].copy()
+        capacity = len(self._data)
+        begin = (self._head + start - self.first_index) % capacity
+        count = stop - start
+        if begin + count <= capacity:
+            return self._data[begin:begin + count].copy()
+        return np.concatenate((self._data[begin:], self._data[:begin + count - capacity]))
+
+    def tolist(self, start: Optional[int] = None, stop: Optional[int] = None) -> List[Any]:
+        """values() as a list of Python numbers."""
+        return self.values(start, stop).tolist()
+
+    def last(self):
+        """Newest point."""
+        return self._data[(self._head + self._count - 1) % len(self._data)].item()
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Keeps the first and last points and, from each of threshold - 2
+    buckets in between, the point forming the largest triangle with the
+    previously kept point and the mean of the next bucket. This preserves
+    the visual shape of a line chart far better than striding.
+
+    Args:
+        x, y: Series coordinates (x increasing)
+        threshold: Number of points to keep
+
+    Returns:
+        Indices of the kept points, increasing
+    """
+    count = len(x)
+    if threshold >= count:
+        return np.arange(count)
+    if threshold < 3:
+        return np.array([0, count - 1][:max(threshold, 0)], dtype=np.int64)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, count - 1, threshold - 1).astype(np.int64)
+
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0] = 0
+    kept[-1] = count - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        # Mean of the next bucket (the last point for the final bucket)
+        next_stop = edges[bucket + 2] if bucket + 2 < len(edges) else count
+        next_start = stop if bucket + 2 < len(edges) else count - 1
+        mean_x = x[next_start:next_stop].mean()
+        mean_y = y[next_start:next_stop].mean()
+
+        area = np.abs(
+            (x[previous] - mean_x) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (mean_y - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        kept[bucket + 1] = previous
+    return kept
+
+
+def series_query(buffer: HistoryBuffer, start: int, stop: int,
+                 max_points: Optional[int] = None) -> Dict[str, Any]:
+    """
+    One chart series over an absolute index range, optionally downsampled.
+
+    Returns:
+        Dictionary with 'days' (game day of each point) and 'values'
+    """
+    values = buffer.values(start, stop)
+    first = max(start, buffer.first_index)
+    days = np.arange(first + 1, first + 1 + len(values))
+    if max_points is not None and len(values) > max_points:
+        kept = lttb(days, values, max_points)
+        days, values = days[kept], values[kept]
+    return {'days': days.tolist(), 'values': values.tolist()}
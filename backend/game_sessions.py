@@ -0,0 +1,234 @@
+"""
+Registry of concurrent game sessions.
+
+Every player gets a session ID (sent in the X-Session-ID header) that maps
+to their own game. Each session has its own lock, so requests of one
+player are serialized without blocking anyone else. Idle sessions expire
+after a TTL, and the least recently used session is evicted when the
+registry is full.
+"""
+
+import hashlib
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+
+SESSION_HEADER = 'X-Session-ID'
+DEFAULT_SESSION_ID = 'default'
+
+# Idle time after which a session is dropped
+DEFAULT_SESSION_TTL = 3600
+
+# Sessions kept at most; the least recently used one is evicted beyond this
+DEFAULT_MAX_SESSIONS = 10000
+
+_SESSION_ID = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+def valid_session_id(session_id: str) -> bool:
+    """True for 1-64 character IDs made of letters, digits, "_" and "-"."""
+    return bool(_SESSION_ID.match(session_id))
+
+
+def new_session_id() -> str:
+    """Random, unguessable session ID."""
+    return uuid.uuid4().hex
+
+
+def estimate_size(obj: Any) -> int:
+    """
+    Approximate deep memory footprint of an object graph, in bytes.
+
+    Follows containers, instance __dict__ and __slots__, and counts NumPy
+    array buffers; shared objects are counted once.
+    """
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        current = stack.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+        total += sys.getsizeof(current)
+
+        if isinstance(current, np.ndarray):
+            if current.base is None:
+                total += current.nbytes
+            continue
+        if isinstance(current, (str, bytes, int, float, bool, type(None), type)):
+            continue
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            stack.extend(current)
+        if hasattr(current, '__dict__'):
+            stack.append(vars(current))
+        for slot in getattr(type(current), '__slots__', ()):
+            if hasattr(current, slot):
+                stack.append(getattr(current, slot))
+    return total
+
+
+class GameSession:
+    """One player's game, its lock and its access times."""
+
+    def __init__(self, session_id: str, game: Any, now: float):
+        self.session_id = session_id
+        self.game = game
+        self.lock = threading.RLock()
+        self.created_at = now
+        self.last_access = now
+
+    def info(self, now: float) -> Dict[str, Any]:
+        """
+        Session hash, game day and ages in seconds.
+
+        The session ID is the player's only credential, so it is never
+        listed; session_hash (see session_hash()) identifies it instead.
+        """
+        return {
+            'session_hash': session_hash(self.session_id),
+            'day': getattr(self.game, 'day', None),
+            'age_seconds': round(now - self.created_at, 1),
+            'idle_seconds': round(now - self.last_access, 1)
+        }
+
+
+def session_hash(session_id: str) -> str:
+    """Short SHA-256 digest of a session ID, safe to show to other clients."""
+    return hashlib.sha256(session_id.encode('utf-8')).hexdigest()[:16]
+
+
+class SessionRegistry:
+    """
+    Thread-safe game sessions keyed by session ID, in least recently
+    used order.
+
+    Expired sessions are dropped lazily, on every create/get, so no
+    background thread is needed.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_SESSION_TTL,
+                 max_sessions: int = DEFAULT_MAX_SESSIONS,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            ttl: Idle seconds before a session expires
+            max_sessions: Sessions kept at most
+            clock: Time source (monotonic seconds)
+        """
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.clock = clock
+        self._sessions: 'OrderedDict[str, GameSession]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    def _expire(self, now: float) -> None:
+        """Drop idle sessions; they sit at the LRU end, so stop at the first live one."""
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_access <= self.ttl:
+                break
+            self._sessions.popitem(last=False)
+            self.expired += 1
+
+    def create(self, game_factory: Callable[[], Any],
+               session_id: Optional[str] = None) -> GameSession:
+        """
+        Start a game in a session, replacing any game it already had.
+
+        Args:
+            game_factory: Callable returning the new game
+            session_id: Session to (re)start; a new ID is generated if None
+
+        Returns:
+            The session
+        """
+        if session_id is None:
+            session_id = new_session_id()
+        elif not valid_session_id(session_id):
+            raise ValueError('Session IDs are 1-64 letters, digits, "_" or "-"')
+
+        # Build the game outside the registry lock
+        game = game_factory()
+        now = self.clock()
+        with self._lock:
+            self._expire(now)
+            self._sessions.pop(session_id, None)
+            while len(self._sessions) >= self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted += 1
+            session = self._sessions[session_id] = GameSession(session_id, game, now)
+            self.created += 1
+        return session
+
+    def get(self, session_id: str) -> Optional[GameSession]:
+        """Return a live session (marking it used), or None."""
+        now = self.clock()
+        with self._lock:
+            self._expire(now)
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.last_access = now
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def delete(self, session_id: str) -> bool:
+        """End a session. Returns False if it did not exist."""
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def metrics(self, include_memory: bool = False) -> Dict[str, Any]:
+        """
+        Registry counters, optionally with per-session memory estimates.
+
+        Memory estimation walks every game object graph, so it is only
+        done on request.
+        """
+        now = self.clock()
+        with self._lock:
+            self._expire(now)
+            sessions = list(self._sessions.values())
+            metrics = {
+                'live_sessions': len(sessions),
+                'max_sessions': self.max_sessions,
+                'ttl_seconds': self.ttl,
+                'created': self.created,
+                'expired': self.expired,
+                'evicted': self.evicted
+            }
+
+        if include_memory:
+            sizes = []
+            for session in sessions:
+                with session.lock:
+                    sizes.append(estimate_size(session.game))
+            metrics['memory'] = {
+                'total_bytes': sum(sizes),
+                'mean_bytes_per_session': round(sum(sizes) / len(sizes)) if sizes else 0,
+                'max_bytes_per_session': max(sizes) if sizes else 0
+            }
+        return metrics
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Info dicts of the live sessions, least recently used first."""
+        now = self.clock()
+        with self._lock:
+            self._expire(now)
+            return [session.info(now) for session in self._sessions.values()]
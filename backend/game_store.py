@@ -0,0 +1,385 @@
+"""
+Event-sourced persistence of game sessions in SQLite.
+
+Every successful action of a game (its action_log, see StockGame.replay)
+is appended to an action table, and every so often a compressed pickle
+snapshot of the game is written and the actions before it are dropped. A
+game is resumed by loading its latest snapshot and replaying the actions
+recorded after it.
+
+Writes go through a background thread that commits them in batches, so
+requests never wait for the disk; at most flush_interval seconds of
+actions are lost if the process dies. A batch that fails to commit is
+logged and dropped, the writer carries on with the next one, and every
+game is stored again from a fresh snapshot on its next change.
+
+A game whose stored actions no longer replay (e.g. after a rule change)
+is resumed after the last action that does, and rewritten from there.
+"""
+
+import json
+import logging
+import os
+import pickle
+import queue
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+# SQLite file of the store ('' disables persistence)
+DEFAULT_STORE_PATH = os.environ.get('GAME_STORE_PATH', '')
+
+# Seconds between batched commits
+DEFAULT_FLUSH_INTERVAL = float(os.environ.get('GAME_STORE_FLUSH_INTERVAL', 0.5))
+
+# Seconds flush() waits for the writer thread before giving up
+DEFAULT_FLUSH_TIMEOUT = float(os.environ.get('GAME_STORE_FLUSH_TIMEOUT', 10))
+
+# A snapshot is taken after this many simulated days or logged actions. The
+# game is pickled on the request thread, under the session lock, so that the
+# snapshot is consistent (about 3 ms for ten years of history); compression
+# and the write happen on the writer thread.
+DEFAULT_SNAPSHOT_DAYS = int(os.environ.get('GAME_SNAPSHOT_DAYS', 100))
+DEFAULT_SNAPSHOT_ACTIONS = int(os.environ.get('GAME_SNAPSHOT_ACTIONS', 500))
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS games ('
+    ' session_id TEXT PRIMARY KEY, game_id TEXT NOT NULL, updated_at REAL NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS game_actions ('
+    ' game_id TEXT NOT NULL, seq INTEGER NOT NULL, day INTEGER NOT NULL,'
+    ' action TEXT NOT NULL, args TEXT NOT NULL, PRIMARY KEY (game_id, seq))',
+    'CREATE TABLE IF NOT EXISTS game_snapshots ('
+    ' game_id TEXT NOT NULL, seq INTEGER NOT NULL, day INTEGER NOT NULL,'
+    ' data BLOB NOT NULL, PRIMARY KEY (game_id, seq))'
+)
+
+
+def log_tail(action_log: List[Tuple[int, str, Dict[str, Any]]], count: int,
+             last_days: int) -> List[Tuple[int, str, Dict[str, Any]]]:
+    """
+    Actions added to an action log since a cursor.
+
+    Only the last entry of an action log changes once written: simulated
+    days are merged into it. The cursor is the number of entries already
+    seen and the days of the last of them; days merged into that entry
+    since then come back as a separate advance entry.
+
+    Args:
+        action_log: The game's action_log
+        count: Entries already seen
+        last_days: Days of entry count - 1 when seen (0 if not an advance)
+
+    Returns:
+        New (day, action, args) entries, equivalent for replay
+    """
+    tail = []
+    if count:
+        day, action_type, args = action_log[count - 1]
+        if action_type == 'advance' and args['days'] > last_days:
+            tail.append((day + last_days, 'advance', {
+                'days': args['days'] - last_days, 'report_level': args['report_level']
+            }))
+    tail.extend(action_log[count:])
+    return tail
+
+
+class _GameCursor:
+    """How much of one session's game has been written."""
+
+    def __init__(self, game_id: str, count: int, last_days: int, seq: int):
+        self.game_id = game_id
+        self.count = count
+        self.last_days = last_days
+        self.seq = seq
+        self.days_since_snapshot = 0
+        self.actions_since_snapshot = 0
+
+
+class GameStore:
+    """
+    SQLite store of session games: action log plus periodic snapshots.
+
+    record() is called with the session lock held after every change; it
+    only computes what is new and queues it for the writer thread.
+    """
+
+    def __init__(self, path: str, flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 snapshot_days: int = DEFAULT_SNAPSHOT_DAYS,
+                 snapshot_actions: int = DEFAULT_SNAPSHOT_ACTIONS,
+                 flush_timeout: float = DEFAULT_FLUSH_TIMEOUT):
+        """
+        Args:
+            path: SQLite database file
+            flush_interval: Seconds between batched commits
+            snapshot_days: Simulated days between snapshots of a game
+            snapshot_actions: Logged actions between snapshots of a game
+            flush_timeout: Seconds flush() waits for the writer thread
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_timeout = flush_timeout
+        self.snapshot_days = snapshot_days
+        self.snapshot_actions = snapshot_actions
+        self._cursors: Dict[str, _GameCursor] = {}
+        self._lock = threading.Lock()
+        self._queue: 'queue.Queue' = queue.Queue()
+        self.writes = 0
+        self.commits = 0
+        self.failed_batches = 0
+        # Set by the writer when it drops a batch
+        self._restart_games = False
+        self.snapshots = 0
+
+        connection = self._connect()
+        with connection:
+            for statement in _SCHEMA:
+                connection.execute(statement)
+        connection.close()
+
+        self._writer = threading.Thread(target=self._write_loop, name='game-store-writer', daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    # ---- Recording (request threads) ----
+
+    def record(self, session_id: str, game) -> None:
+        """
+        Queue whatever changed in a session's game since the last call.
+
+        A game with a new game_id replaces the session's previous game and
+        starts with a snapshot.
+        """
+        with self._lock:
+            if self._restart_games:
+                # A dropped batch left gaps: store every game again from a snapshot
+                self._cursors.clear()
+                self._restart_games = False
+            cursor = self._cursors.get(session_id)
+            if cursor is None or cursor.game_id != game.game_id:
+                self._start(session_id, game)
+                return
+
+            tail = log_tail(game.action_log, cursor.count, cursor.last_days)
+            if not tail:
+                return
+            rows = [
+                (game.game_id, cursor.seq + offset, day, action_type, json.dumps(args))
+                for offset, (day, action_type, args) in enumerate(tail)
+            ]
+            self._advance_cursor(cursor, game, len(tail))
+            cursor.days_since_snapshot += sum(
+                args['days'] for _, action_type, args in tail if action_type == 'advance'
+            )
+            cursor.actions_since_snapshot += len(tail)
+            self._queue.put(('actions', session_id, rows))
+
+            if (cursor.days_since_snapshot >= self.snapshot_days
+                    or cursor.actions_since_snapshot >= self.snapshot_actions):
+                self._snapshot(cursor, game)
+
+    def _start(self, session_id: str, game) -> None:
+        cursor = self._cursors[session_id] = _GameCursor(game.game_id, 0, 0, 0)
+        self._advance_cursor(cursor, game, 0)
+        self._queue.put(('game', session_id, game.game_id))
+        self._snapshot(cursor, game)
+
+    @staticmethod
+    def _advance_cursor(cursor: _GameCursor, game, new_entries: int) -> None:
+        log = game.action_log
+        cursor.count = len(log)
+        cursor.last_days = log[-1][2]['days'] if log and log[-1][1] == 'advance' else 0
+        cursor.seq += new_entries
+
+    def _snapshot(self, cursor: _GameCursor, game) -> None:
+        data = pickle.dumps(game, pickle.HIGHEST_PROTOCOL)
+        cursor.days_since_snapshot = 0
+        cursor.actions_since_snapshot = 0
+        self._queue.put(('snapshot', game.game_id, cursor.seq, game.day, data))
+
+    def forget(self, session_id: str) -> None:
+        """Delete a session and its game from the store."""
+        with self._lock:
+            self._cursors.pop(session_id, None)
+            self._queue.put(('delete', session_id))
+
+    # ---- Loading ----
+
+    def load(self, session_id: str):
+        """
+        Resume a session's game: latest snapshot plus the actions after it.
+
+        If a stored action fails to replay, the game resumes after the last
+        action that does and is stored again from there; a snapshot that
+        cannot be read drops the session.
+
+        Returns:
+            The game, or None if the store has no (readable) game for the session
+        """
+        self.flush()
+        connection = self._connect()
+        try:
+            row = connection.execute(
+                'SELECT game_id FROM games WHERE session_id = ?', (session_id,)).fetchone()
+            if row is None:
+                return None
+            game_id = row[0]
+            snapshot = connection.execute(
+                'SELECT seq, data FROM game_snapshots WHERE game_id = ? ORDER BY seq DESC LIMIT 1',
+                (game_id,)).fetchone()
+            if snapshot is None:
+                return None
+            seq, data = snapshot
+            actions = connection.execute(
+                'SELECT day, action, args FROM game_actions WHERE game_id = ? AND seq >= ? ORDER BY seq',
+                (game_id, seq)).fetchall()
+        finally:
+            connection.close()
+
+        try:
+            game, replayed = self._replay(data, actions)
+        except Exception:
+            logger.exception('Unreadable snapshot of session %s, dropping it', session_id)
+            self.forget(session_id)
+            return None
+        if replayed < len(actions):
+            # Replaying is deterministic, so the actions before the failure succeed again
+            game, _ = self._replay(data, actions[:replayed])
+            with self._lock:
+                self._start(session_id, game)
+            return game
+
+        with self._lock:
+            cursor = self._cursors[session_id] = _GameCursor(game_id, 0, 0, seq + len(actions))
+            self._advance_cursor(cursor, game, 0)
+            cursor.actions_since_snapshot = len(actions)
+        return game
+
+    @staticmethod
+    def _replay(data: bytes, actions: List[Tuple[int, str, str]]) -> Tuple[Any, int]:
+        """
+        Unpickle a snapshot and apply the stored actions after it, up to the
+        first one that fails (which is logged).
+
+        Returns:
+            The game and the number of actions replayed successfully
+        """
+        game = pickle.loads(zlib.decompress(data))
+        for replayed, (day, action_type, args) in enumerate(actions):
+            try:
+                result = game.apply_action(dict(json.loads(args), type=action_type))
+                error = None if result.get('success', False) else result.get('error')
+            except Exception as e:
+                error = repr(e)
+            if error is not None:
+                logger.warning('Stored %s action for day %s of game %s failed (%s); '
+                               'resuming the game before it', action_type, day, game.game_id, error)
+                return game, replayed
+        return game, len(actions)
+
+    # ---- Writer thread ----
+
+    def flush(self) -> bool:
+        """
+        Block until everything queued so far is written, or flush_timeout
+        seconds have passed.
+
+        Returns:
+            False if the writer thread did not get there in time
+        """
+        done = threading.Event()
+        self._queue.put(('flush', done))
+        if done.wait(self.flush_timeout):
+            return True
+        logger.warning('Game store writer did not flush within %s seconds', self.flush_timeout)
+        return False
+
+    def _write_loop(self) -> None:
+        connection = None
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            # Collect until the interval ends or a flush is requested
+            while batch[-1][0] != 'flush':
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                if connection is None:
+                    connection = self._connect()
+                with connection:
+                    for operation in batch:
+                        self._write(connection, operation)
+                self.commits += 1
+            except Exception:
+                # The batch is rolled back; a broken connection is reopened
+                # for the next one
+                self.failed_batches += 1
+                self._restart_games = True
+                logger.exception('Game store batch of %d operations failed, dropping it', len(batch))
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except sqlite3.Error:
+                        pass
+                    connection = None
+            finally:
+                for operation in batch:
+                    if operation[0] == 'flush':
+                        operation[1].set()
+
+    def _write(self, connection: sqlite3.Connection, operation: Tuple) -> None:
+        kind = operation[0]
+        if kind == 'actions':
+            _, session_id, rows = operation
+            connection.executemany('INSERT OR REPLACE INTO game_actions VALUES (?, ?, ?, ?, ?)', rows)
+            connection.execute('UPDATE games SET updated_at = ? WHERE session_id = ?',
+                               (time.time(), session_id))
+            self.writes += len(rows)
+        elif kind == 'game':
+            _, session_id, game_id = operation
+            self._delete_session(connection, session_id)
+            connection.execute('INSERT INTO games VALUES (?, ?, ?)', (session_id, game_id, time.time()))
+        elif kind == 'snapshot':
+            _, game_id, seq, day, data = operation
+            connection.execute('INSERT OR REPLACE INTO game_snapshots VALUES (?, ?, ?, ?)',
+                               (game_id, seq, day, zlib.compress(data)))
+            # Compaction: the snapshot replaces everything before it
+            connection.execute('DELETE FROM game_snapshots WHERE game_id = ? AND seq < ?', (game_id, seq))
+            connection.execute('DELETE FROM game_actions WHERE game_id = ? AND seq < ?', (game_id, seq))
+            self.snapshots += 1
+        elif kind == 'delete':
+            self._delete_session(connection, operation[1])
+
+    @staticmethod
+    def _delete_session(connection: sqlite3.Connection, session_id: str) -> None:
+        row = connection.execute('SELECT game_id FROM games WHERE session_id = ?', (session_id,)).fetchone()
+        if row is not None:
+            connection.execute('DELETE FROM game_actions WHERE game_id = ?', row)
+            connection.execute('DELETE FROM game_snapshots WHERE game_id = ?', row)
+            connection.execute('DELETE FROM games WHERE session_id = ?', (session_id,))
+
+    def metrics(self) -> Dict[str, Any]:
+        """Store path, queue length and write counters."""
+        return {
+            'path': self.path,
+            'pending': self._queue.qsize(),
+            'actions_written': self.writes,
+            'commits': self.commits,
+            'failed_batches': self.failed_batches,
+            'snapshots': self.snapshots
+        }
@@ -1,7 +1,454 @@
-import math
+import threading
+from collections import OrderedDict
 
+import numpy as np
 
-def recommend_stock_levels(products):
+
+# Lead time used for the reorder point of the DSS endpoints
+LEAD_TIME_DAYS = 7
+
+# Default number of entries kept by an EOQCache
+DEFAULT_CACHE_SIZE = 100000
+
+# Rows sampled to estimate how often an EOQCache input repeats itself, and
+# the rows per distinct key at which the cache is consulted. Deduplicating
+# costs about 1 us per row against about 0.05 us for evaluate_costs(), so
+# only heavily duplicated inputs are worth the lookups.
+DUPLICATION_PROBE_ROWS = 1024
+MIN_DUPLICATION = 8
+
+# Status codes returned by evaluate_stock_levels()
+STATUS_ORDER_NOW = 0
+STATUS_MONITOR = 1
+STATUS_OK = 2
+
+
+def evaluate_costs(demand, cost_storage, cost_restock, lead_time_days=LEAD_TIME_DAYS):
+    """
+    Vectorized EOQ / reorder point / annual cost kernel.
+    
+    This is the stock independent part of evaluate_stock_levels(), and
+    the part EOQCache memoizes.
+    
+    Parameters:
+    -----------
+    demand, cost_storage, cost_restock : numpy.ndarray
+        Float arrays of the same shape
+    lead_time_days : float
+        Lead time used for the reorder point
+    
+    Returns:
+    --------
+    dict of numpy.ndarray
+        eoq, reorder_point, total_ordering_cost, total_holding_cost
+    """
+    # EOQ = sqrt((2 * D * S) / H), only defined for positive demand and holding cost
+    has_eoq = (cost_storage > 0) & (demand > 0)
+    radicand = np.zeros(demand.shape)
+    np.divide(2 * demand * cost_restock, cost_storage, out=radicand, where=has_eoq)
+    if np.any(radicand < 0):
+        # Same error math.sqrt raised for a negative restock cost
+        raise ValueError("math domain error")
+    eoq = np.sqrt(radicand)
+    
+    # Reorder Point = Daily Demand * Lead Time
+    daily_demand = np.where(demand > 0, demand / 365, 0.0)
+    reorder_point = daily_demand * lead_time_days
+    
+    # Annual costs: (D / EOQ) * S ordering, (EOQ / 2) * H holding
+    has_orders = eoq > 0
+    num_orders = np.zeros(demand.shape)
+    np.divide(demand, eoq, out=num_orders, where=has_orders)
+    
+    return {
+        'eoq': eoq,
+        'reorder_point': reorder_point,
+        'total_ordering_cost': np.where(has_orders, num_orders * cost_restock, 0.0),
+        'total_holding_cost': np.where(has_orders, (eoq / 2) * cost_storage, 0.0)
+    }
+
+
+def unique_rows(rows):
+    """
+    Deduplicate the rows of a 2-D array.
+    
+    Sort-based equivalent of np.unique(rows, axis=0, return_inverse=True),
+    which is several times slower on large float arrays.
+    
+    Returns:
+    --------
+    (unique_rows, inverse) such that unique_rows[inverse] == rows
+    """
+    if len(rows) == 0:
+        return rows, np.zeros(0, dtype=np.intp)
+    order = np.lexsort(rows.T[::-1])
+    sorted_rows = rows[order]
+    starts = np.empty(len(rows), dtype=bool)
+    starts[0] = True
+    np.any(sorted_rows[1:] != sorted_rows[:-1], axis=1, out=starts[1:])
+    inverse = np.empty(len(rows), dtype=np.intp)
+    inverse[order] = np.cumsum(starts) - 1
+    return sorted_rows[starts], inverse
+
+
+class EOQCache:
+    """
+    Bounded LRU cache around evaluate_costs().
+    
+    Entries are keyed by normalized (demand, cost_storage, cost_restock,
+    lead time) tuples: inputs that cannot produce an EOQ collapse onto the
+    same key, since their results only depend on the remaining fields.
+    Within one call every distinct key is looked up once, and all misses
+    are computed together in a single vectorized evaluate_costs() pass.
+    
+    The cache is only consulted for inputs with at least MIN_DUPLICATION
+    rows per distinct key (estimated first on a sample), whose distinct
+    keys fit in it; other inputs go straight to evaluate_costs().
+    """
+    
+    FIELDS = ('eoq', 'reorder_point', 'total_ordering_cost', 'total_holding_cost')
+    
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE):
+        self.maxsize = max(0, int(maxsize))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bypassed = 0
+    
+    @staticmethod
+    def normalize(demand, cost_storage, cost_restock):
+        """Return the normalized key columns for the given inputs."""
+        # "+ 0.0" folds -0.0 into 0.0
+        demand = np.where(demand > 0, demand, 0.0) + 0.0
+        cost_storage = np.where((demand > 0) & (cost_storage > 0), cost_storage, 0.0) + 0.0
+        cost_restock = np.where(cost_storage > 0, cost_restock, 0.0) + 0.0
+        return demand, cost_storage, cost_restock
+    
+    def evaluate(self, demand, cost_storage, cost_restock, lead_time_days=LEAD_TIME_DAYS):
+        """
+        Drop-in replacement for evaluate_costs() that serves repeated
+        inputs from the cache.
+        """
+        if not self.maxsize or not self._duplicated(demand, cost_storage, cost_restock):
+            return self._bypass(demand, cost_storage, cost_restock, lead_time_days)
+        shape = demand.shape
+        keys = np.column_stack([
+            column.ravel() for column in self.normalize(demand, cost_storage, cost_restock)
+        ])
+        unique_keys, inverse = unique_rows(keys)
+        if len(unique_keys) > self.maxsize or len(unique_keys) * MIN_DUPLICATION > len(keys):
+            return self._bypass(demand, cost_storage, cost_restock, lead_time_days)
+        lead_time_days = float(lead_time_days)
+        cache_keys = [(*key, lead_time_days) for key in unique_keys.tolist()]
+        
+        values = np.empty((len(cache_keys), len(self.FIELDS)))
+        with self._lock:
+            missing = []
+            for row, key in enumerate(cache_keys):
+                cached = self._entries.get(key)
+                if cached is None:
+                    missing.append(row)
+                else:
+                    self._entries.move_to_end(key)
+                    values[row] = cached
+            self.hits += len(cache_keys) - len(missing)
+            self.misses += len(missing)
+            
+            if missing:
+                computed = evaluate_costs(
+                    unique_keys[missing, 0], unique_keys[missing, 1],
+                    unique_keys[missing, 2], lead_time_days
+                )
+                computed = np.column_stack([computed[field] for field in self.FIELDS])
+                values[missing] = computed
+                
+                if self.maxsize:
+                    for row, result in zip(missing, computed.tolist()):
+                        self._entries[cache_keys[row]] = result
+                    while len(self._entries) > self.maxsize:
+                        self._entries.popitem(last=False)
+                        self.evictions += 1
+        
+        expanded = values[inverse]
+        return {
+            field: expanded[:, i].reshape(shape) for i, field in enumerate(self.FIELDS)
+        }
+    
+    @classmethod
+    def _duplicated(cls, demand, cost_storage, cost_restock):
+        """Whether the keys of an evenly spread sample of inputs repeat MIN_DUPLICATION times."""
+        columns = np.broadcast_arrays(demand, cost_storage, cost_restock)
+        rows = np.arange(0, columns[0].size, max(1, columns[0].size // DUPLICATION_PROBE_ROWS))
+        sample = np.column_stack(cls.normalize(*(column.flat[rows] for column in columns)))
+        return len(unique_rows(sample)[0]) * MIN_DUPLICATION <= len(sample)
+    
+    def _bypass(self, demand, cost_storage, cost_restock, lead_time_days):
+        with self._lock:
+            self.bypassed += 1
+        return evaluate_costs(demand, cost_storage, cost_restock, lead_time_days)
+    
+    def clear(self):
+        """Drop all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = self.bypassed = 0
+    
+    def stats(self):
+        """Return size and hit/miss/eviction/bypass counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'bypassed': self.bypassed,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+def evaluate_stock_levels(stock, demand, cost_storage, cost_restock,
+                          lead_time_days=LEAD_TIME_DAYS, cache=None, reorder_point=None):
+    """
+    Vectorized EOQ / reorder point / cost engine for a whole catalog.
+    
+    All inputs are array-likes of the same shape (or broadcastable to it),
+    one entry per product. Every output is computed in a single NumPy pass,
+    with the same formulas and edge cases as the per-product loop that
+    recommend_stock_levels() used to run.
+    
+    Parameters:
+    -----------
+    stock : array-like
+        Current stock levels
+    demand : array-like
+        Annual demand
+    cost_storage : array-like
+        Cost to hold one unit in inventory per year
+    cost_restock : array-like
+        Fixed cost per order/restock
+    lead_time_days : float
+        Lead time used for the reorder point (default 7 days)
+    cache : EOQCache, optional
+        Memoizes the stock independent part of the computation
+    reorder_point : array-like, optional
+        Precomputed reorder points (e.g. with safety stock, see
+        safety_stock.py) used instead of daily demand * lead time
+    
+    Returns:
+    --------
+    dict of numpy.ndarray
+        - eoq: Economic Order Quantity (0 when demand or storage cost is not positive)
+        - reorder_point: Daily demand * lead time (0 when demand is not positive)
+        - total_ordering_cost: Annual ordering cost (0 when EOQ is 0)
+        - total_holding_cost: Annual holding cost (0 when EOQ is 0)
+        - total_inventory_cost: Ordering + holding cost
+        - status: STATUS_ORDER_NOW, STATUS_MONITOR or STATUS_OK
+    """
+    stock = np.asarray(stock, dtype=np.float64)
+    demand = np.asarray(demand, dtype=np.float64)
+    cost_storage = np.asarray(cost_storage, dtype=np.float64)
+    cost_restock = np.asarray(cost_restock, dtype=np.float64)
+    stock, demand, cost_storage, cost_restock = np.broadcast_arrays(
+        stock, demand, cost_storage, cost_restock
+    )
+    
+    if cache is None:
+        results = evaluate_costs(demand, cost_storage, cost_restock, lead_time_days)
+    else:
+        results = cache.evaluate(demand, cost_storage, cost_restock, lead_time_days)
+    
+    if reorder_point is not None:
+        results['reorder_point'] = np.broadcast_to(
+            np.asarray(reorder_point, dtype=np.float64), demand.shape
+        )
+    
+    results['total_inventory_cost'] = (
+        results['total_ordering_cost'] + results['total_holding_cost']
+    )
+    
+    status = np.full(demand.shape, STATUS_OK, dtype=np.int8)
+    status[stock < results['eoq']] = STATUS_MONITOR
+    status[stock <= results['reorder_point']] = STATUS_ORDER_NOW
+    results['status'] = status
+    
+    return results
+
+
+def evaluate_scenarios(columns, demand_multipliers, storage_multipliers,
+                       restock_multipliers, cache=None):
+    """
+    Evaluate every (scenario, product) pair of a what-if analysis at once.
+    
+    The base catalog columns are broadcast against one multiplier per
+    scenario, so no per-scenario copy of the catalog is ever made.
+    
+    Parameters:
+    -----------
+    columns : dict of list
+        Base catalog, as returned by product_columns()
+    demand_multipliers, storage_multipliers, restock_multipliers : array-like
+        One multiplier per scenario
+    cache : EOQCache, optional
+        Passed through to evaluate_stock_levels()
+    
+    Returns:
+    --------
+    dict of numpy.ndarray
+        The evaluate_stock_levels() outputs with shape (scenarios, products),
+        plus the modified 'demand' and 'cost_storage' matrices
+    """
+    def scaled(column, multipliers):
+        base = np.asarray(column, dtype=np.float64)[np.newaxis, :]
+        return base * np.asarray(multipliers, dtype=np.float64)[:, np.newaxis]
+    
+    demand = scaled(columns['demand'], demand_multipliers)
+    cost_storage = scaled(columns['cost_storage'], storage_multipliers)
+    cost_restock = scaled(columns['cost_restock'], restock_multipliers)
+    
+    results = evaluate_stock_levels(
+        columns['stock'], demand, cost_storage, cost_restock, cache=cache
+    )
+    results['demand'] = demand
+    results['cost_storage'] = cost_storage
+    return results
+
+
+def recommend_scenarios(columns, demand_multipliers, storage_multipliers,
+                        restock_multipliers, cache=None):
+    """
+    Recommendations for every scenario of a what-if analysis.
+    
+    Runs evaluate_scenarios() once, then builds the recommendation dicts
+    one scenario at a time.
+    
+    Yields:
+    -------
+    list of dict
+        The recommendations of each scenario, in scenario order
+    """
+    matrix = evaluate_scenarios(
+        columns, demand_multipliers, storage_multipliers, restock_multipliers, cache=cache
+    )
+    for index in range(matrix['eoq'].shape[0]):
+        scenario_results = {key: values[index] for key, values in matrix.items()}
+        yield build_recommendations(
+            columns['name'],
+            columns['stock'],
+            scenario_results['demand'].tolist(),
+            scenario_results['cost_storage'].tolist(),
+            scenario_results
+        )
+
+
+def product_columns(products):
+    """
+    Split a list of product dicts into per-field columns.
+    
+    Missing fields default the same way recommend_stock_levels() always
+    did: 'Unknown' for the name and 0 for every numeric field.
+    
+    Returns:
+    --------
+    dict of list
+        Keys: name, stock, demand, cost_storage, cost_restock
+    """
+    return {
+        'name': [product.get('name', 'Unknown') for product in products],
+        'stock': [product.get('stock', 0) for product in products],
+        'demand': [product.get('demand', 0) for product in products],
+        'cost_storage': [product.get('cost_storage', 0) for product in products],
+        'cost_restock': [product.get('cost_restock', 0) for product in products]
+    }
+
+
+def round_half_even(values, ndigits=2):
+    """
+    Round a float array exactly like the builtin round(x, ndigits).
+    
+    numpy.round scales, rounds and unscales, which only disagrees with
+    Python's correctly rounded round() when the scaled value sits right
+    on a .5 boundary. Those rare entries fall back to the builtin.
+    
+    Returns:
+    --------
+    list of float
+    """
+    values = np.asarray(values, dtype=np.float64)
+    scale = 10.0 ** ndigits
+    scaled = values * scale
+    rounded = (np.rint(scaled) / scale).tolist()
+    
+    distance = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5)
+    ambiguous = ~np.isfinite(scaled) | (distance <= np.abs(scaled) * 2.0 ** -50 + 1e-9)
+    for i in np.flatnonzero(ambiguous).tolist():
+        rounded[i] = round(float(values.flat[i]), ndigits)
+    return rounded
+
+
+def build_recommendations(names, stock, demand, cost_storage, results):
+    """
+    Turn the arrays of evaluate_stock_levels() into recommendation dicts.
+    
+    Zero results are emitted as the integer 0 in the same cases the
+    original scalar implementation did, so the JSON output is unchanged.
+    
+    Parameters:
+    -----------
+    names : list of str
+        Product names
+    stock, demand, cost_storage : list
+        Input values for the same products; stock and demand are echoed back
+    results : dict of numpy.ndarray
+        Output of evaluate_stock_levels() for the same products
+    
+    Returns:
+    --------
+    list of dict
+        See recommend_stock_levels()
+    """
+    eoq = round_half_even(results['eoq'])
+    reorder_point = round_half_even(results['reorder_point'])
+    ordering = round_half_even(results['total_ordering_cost'])
+    holding = round_half_even(results['total_holding_cost'])
+    total = round_half_even(results['total_inventory_cost'])
+    has_orders = (results['eoq'] > 0).tolist()
+    status = results['status'].tolist()
+    # f"{eoq:.0f}" and np.rint both round half to even on the exact binary value
+    order_units = np.rint(results['eoq']).astype(np.int64).tolist()
+    
+    recommendations = []
+    for i, name in enumerate(names):
+        annual_demand = demand[i]
+        if status[i] == STATUS_ORDER_NOW:
+            recommendation = f"ORDER NOW: Stock is at or below reorder point. Order {order_units[i]} units."
+        elif status[i] == STATUS_MONITOR:
+            recommendation = f"MONITOR: Stock is below optimal order quantity. Consider ordering {order_units[i]} units soon."
+        else:
+            recommendation = "OK: Stock levels are sufficient."
+        if has_orders[i]:
+            costs = (ordering[i], holding[i], total[i])
+        else:
+            costs = (0, 0, 0)
+        recommendations.append({
+            'name': name,
+            'current_stock': stock[i],
+            'eoq': eoq[i] if cost_storage[i] > 0 and annual_demand > 0 else 0,
+            'reorder_point': reorder_point[i] if annual_demand > 0 else 0,
+            'annual_demand': annual_demand,
+            'total_ordering_cost': costs[0],
+            'total_holding_cost': costs[1],
+            'total_inventory_cost': costs[2],
+            'recommendation': recommendation
+        })
+    
+    return recommendations
+
+
+def recommend_stock_levels(products, cache=None):
     """
     Calculate reorder points and Economic Order Quantity (EOQ) for a list of products.
     
@@ -14,6 +461,8 @@ def recommend_stock_levels(products):
         - demand (int/float): Annual demand
         - cost_storage (float): Cost to hold one unit in inventory per year
         - cost_restock (float): Fixed cost per order/restock
+    cache : EOQCache, optional
+        Memoizes EOQ/cost results for repeated (demand, cost) inputs
     
     Returns:
     --------
@@ -26,67 +475,20 @@ def recommend_stock_levels(products):
         - annual_demand: Annual demand
         - total_ordering_cost: Annual ordering cost
         - total_holding_cost: Annual holding cost
+        - total_inventory_cost: Ordering + holding cost
         - recommendation: Action recommendation
-    """
-    recommendations = []
     
-    for product in products:
-        name = product.get('name', 'Unknown')
-        stock = product.get('stock', 0)
-        demand = product.get('demand', 0)
-        cost_storage = product.get('cost_storage', 0)
-        cost_restock = product.get('cost_restock', 0)
-        
-        # Calculate EOQ using the Wilson formula
-        # EOQ = sqrt((2 * D * S) / H)
-        # where D = annual demand, S = ordering cost, H = holding cost per unit per year
-        if cost_storage > 0 and demand > 0:
-            eoq = math.sqrt((2 * demand * cost_restock) / cost_storage)
-        else:
-            eoq = 0
-        
-        # Calculate reorder point
-        # Assuming a lead time of 7 days (1 week)
-        # Reorder Point = (Daily Demand * Lead Time)
-        lead_time_days = 7
-        daily_demand = demand / 365 if demand > 0 else 0
-        reorder_point = daily_demand * lead_time_days
-        
-        # Calculate annual costs
-        if eoq > 0:
-            # Number of orders per year
-            num_orders = demand / eoq
-            # Total ordering cost = Number of orders * Cost per order
-            total_ordering_cost = num_orders * cost_restock
-            # Average inventory = EOQ / 2
-            avg_inventory = eoq / 2
-            # Total holding cost = Average inventory * Holding cost per unit
-            total_holding_cost = avg_inventory * cost_storage
-        else:
-            total_ordering_cost = 0
-            total_holding_cost = 0
-        
-        # Generate recommendation
-        if stock <= reorder_point:
-            recommendation = f"ORDER NOW: Stock is at or below reorder point. Order {eoq:.0f} units."
-        elif stock < eoq:
-            recommendation = f"MONITOR: Stock is below optimal order quantity. Consider ordering {eoq:.0f} units soon."
-        else:
-            recommendation = "OK: Stock levels are sufficient."
-        
-        recommendations.append({
-            'name': name,
-            'current_stock': stock,
-            'eoq': round(eoq, 2),
-            'reorder_point': round(reorder_point, 2),
-            'annual_demand': demand,
-            'total_ordering_cost': round(total_ordering_cost, 2),
-            'total_holding_cost': round(total_holding_cost, 2),
-            'total_inventory_cost': round(total_ordering_cost + total_holding_cost, 2),
-            'recommendation': recommendation
-        })
-    
-    return recommendations
+    The math runs column-wise through evaluate_stock_levels().
+    """
+    columns = product_columns(products)
+    results = evaluate_stock_levels(
+        columns['stock'], columns['demand'],
+        columns['cost_storage'], columns['cost_restock'], cache=cache
+    )
+    return build_recommendations(
+        columns['name'], columns['stock'], columns['demand'],
+        columns['cost_storage'], results
+    )
 
 
 # Example usage
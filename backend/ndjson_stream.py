@@ -0,0 +1,94 @@
+"""
+Newline-delimited JSON (NDJSON) helpers for streaming large catalogs
+through the optimization endpoints.
+
+Input is parsed lazily line by line and grouped into bounded chunks, so
+a catalog never has to be held in memory as a whole.
+"""
+
+import json
+from itertools import islice
+from typing import Any, Iterable, Iterator, List, Tuple
+
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+# Products evaluated per chunk in streaming mode
+DEFAULT_CHUNK_SIZE = 5000
+MAX_CHUNK_SIZE = 100000
+
+
+class NDJSONError(ValueError):
+    """Raised when an input line is not a valid JSON object."""
+
+    def __init__(self, line_number: int, message: str):
+        super().__init__(f"Line {line_number}: {message}")
+        self.line_number = line_number
+
+
+def iter_ndjson(stream: Iterable[bytes]) -> Iterator[Tuple[int, Any]]:
+    """
+    Parse an NDJSON byte stream one line at a time.
+
+    Blank lines are skipped.
+
+    Args:
+        stream: Iterable of raw lines (e.g. request.stream)
+
+    Yields:
+        (line_number, decoded JSON object) tuples
+    """
+    for line_number, raw_line in enumerate(stream, start=1):
+        line = raw_line.strip()
+        if not line:
+            continue
+        try:
+            value = json.loads(line)
+        except ValueError as e:
+            raise NDJSONError(line_number, f"invalid JSON ({e})")
+        if not isinstance(value, dict):
+            raise NDJSONError(line_number, "expected a JSON object")
+        yield line_number, value
+
+
+def iter_chunks(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """
+    Group an iterable into lists of at most `size` items.
+
+    Args:
+        items: Any iterable
+        size: Maximum chunk length
+
+    Yields:
+        Lists of consecutive items
+    """
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def dump_line(value: Any) -> str:
+    """Encode one value as a compact NDJSON line."""
+    return json.dumps(value, separators=(',', ':')) + '\n'
+
+
+def parse_chunk_size(value: Any) -> int:
+    """
+    Validate a requested chunk size, falling back to the default.
+
+    Args:
+        value: Raw query parameter value (or None)
+
+    Returns:
+        Chunk size between 1 and MAX_CHUNK_SIZE
+    """
+    if value is None:
+        return DEFAULT_CHUNK_SIZE
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('chunk_size must be a valid number')
+    return max(1, min(size, MAX_CHUNK_SIZE))
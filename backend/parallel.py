@@ -0,0 +1,139 @@
+"""
+Process pool for evaluating large catalogs on several CPU cores.
+
+Catalogs are split into contiguous shards, evaluated by worker processes
+and merged back in input order. The pool is created lazily, once per
+server process, and reused by every request.
+"""
+
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from inventory_optimization import EOQCache, recommend_stock_levels, recommend_scenarios
+
+
+# Worker processes in the pool (defaults to the number of CPU cores)
+PARALLEL_WORKERS = int(os.environ.get('PARALLEL_WORKERS', os.cpu_count() or 1))
+
+# Catalogs smaller than this are always evaluated in-process
+PARALLEL_MIN_PRODUCTS = int(os.environ.get('PARALLEL_MIN_PRODUCTS', 50000))
+
+# Evaluate every request in parallel mode unless it opts out
+PARALLEL_DEFAULT = os.environ.get('PARALLEL_MODE', '').lower() in ('1', 'true', 'yes')
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+# Per-worker EOQ cache, filled independently inside each worker process
+_worker_cache = EOQCache()
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """
+    Return the process pool, creating it on first use.
+
+    Workers are spawned rather than forked, since forking a threaded
+    server can copy locks held by other threads. A pool inherited by a
+    forked server process belongs to its parent, so a new one is created
+    whenever the PID changes.
+    """
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(
+                max_workers=PARALLEL_WORKERS,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def shutdown_pool() -> None:
+    """Shut the pool down (it is recreated on next use)."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.shutdown()
+        _pool = None
+        _pool_pid = None
+
+
+def use_parallel(product_count: int, requested: Optional[bool] = None) -> bool:
+    """
+    Decide whether a request should be sharded across the pool.
+
+    Args:
+        product_count: Catalog size
+        requested: The request's "parallel" flag (None = server default)
+    """
+    enabled = PARALLEL_DEFAULT if requested is None else bool(requested)
+    return enabled and PARALLEL_WORKERS > 1 and product_count >= PARALLEL_MIN_PRODUCTS
+
+
+def shard_bounds(count: int, shard_count: int) -> List[range]:
+    """Split range(count) into at most shard_count contiguous, even ranges."""
+    shard_size = max(1, math.ceil(count / max(1, shard_count)))
+    return [range(start, min(start + shard_size, count)) for start in range(0, count, shard_size)]
+
+
+def map_shards(func: Callable[[Any], List[Any]], shards: Sequence[Any]) -> List[List[Any]]:
+    """Run func over every shard in the pool, returning results in shard order."""
+    if len(shards) <= 1:
+        return [func(shard) for shard in shards]
+    return list(get_pool().map(func, shards))
+
+
+def _recommend_shard(products: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return recommend_stock_levels(products, cache=_worker_cache)
+
+
+def recommend_sharded(products: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Parallel equivalent of recommend_stock_levels().
+
+    Returns:
+        Recommendations in input order
+    """
+    shards = [products[bounds.start:bounds.stop]
+              for bounds in shard_bounds(len(products), PARALLEL_WORKERS)]
+    merged = []
+    for recommendations in map_shards(_recommend_shard, shards):
+        merged.extend(recommendations)
+    return merged
+
+
+def _simulate_shard(task) -> List[List[Dict[str, Any]]]:
+    columns, multipliers = task
+    return list(recommend_scenarios(columns, *multipliers, cache=_worker_cache))
+
+
+def simulate_sharded(columns: Dict[str, Any], demand_multipliers: List[float],
+                     storage_multipliers: List[float],
+                     restock_multipliers: List[float]) -> List[List[Dict[str, Any]]]:
+    """
+    Parallel scenarios x products evaluation, sharded by product.
+
+    Args:
+        columns: Catalog columns (see inventory_optimization.product_columns)
+        demand_multipliers, storage_multipliers, restock_multipliers:
+            One multiplier per scenario
+
+    Returns:
+        One list of recommendations per scenario, products in input order
+    """
+    multipliers = (list(demand_multipliers), list(storage_multipliers), list(restock_multipliers))
+    tasks = [
+        ({field: values[bounds.start:bounds.stop] for field, values in columns.items()}, multipliers)
+        for bounds in shard_bounds(len(columns['name']), PARALLEL_WORKERS)
+    ]
+
+    merged: List[List[Dict[str, Any]]] = [[] for _ in multipliers[0]]
+    for shard_results in map_shards(_simulate_shard, tasks):
+        for scenario_recommendations, recommendations in zip(merged, shard_results):
+            scenario_recommendations.extend(recommendations)
+    return merged
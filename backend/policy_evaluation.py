@@ -0,0 +1,276 @@
+"""
+Monte Carlo evaluation of restocking policies for the stock game.
+
+A policy is run over many seeded episodes of the game. Days are simulated
+without building any per-day reports, and episodes are sharded across the
+process pool of parallel.py. Each episode's seed comes from the
+evaluation seed and the episode number, so results are the same whatever
+the number of workers.
+"""
+
+import math
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from game import StockGame
+from game_arrays import ArrayStockGame, GAME_LEAD_TIME_DAYS
+from parallel import PARALLEL_WORKERS, map_shards, shard_bounds
+
+
+# Game engines episodes can run on (see app.GAME_ENGINES)
+ENGINES = {'classic': StockGame, 'array': ArrayStockGame}
+
+# Evaluations of fewer simulated days (episodes x days) stay in-process
+PARALLEL_MIN_EPISODE_DAYS = int(os.environ.get('POLICY_PARALLEL_MIN_DAYS', 200000))
+
+# Per-episode results summarized by evaluate_policy()
+METRICS = ('final_budget', 'profit', 'roi', 'stockouts')
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+# Two-sided normal quantile of the 95% confidence interval of the mean
+_Z_95 = 1.959963984540054
+
+
+class RestockPolicy:
+    """
+    Rule deciding what to restock at the end of every day.
+
+    A product is reordered when its stock is at or below
+    reorder_days x daily demand (the game's "critical" status for the
+    default of 3 days) and, if max_stock is set, below max_stock. The order
+    is the product's EOQ times order_factor, or a fixed quantity.
+
+    The defaults are the auto-restock rule of the game.py demo: order the
+    EOQ when a product is critical and has fewer than 10 units.
+
+    Products listed in products follow their own rule instead: order
+    quantity units when the stock is at or below reorder_point units.
+    """
+
+    def __init__(self, reorder_days: float = GAME_LEAD_TIME_DAYS,
+                 max_stock: Optional[int] = 10, quantity: Any = 'eoq',
+                 order_factor: float = 1.0,
+                 products: Optional[Dict[str, Dict[str, int]]] = None):
+        """
+        Args:
+            reorder_days: Days of demand at or below which a product is reordered
+            max_stock: Only reorder products with fewer units (None = no limit)
+            quantity: 'eoq' or a fixed number of units per order
+            order_factor: Multiplier of the EOQ when quantity is 'eoq'
+            products: Per-product rules, {name: {"reorder_point": units,
+                "quantity": units}}
+
+        Raises:
+            ValueError: If a parameter is out of range
+        """
+        if not reorder_days >= 0:
+            raise ValueError('reorder_days must be non-negative')
+        if max_stock is not None and max_stock < 0:
+            raise ValueError('max_stock must be non-negative')
+        if quantity != 'eoq' and not (isinstance(quantity, int) and quantity > 0):
+            raise ValueError("quantity must be 'eoq' or a positive integer")
+        if not order_factor > 0:
+            raise ValueError('order_factor must be positive')
+        self.products: Dict[str, Dict[str, int]] = {}
+        for name, rule in (products or {}).items():
+            if not isinstance(rule, dict) or set(rule) != {'reorder_point', 'quantity'}:
+                raise ValueError(f'Rule of {name!r} must have reorder_point and quantity')
+            reorder_point, units = rule['reorder_point'], rule['quantity']
+            if not (isinstance(reorder_point, int) and reorder_point >= 0):
+                raise ValueError(f'reorder_point of {name!r} must be a non-negative integer')
+            if not (isinstance(units, int) and units > 0):
+                raise ValueError(f'quantity of {name!r} must be a positive integer')
+            self.products[name] = {'reorder_point': reorder_point, 'quantity': units}
+        self.reorder_days = reorder_days
+        self.max_stock = max_stock
+        self.quantity = quantity
+        self.order_factor = order_factor
+
+    @classmethod
+    def from_dict(cls, spec: Dict[str, Any]) -> 'RestockPolicy':
+        """
+        Build a policy from its to_dict() form (missing keys take defaults).
+
+        Raises:
+            ValueError: On unknown keys or invalid values
+        """
+        unknown = set(spec) - {'reorder_days', 'max_stock', 'quantity', 'order_factor', 'products'}
+        if unknown:
+            raise ValueError(f"Unknown policy parameters: {', '.join(sorted(unknown))}")
+        return cls(**spec)
+
+    def to_dict(self) -> Dict[str, Any]:
+        spec = {
+            'reorder_days': self.reorder_days,
+            'max_stock': self.max_stock,
+            'quantity': self.quantity,
+            'order_factor': self.order_factor
+        }
+        if self.products:
+            spec['products'] = {name: dict(rule) for name, rule in self.products.items()}
+        return spec
+
+    def order_quantity(self, product) -> int:
+        """Units to order for a product now (0 = no order)."""
+        rule = self.products.get(product.name)
+        if rule is not None:
+            return rule['quantity'] if product.stock <= rule['reorder_point'] else 0
+        if product.stock > product.daily_demand * self.reorder_days:
+            return 0
+        if self.max_stock is not None and product.stock >= self.max_stock:
+            return 0
+        if self.quantity != 'eoq':
+            return self.quantity
+        if product.cost_storage <= 0 or product.daily_demand <= 0:
+            return 0
+        eoq = math.sqrt(2 * product.daily_demand * product.cost_restock / product.cost_storage)
+        # Same rounding as ordering the 'eoq' of a recommendation
+        return int(round(eoq, 2) * self.order_factor)
+
+    def apply(self, game: StockGame) -> None:
+        """Place this policy's orders in a game."""
+        for product in game.unlocked_products:
+            quantity = self.order_quantity(product)
+            if quantity > 0:
+                game.restock(product.name, quantity)
+
+
+def episode_seeds(seed: Any, episodes: int) -> List[int]:
+    """
+    Independent game seeds of the episodes of an evaluation.
+
+    seed is an int or a sequence of ints (independent streams). The seeds
+    of n episodes are the first n of the seeds of more episodes.
+    """
+    return np.random.SeedSequence(seed).generate_state(episodes, dtype=np.uint32).tolist()
+
+
+def run_episode(policy: RestockPolicy, days: int, seed: int,
+                engine: str = 'classic') -> Dict[str, float]:
+    """
+    Play one game for a number of days under a policy.
+
+    The policy acts at the end of every day, after sales. No history or
+    daily reports beyond the latest are kept.
+
+    Returns:
+        Dictionary with the METRICS of the episode
+    """
+    game = ENGINES[engine](history_retention=1, report_retention=1, seed=seed)
+    for _ in range(days):
+        game.advance(1, 'none')
+        policy.apply(game)
+
+    profit = (game.total_revenue - game.total_storage_costs -
+              game.total_restock_costs - game.total_unlock_costs)
+    roi = ((game.budget - game.initial_budget) / game.initial_budget * 100) if game.initial_budget > 0 else 0
+    return {
+        'final_budget': game.budget,
+        'profit': profit,
+        'roi': roi,
+        'stockouts': game.total_stockouts
+    }
+
+
+def evaluate_episodes(task) -> List[List[float]]:
+    """
+    Play a shard of episodes (process pool task).
+
+    Args:
+        task: (policy to_dict(), days, episode seeds, engine)
+
+    Returns:
+        One row of METRICS values per episode
+    """
+    policy_spec, days, seeds, engine = task
+    policy = RestockPolicy.from_dict(policy_spec)
+    results = [run_episode(policy, days, seed, engine) for seed in seeds]
+    return [[result[metric] for metric in METRICS] for result in results]
+
+
+def summarize(values: Sequence[float],
+              percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[str, Any]:
+    """
+    Distribution summary of one metric over the episodes.
+
+    Returns:
+        Dictionary with mean, std, min, max, the percentiles (keyed "p5",
+        "p50", ...) and ci95, the normal 95% confidence interval of the mean
+    """
+    values = np.asarray(values, dtype=np.float64)
+    mean = float(values.mean())
+    std = float(values.std(ddof=1)) if len(values) > 1 else 0.0
+    margin = _Z_95 * std / math.sqrt(len(values))
+    return {
+        'mean': round(mean, 4),
+        'std': round(std, 4),
+        'min': round(float(values.min()), 4),
+        'max': round(float(values.max()), 4),
+        'percentiles': {
+            f'p{p:g}': round(float(value), 4)
+            for p, value in zip(percentiles, np.percentile(values, percentiles))
+        },
+        'ci95': [round(mean - margin, 4), round(mean + margin, 4)]
+    }
+
+
+def evaluate_policy(policy: RestockPolicy, episodes: int = 1000, days: int = 365,
+                    seed: int = 0, engine: str = 'classic',
+                    parallel: Optional[bool] = None,
+                    percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[str, Any]:
+    """
+    Score a policy over many seeded episodes.
+
+    Args:
+        policy: Restocking policy to evaluate
+        episodes: Number of games to play
+        days: Days per game
+        seed: Evaluation seed; the same seed gives the same results
+        engine: 'classic' or 'array' game engine
+        parallel: Shard episodes across the process pool (None = when the
+            evaluation is large enough and more than one worker is configured)
+        percentiles: Percentiles reported for every metric
+
+    Returns:
+        Dictionary with the evaluation parameters, simulated_days, and a
+        summary (see summarize()) per metric in METRICS
+
+    Raises:
+        ValueError: If episodes, days or engine is invalid
+    """
+    if episodes < 1:
+        raise ValueError('episodes must be at least 1')
+    if days < 1:
+        raise ValueError('days must be at least 1')
+    if engine not in ENGINES:
+        raise ValueError(f"engine must be one of: {', '.join(ENGINES)}")
+
+    seeds = episode_seeds(seed, episodes)
+    if parallel is None:
+        parallel = episodes * days >= PARALLEL_MIN_EPISODE_DAYS
+    shard_count = PARALLEL_WORKERS if parallel else 1
+    tasks = [
+        (policy.to_dict(), days, seeds[bounds.start:bounds.stop], engine)
+        for bounds in shard_bounds(episodes, shard_count)
+    ]
+
+    rows = []
+    for shard_rows in map_shards(evaluate_episodes, tasks):
+        rows.extend(shard_rows)
+    columns = np.array(rows, dtype=np.float64).T
+
+    return {
+        'policy': policy.to_dict(),
+        'episodes': episodes,
+        'days': days,
+        'seed': seed,
+        'engine': engine,
+        'simulated_days': episodes * days,
+        'metrics': {
+            metric: summarize(values, percentiles)
+            for metric, values in zip(METRICS, columns)
+        }
+    }
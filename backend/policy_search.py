@@ -0,0 +1,559 @@
+"""
+Search for the restocking policy with the best expected result.
+
+Candidates give every product its own (reorder point, order quantity)
+pair, in units. All candidates are played on the same seeded episodes
+(common random numbers), so their differences are not drowned in the
+noise of the random events. Each game's random stream only diverges
+between policies after a spoilage event, whose size depends on the stock.
+
+Per-episode results are cached per policy. Episode seeds are a prefix of
+one stream (see policy_evaluation.episode_seeds), so asking for more
+episodes of a cached policy only plays the new ones.
+
+Three searches are provided:
+- grid_search() scores every candidate of a small space.
+- successive_halving() scores many candidates on a few episodes. Each
+  round it keeps the best 1/eta of them and gives those eta times as
+  many episodes.
+- cross_entropy() samples candidates from per-product distributions over
+  the pairs, and moves the distributions towards the best samples of
+  each iteration. It suits large spaces, where profit is close to a sum
+  over products.
+
+The winner and the baseline policy are then scored on held-out validation
+episodes. This gives confidence bounds that are not inflated by the
+selection, and a paired estimate of the improvement.
+"""
+
+import itertools
+import json
+import math
+import os
+import random
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from game_data import GameCatalog
+from parallel import PARALLEL_WORKERS, map_shards, shard_bounds
+from policy_evaluation import (
+    ENGINES, METRICS, PARALLEL_MIN_EPISODE_DAYS, RestockPolicy, episode_seeds,
+    evaluate_episodes, summarize
+)
+
+
+# Default candidate reorder points (days of demand) and quantities (x EOQ)
+DEFAULT_REORDER_DAYS = (0.5, 1, 2, 3, 4)
+DEFAULT_ORDER_FACTORS = (0.5, 1.0, 1.5, 2.0, 3.0)
+
+# Metrics a search can maximize
+OBJECTIVES = ('profit', 'final_budget', 'roi')
+
+# Candidates a grid search may score
+MAX_GRID_CANDIDATES = 5000
+
+# Candidates a successive halving search may sample, and a cross-entropy
+# search may draw over all its iterations (cached rollouts cost nothing, so
+# the rounds themselves need a bound)
+MAX_SAMPLED_CANDIDATES = 5000
+
+# Policies whose per-episode results a RolloutCache keeps, and episode rows
+# it keeps in total (32 bytes each: one float64 per metric)
+DEFAULT_ROLLOUT_CACHE_SIZE = int(os.environ.get('POLICY_CACHE_SIZE', 4096))
+DEFAULT_ROLLOUT_CACHE_ROWS = int(os.environ.get('POLICY_CACHE_ROWS', 1000000))
+
+# Episode stream of the validation episodes (the search uses stream 0)
+_VALIDATION_STREAM = 1
+
+# Per-product (reorder point, order quantity) candidates, keyed by product name
+SearchSpace = Dict[str, List[Tuple[int, int]]]
+
+
+class RolloutCache:
+    """
+    Bounded LRU cache of per-episode results of policies.
+
+    Entries are keyed by the policy and the rollout settings and hold the
+    results of the first n episodes of their stream, as an
+    (n x METRICS) array. Both the number of entries and their total rows
+    are bounded; least recently used entries are evicted first.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_ROLLOUT_CACHE_SIZE,
+                 max_rows: int = DEFAULT_ROLLOUT_CACHE_ROWS):
+        self.maxsize = max(0, int(maxsize))
+        self.max_rows = max(0, int(max_rows))
+        self._entries: 'OrderedDict[str, np.ndarray]' = OrderedDict()
+        self._rows = 0
+        self._lock = threading.Lock()
+        self.episodes_reused = 0
+        self.episodes_played = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(policy: RestockPolicy, days: int, seed: int, stream: int, engine: str) -> str:
+        return json.dumps([engine, days, seed, stream, policy.to_dict()], sort_keys=True)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            rows = self._entries.get(key)
+            if rows is not None:
+                self._entries.move_to_end(key)
+            return rows
+
+    def put(self, key: str, rows: np.ndarray) -> None:
+        """
+        Store a policy's results unless more episodes are cached already
+        (or they alone exceed max_rows).
+        """
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and len(cached) >= len(rows):
+                return
+            if len(rows) > self.max_rows:
+                return
+            if cached is not None:
+                self._rows -= len(cached)
+            self._entries[key] = rows
+            self._entries.move_to_end(key)
+            self._rows += len(rows)
+            while len(self._entries) > self.maxsize or self._rows > self.max_rows:
+                _, evicted = self._entries.popitem(last=False)
+                self._rows -= len(evicted)
+                self.evictions += 1
+
+    def count(self, reused: int, played: int) -> None:
+        """Add to the episodes served from the cache / played for it."""
+        with self._lock:
+            self.episodes_reused += reused
+            self.episodes_played += played
+
+    def metrics(self) -> Dict[str, Any]:
+        """Size, capacity and reuse counters."""
+        with self._lock:
+            return {
+                'policies': len(self._entries),
+                'maxsize': self.maxsize,
+                'rows': self._rows,
+                'max_rows': self.max_rows,
+                'episodes_reused': self.episodes_reused,
+                'episodes_played': self.episodes_played,
+                'evictions': self.evictions
+            }
+
+
+def candidate_space(products: Optional[Sequence] = None,
+                    reorder_days: Sequence[float] = DEFAULT_REORDER_DAYS,
+                    order_factors: Sequence[float] = DEFAULT_ORDER_FACTORS) -> SearchSpace:
+    """
+    Per-product (reorder point, order quantity) candidates.
+
+    Args:
+        products: Products to search over (default: the game's starting products)
+        reorder_days: Reorder points, in days of the product's demand
+        order_factors: Order quantities, in multiples of the product's EOQ
+
+    Returns:
+        Distinct pairs in units, per product name
+    """
+    if products is None:
+        products = GameCatalog.get_base_products()
+    if not reorder_days or not order_factors:
+        raise ValueError('reorder_days and order_factors must not be empty')
+    if min(reorder_days) < 0 or min(order_factors) <= 0:
+        raise ValueError('reorder_days must be non-negative and order_factors positive')
+
+    space = {}
+    for product in products:
+        eoq = 0.0
+        if product.cost_storage > 0 and product.daily_demand > 0:
+            eoq = math.sqrt(2 * product.daily_demand * product.cost_restock / product.cost_storage)
+        pairs = [
+            (int(round(product.daily_demand * days)), max(1, int(round(eoq * factor))))
+            for days in reorder_days for factor in order_factors
+        ]
+        space[product.name] = list(dict.fromkeys(pairs))
+    return space
+
+
+def space_size(space: SearchSpace) -> int:
+    """Number of candidate policies of a search space."""
+    return math.prod(len(pairs) for pairs in space.values())
+
+
+def candidate_policy(space: SearchSpace, choice: Sequence[int]) -> RestockPolicy:
+    """The policy taking pair choice[i] for the i-th product of the space."""
+    return RestockPolicy(products={
+        name: {'reorder_point': pairs[index][0], 'quantity': pairs[index][1]}
+        for (name, pairs), index in zip(space.items(), choice)
+    })
+
+
+def halving_schedule(candidates: int, min_episodes: int, max_episodes: int,
+                     eta: int = 2) -> List[Tuple[int, int]]:
+    """
+    Rounds of a successive halving search.
+
+    Returns:
+        (candidates scored, episodes per candidate) of every round
+    """
+    rounds = []
+    episodes = min_episodes
+    while True:
+        rounds.append((candidates, episodes))
+        if candidates == 1 or episodes >= max_episodes:
+            return rounds
+        candidates = max(1, math.ceil(candidates / eta))
+        episodes = min(max_episodes, episodes * eta)
+
+
+class PolicySearch:
+    """
+    Searches of per-product restocking policies on common seeded episodes.
+
+    One PolicySearch fixes the rollout settings (days, seed, engine) and
+    the objective; its searches share the rollout cache.
+    """
+
+    def __init__(self, days: int = 365, seed: int = 0, engine: str = 'classic',
+                 objective: str = 'profit', cache: Optional[RolloutCache] = None,
+                 parallel: Optional[bool] = None, max_simulated_days: Optional[int] = None,
+                 max_episodes: Optional[int] = None):
+        """
+        Args:
+            days: Days per episode
+            seed: Seed of the episode streams; the same seed gives the same results
+            engine: 'classic' or 'array' game engine
+            objective: Metric to maximize, one of OBJECTIVES
+            cache: Rollout cache to share (default: a new one)
+            parallel: Shard rollouts across the process pool (None = when
+                the rollouts to play are large enough)
+            max_simulated_days: Days (episodes x days) this object may play
+                in total; rollouts beyond it raise ValueError
+            max_episodes: Episodes a rollout may ask for per policy; more
+                raise ValueError
+
+        Raises:
+            ValueError: If days, engine or objective is invalid
+        """
+        if days < 1:
+            raise ValueError('days must be at least 1')
+        if engine not in ENGINES:
+            raise ValueError(f"engine must be one of: {', '.join(ENGINES)}")
+        if objective not in OBJECTIVES:
+            raise ValueError(f"objective must be one of: {', '.join(OBJECTIVES)}")
+        self.days = days
+        self.seed = seed
+        self.engine = engine
+        self.objective = objective
+        self.cache = cache if cache is not None else RolloutCache()
+        self.parallel = parallel
+        self.max_simulated_days = max_simulated_days
+        self.max_episodes = max_episodes
+        self.episodes_played = 0
+        self.episodes_reused = 0
+        # Counters when the current search started
+        self._search_start = (0, 0)
+
+    # ---- Rollouts ----
+
+    def rollouts(self, policies: Sequence[RestockPolicy], episodes: int,
+                 stream: int = 0) -> List[np.ndarray]:
+        """
+        Per-episode results of policies on the same episodes.
+
+        Only the episodes missing from the cache are played, all policies'
+        together, sharded across the process pool when large enough.
+
+        Args:
+            policies: Policies to play
+            episodes: Episodes per policy (the first ones of the stream)
+            stream: Episode stream (0 for the search, others for validation)
+
+        Returns:
+            An (episodes x METRICS) array per policy
+
+        Raises:
+            ValueError: If the rollouts would exceed max_simulated_days or
+                max_episodes
+        """
+        if self.max_episodes is not None and episodes > self.max_episodes:
+            raise ValueError(f'At most {self.max_episodes} episodes per policy')
+        keys = [RolloutCache.key(policy, self.days, self.seed, stream, self.engine)
+                for policy in policies]
+        cached = {}
+        missing = {}
+        for policy, key in zip(policies, keys):
+            if key in cached or key in missing:
+                continue
+            rows = self.cache.get(key)
+            if rows is None:
+                rows = np.empty((0, len(METRICS)))
+            cached[key] = rows
+            if len(rows) < episodes:
+                missing[key] = (policy, len(rows))
+
+        reused = sum(min(len(rows), episodes) for rows in cached.values())
+        played = sum(episodes - start for _, start in missing.values())
+        if (self.max_simulated_days is not None
+                and (self.episodes_played + played) * self.days > self.max_simulated_days):
+            raise ValueError(f'The search would simulate more than {self.max_simulated_days} days')
+        self.episodes_reused += reused
+        self.episodes_played += played
+        self.cache.count(reused, played)
+
+        if missing:
+            entropy = self.seed if stream == 0 else [self.seed, stream]
+            seeds = episode_seeds(entropy, episodes)
+            parallel = self.parallel
+            if parallel is None:
+                parallel = played * self.days >= PARALLEL_MIN_EPISODE_DAYS
+            chunks = max(1, math.ceil(PARALLEL_WORKERS / len(missing))) if parallel else 1
+
+            tasks = []
+            owners = []
+            for key, (policy, start) in missing.items():
+                for bounds in shard_bounds(episodes - start, chunks):
+                    tasks.append((policy.to_dict(), self.days,
+                                  seeds[start + bounds.start:start + bounds.stop], self.engine))
+                    owners.append(key)
+            if parallel:
+                results = map_shards(evaluate_episodes, tasks)
+            else:
+                results = [evaluate_episodes(task) for task in tasks]
+
+            new_rows: Dict[str, List[List[float]]] = {key: [] for key in missing}
+            for key, rows in zip(owners, results):
+                new_rows[key].extend(rows)
+            for key, rows in new_rows.items():
+                cached[key] = np.vstack([cached[key], np.array(rows, dtype=np.float64)])
+                self.cache.put(key, cached[key])
+
+        return [cached[key][:episodes] for key in keys]
+
+    def _scores(self, policies: Sequence[RestockPolicy], episodes: int) -> List[float]:
+        column = METRICS.index(self.objective)
+        return [float(rows[:, column].mean()) for rows in self.rollouts(policies, episodes)]
+
+    # ---- Searches ----
+
+    def grid_search(self, space: Optional[SearchSpace] = None, episodes: int = 64,
+                    validation_episodes: int = 200) -> Dict[str, Any]:
+        """
+        Score every candidate of a search space on the same episodes.
+
+        Args:
+            space: Candidates per product (default: candidate_space())
+            episodes: Episodes per candidate
+            validation_episodes: Held-out episodes scoring the winner and
+                the baseline (0 = none)
+
+        Returns:
+            Search result (see _result())
+
+        Raises:
+            ValueError: If the space has more than MAX_GRID_CANDIDATES candidates
+        """
+        self._search_start = (self.episodes_played, self.episodes_reused)
+        space = candidate_space() if space is None else space
+        size = space_size(space)
+        if size > MAX_GRID_CANDIDATES:
+            raise ValueError(f'The grid has {size} candidates; at most {MAX_GRID_CANDIDATES} '
+                             f'are allowed (use successive halving)')
+        if episodes < 1:
+            raise ValueError('episodes must be at least 1')
+
+        policies = [RestockPolicy()] + [
+            candidate_policy(space, choice)
+            for choice in itertools.product(*(range(len(pairs)) for pairs in space.values()))
+        ]
+        scores = self._scores(policies, episodes)
+        best = max(range(len(policies)), key=lambda i: scores[i])
+        rounds = [{'candidates': len(policies), 'episodes': episodes, 'best_score': round(scores[best], 4)}]
+        return self._result('grid', policies[best], episodes, len(policies), rounds, validation_episodes)
+
+    def successive_halving(self, space: Optional[SearchSpace] = None, candidates: int = 64,
+                           min_episodes: int = 8, max_episodes: int = 128, eta: int = 2,
+                           validation_episodes: int = 200) -> Dict[str, Any]:
+        """
+        Score many sampled candidates on few episodes and give the best
+        1/eta of them eta times more episodes each round, until one is
+        left or max_episodes is reached.
+
+        Args:
+            space: Candidates per product (default: candidate_space())
+            candidates: Candidates sampled from the space (all if fewer);
+                the baseline policy competes as well
+            min_episodes: Episodes per candidate in the first round
+            max_episodes: Episodes per candidate in the last round
+            eta: Elimination factor between rounds (at least 2)
+            validation_episodes: Held-out episodes scoring the winner and
+                the baseline (0 = none)
+
+        Returns:
+            Search result (see _result())
+
+        Raises:
+            ValueError: If candidates is more than MAX_SAMPLED_CANDIDATES
+        """
+        self._search_start = (self.episodes_played, self.episodes_reused)
+        space = candidate_space() if space is None else space
+        if candidates > MAX_SAMPLED_CANDIDATES:
+            raise ValueError(f'At most {MAX_SAMPLED_CANDIDATES} candidates may be sampled')
+        if candidates < 1 or min_episodes < 1 or max_episodes < min_episodes or eta < 2:
+            raise ValueError('candidates and min_episodes must be at least 1, '
+                             'max_episodes at least min_episodes and eta at least 2')
+
+        # Mixed-radix decoding of sampled candidate numbers; the sample
+        # only depends on the seed
+        radices = [len(pairs) for pairs in space.values()]
+        size = space_size(space)
+        numbers = random.Random(self.seed).sample(range(size), min(candidates, size))
+        choices = []
+        for number in numbers:
+            choice = []
+            for radix in reversed(radices):
+                number, index = divmod(number, radix)
+                choice.append(index)
+            choices.append(choice[::-1])
+        pool = [RestockPolicy()] + [candidate_policy(space, choice) for choice in choices]
+
+        rounds = []
+        total = len(pool)
+        for round_candidates, episodes in halving_schedule(len(pool), min_episodes, max_episodes, eta):
+            pool = pool[:round_candidates]
+            scores = self._scores(pool, episodes)
+            order = sorted(range(len(pool)), key=lambda i: -scores[i])
+            pool = [pool[i] for i in order]
+            rounds.append({
+                'candidates': len(pool),
+                'episodes': episodes,
+                'best_score': round(scores[order[0]], 4)
+            })
+        return self._result('successive_halving', pool[0], episodes, total, rounds, validation_episodes)
+
+    def cross_entropy(self, space: Optional[SearchSpace] = None, iterations: int = 10,
+                      samples: int = 32, elite_fraction: float = 0.2, smoothing: float = 0.7,
+                      episodes: int = 32, validation_episodes: int = 200) -> Dict[str, Any]:
+        """
+        Cross-entropy method over per-product pair distributions.
+
+        Every iteration samples candidates from independent per-product
+        distributions (uniform at first), scores them on the same
+        episodes, and moves each distribution towards the pairs of the
+        elite candidates. Candidates sampled again come from the cache.
+
+        Args:
+            space: Candidates per product (default: candidate_space())
+            iterations: Sampling rounds
+            samples: Candidates drawn per round (duplicates are dropped)
+            elite_fraction: Share of a round's candidates that form its elite
+            smoothing: Weight of the elite frequencies in the updated
+                distributions (1 = forget the previous ones)
+            episodes: Episodes per candidate
+            validation_episodes: Held-out episodes scoring the winner and
+                the baseline (0 = none)
+
+        Returns:
+            Search result (see _result()); the baseline policy wins if no
+            candidate beats it
+
+        Raises:
+            ValueError: If iterations x samples is more than MAX_SAMPLED_CANDIDATES
+        """
+        self._search_start = (self.episodes_played, self.episodes_reused)
+        space = candidate_space() if space is None else space
+        if iterations < 1 or samples < 1 or episodes < 1:
+            raise ValueError('iterations, samples and episodes must be at least 1')
+        if iterations * samples > MAX_SAMPLED_CANDIDATES:
+            raise ValueError(f'iterations x samples may be at most {MAX_SAMPLED_CANDIDATES}')
+        if not 0 < elite_fraction <= 1 or not 0 < smoothing <= 1:
+            raise ValueError('elite_fraction and smoothing must be in (0, 1]')
+
+        rng = random.Random(self.seed)
+        probabilities = [[1.0 / len(pairs)] * len(pairs) for pairs in space.values()]
+        scores: Dict[Tuple[int, ...], float] = {}
+        rounds = []
+        for _ in range(iterations):
+            choices = sorted({
+                tuple(rng.choices(range(len(weights)), weights=weights)[0] for weights in probabilities)
+                for _ in range(samples)
+            })
+            scores.update(zip(choices, self._scores(
+                [candidate_policy(space, choice) for choice in choices], episodes)))
+            elite = sorted(choices, key=lambda choice: -scores[choice])
+            elite = elite[:max(1, int(len(choices) * elite_fraction))]
+            for i, weights in enumerate(probabilities):
+                counts = [0] * len(weights)
+                for choice in elite:
+                    counts[choice[i]] += 1
+                probabilities[i] = [
+                    smoothing * count / len(elite) + (1 - smoothing) * weight
+                    for count, weight in zip(counts, weights)
+                ]
+            rounds.append({
+                'candidates': len(choices),
+                'episodes': episodes,
+                'best_score': round(scores[elite[0]], 4)
+            })
+
+        baseline = RestockPolicy()
+        best_choice = max(scores, key=lambda choice: scores[choice])
+        best = baseline
+        if scores[best_choice] > self._scores([baseline], episodes)[0]:
+            best = candidate_policy(space, best_choice)
+        return self._result('cross_entropy', best, episodes, len(scores) + 1, rounds, validation_episodes)
+
+    def _result(self, method: str, best: RestockPolicy, selection_episodes: int,
+                candidates: int, rounds: List[Dict[str, Any]],
+                validation_episodes: int) -> Dict[str, Any]:
+        """
+        Search result: the winner's policy, its scores on the selection
+        episodes and, if validation_episodes, the held-out scores of the
+        winner and of the baseline policy plus their paired difference.
+        """
+        baseline = RestockPolicy()
+        selection = self.rollouts([best], selection_episodes)[0]
+        result = {
+            'method': method,
+            'objective': self.objective,
+            'days': self.days,
+            'seed': self.seed,
+            'engine': self.engine,
+            'candidates': candidates,
+            'rounds': rounds,
+            'best': {
+                'policy': best.to_dict(),
+                'selection': {
+                    'episodes': selection_episodes,
+                    'metrics': {metric: summarize(selection[:, i]) for i, metric in enumerate(METRICS)}
+                }
+            }
+        }
+
+        if validation_episodes > 0:
+            best_rows, baseline_rows = self.rollouts([best, baseline], validation_episodes,
+                                                     stream=_VALIDATION_STREAM)
+            column = METRICS.index(self.objective)
+            result['best']['validation'] = {
+                'episodes': validation_episodes,
+                'metrics': {metric: summarize(best_rows[:, i]) for i, metric in enumerate(METRICS)}
+            }
+            result['baseline'] = {
+                'policy': baseline.to_dict(),
+                'validation': {
+                    'episodes': validation_episodes,
+                    'metrics': {metric: summarize(baseline_rows[:, i]) for i, metric in enumerate(METRICS)}
+                }
+            }
+            # Same episodes for both, so the difference is paired
+            result['improvement'] = summarize(best_rows[:, column] - baseline_rows[:, column])
+
+        played = self.episodes_played - self._search_start[0]
+        result['episodes_played'] = played
+        result['episodes_reused'] = self.episodes_reused - self._search_start[1]
+        result['simulated_days'] = played * self.days
+        return result
@@ -0,0 +1,209 @@
+"""
+Service-level driven reorder points with safety stock.
+
+Demand during the lead time is modelled from per-product daily demand
+and lead-time distributions, either with the analytic normal
+approximation or with batched Monte Carlo sampling across the whole
+catalog. Monte Carlo runs in row chunks sized to a fixed memory budget.
+"""
+
+import math
+from statistics import NormalDist
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from inventory_optimization import (
+    LEAD_TIME_DAYS, product_columns, evaluate_stock_levels, build_recommendations,
+    round_half_even
+)
+
+
+REORDER_MODES = ('deterministic', 'normal', 'monte_carlo')
+DEFAULT_SERVICE_LEVEL = 0.95
+DEFAULT_SAMPLES = 10000
+MAX_SAMPLES = 100000
+
+# Bytes of sample matrices alive at once during Monte Carlo sampling
+DEFAULT_MEMORY_BUDGET = 256 * 1024 * 1024
+
+# float64 sample matrices alive per chunk (lead-time mean, spread, demand)
+_MATRICES_PER_CHUNK = 3
+
+
+def demand_distribution(products: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """
+    Read the optional demand / lead-time distribution fields of products.
+
+    Per product (all optional):
+        - daily_demand_std: Standard deviation of daily demand (default 0)
+        - lead_time_days: Mean lead time in days (default 7)
+        - lead_time_std: Standard deviation of the lead time (default 0)
+
+    The mean daily demand is the annual 'demand' / 365.
+
+    Raises:
+        ValueError: If a distribution field is not a finite, non-negative number
+    """
+    demand = np.asarray([product.get('demand', 0) for product in products], dtype=np.float64)
+    distribution = {
+        'daily_mean': np.where(demand > 0, demand / 365, 0.0),
+        'daily_std': np.asarray(
+            [product.get('daily_demand_std', 0) for product in products], dtype=np.float64),
+        'lead_time_mean': np.asarray(
+            [product.get('lead_time_days', LEAD_TIME_DAYS) for product in products], dtype=np.float64),
+        'lead_time_std': np.asarray(
+            [product.get('lead_time_std', 0) for product in products], dtype=np.float64)
+    }
+    for key, field in (('daily_std', 'daily_demand_std'), ('lead_time_mean', 'lead_time_days'),
+                       ('lead_time_std', 'lead_time_std')):
+        values = distribution[key]
+        invalid = np.flatnonzero(~(np.isfinite(values) & (values >= 0)))
+        if invalid.size:
+            raise ValueError(f'Product {invalid[0]} {field} must be a finite, non-negative number')
+    return distribution
+
+
+def normal_reorder_points(daily_mean, daily_std, lead_time_mean, lead_time_std,
+                          service_level: float = DEFAULT_SERVICE_LEVEL) -> Dict[str, np.ndarray]:
+    """
+    Analytic reorder points from the normal approximation of lead-time demand.
+
+    Lead-time demand has mean d * L and variance L * sd^2 + d^2 * sL^2;
+    the safety stock is z(service_level) standard deviations.
+
+    Returns:
+        Dictionary of arrays: reorder_point, safety_stock, stockout_probability
+    """
+    expected = daily_mean * lead_time_mean
+    sigma = np.sqrt(np.maximum(
+        lead_time_mean * daily_std ** 2 + daily_mean ** 2 * lead_time_std ** 2, 0.0
+    ))
+    safety_stock = NormalDist().inv_cdf(service_level) * sigma
+    return {
+        'reorder_point': expected + safety_stock,
+        'safety_stock': safety_stock,
+        'stockout_probability': np.where(sigma > 0, 1.0 - service_level, 0.0)
+    }
+
+
+def monte_carlo_reorder_points(daily_mean, daily_std, lead_time_mean, lead_time_std,
+                               service_level: float = DEFAULT_SERVICE_LEVEL,
+                               samples: int = DEFAULT_SAMPLES,
+                               seed: Optional[int] = None,
+                               memory_budget: int = DEFAULT_MEMORY_BUDGET) -> Dict[str, np.ndarray]:
+    """
+    Sampled reorder points for every product, in memory-bounded chunks.
+
+    For each product, `samples` lead times are drawn from a normal
+    distribution (truncated at 0), then the demand during each lead time
+    from N(d * L, sd^2 * L) (truncated at 0). The reorder point is the
+    service-level quantile of that demand; the stockout probability is the
+    sampled share of lead times whose demand exceeds it.
+
+    Returns:
+        Dictionary of arrays: reorder_point, safety_stock, stockout_probability
+    """
+    count = len(daily_mean)
+    rng = np.random.default_rng(seed)
+    rows_per_chunk = max(1, memory_budget // (samples * 8 * _MATRICES_PER_CHUNK))
+    # Order statistic of the service-level quantile
+    kth = min(samples - 1, max(0, math.ceil(service_level * samples) - 1))
+
+    reorder_point = np.empty(count)
+    stockout_probability = np.empty(count)
+    for start in range(0, count, rows_per_chunk):
+        rows = slice(start, min(start + rows_per_chunk, count))
+        shape = (rows.stop - rows.start, samples)
+
+        lead_times = rng.normal(lead_time_mean[rows, None], lead_time_std[rows, None], shape)
+        np.maximum(lead_times, 0.0, out=lead_times)
+        # Demand ~ N(d * L, sd^2 * L), built in place to keep three matrices alive
+        spread = np.sqrt(lead_times)
+        spread *= daily_std[rows, None]
+        lead_times *= daily_mean[rows, None]
+        demand = rng.normal(lead_times, spread)
+        del lead_times, spread
+        np.maximum(demand, 0.0, out=demand)
+
+        # In-place partition only reorders each row, so the comparison below still holds
+        demand.partition(kth, axis=1)
+        quantile = demand[:, kth]
+        reorder_point[rows] = quantile
+        stockout_probability[rows] = np.count_nonzero(demand > quantile[:, None], axis=1) / samples
+        # Free this chunk's samples before the next one is drawn
+        del demand, quantile
+
+    return {
+        'reorder_point': reorder_point,
+        'safety_stock': reorder_point - daily_mean * lead_time_mean,
+        'stockout_probability': stockout_probability
+    }
+
+
+def validate_options(mode: str, service_level: Any, samples: Any) -> None:
+    """Raise ValueError for unsupported reorder-point options."""
+    if mode not in REORDER_MODES:
+        raise ValueError(f"reorder_mode must be one of: {', '.join(REORDER_MODES)}")
+    if not isinstance(service_level, (int, float)) or not 0 < service_level < 1:
+        raise ValueError('service_level must be a number between 0 and 1 (exclusive)')
+    if not isinstance(samples, int) or not 1 <= samples <= MAX_SAMPLES:
+        raise ValueError(f'samples must be an integer between 1 and {MAX_SAMPLES}')
+
+
+def recommend_with_safety_stock(products: List[Dict[str, Any]], mode: str = 'normal',
+                                service_level: float = DEFAULT_SERVICE_LEVEL,
+                                samples: int = DEFAULT_SAMPLES,
+                                seed: Optional[int] = None,
+                                cache=None,
+                                memory_budget: int = DEFAULT_MEMORY_BUDGET) -> List[Dict[str, Any]]:
+    """
+    recommend_stock_levels() with service-level driven reorder points.
+
+    Args:
+        products: Product dicts, optionally with the distribution fields of
+            demand_distribution()
+        mode: 'normal' (analytic) or 'monte_carlo'
+        service_level: Target probability of not stocking out during a lead time
+        samples: Monte Carlo samples per product
+        seed: Monte Carlo seed, for reproducible results
+        cache: Optional EOQCache
+        memory_budget: Bytes of Monte Carlo samples alive at once
+
+    Returns:
+        The usual recommendations, with reorder_point replaced and
+        safety_stock, stockout_probability and service_level added
+
+    Raises:
+        ValueError: For unsupported options or distribution fields
+    """
+    validate_options(mode, service_level, samples)
+    distribution = demand_distribution(products)
+    if mode == 'monte_carlo':
+        stochastic = monte_carlo_reorder_points(
+            **distribution, service_level=service_level, samples=samples,
+            seed=seed, memory_budget=memory_budget
+        )
+    elif mode == 'normal':
+        stochastic = normal_reorder_points(**distribution, service_level=service_level)
+    else:
+        raise ValueError("Safety stock needs reorder_mode 'normal' or 'monte_carlo'")
+
+    columns = product_columns(products)
+    results = evaluate_stock_levels(
+        columns['stock'], columns['demand'], columns['cost_storage'], columns['cost_restock'],
+        cache=cache, reorder_point=stochastic['reorder_point']
+    )
+    recommendations = build_recommendations(
+        columns['name'], columns['stock'], columns['demand'], columns['cost_storage'], results
+    )
+
+    reorder_points = round_half_even(stochastic['reorder_point'])
+    safety_stocks = round_half_even(stochastic['safety_stock'])
+    stockout_probabilities = round_half_even(stochastic['stockout_probability'], 4)
+    for i, recommendation in enumerate(recommendations):
+        recommendation['reorder_point'] = reorder_points[i]
+        recommendation['safety_stock'] = safety_stocks[i]
+        recommendation['stockout_probability'] = stockout_probabilities[i]
+        recommendation['service_level'] = service_level
+    return recommendations
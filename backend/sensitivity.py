@@ -0,0 +1,147 @@
+"""
+Closed-form sensitivity analysis of EOQ, inventory cost and reorder point.
+
+With EOQ = sqrt(2DS/H), the annual inventory cost at the EOQ is
+TC = sqrt(2DSH), so every partial derivative has a closed form:
+
+    dEOQ/dD = EOQ / 2D     dEOQ/dS = EOQ / 2S     dEOQ/dH = -EOQ / 2H
+    dTC/dD  = TC / 2D      dTC/dS  = TC / 2S      dTC/dH  = TC / 2H
+    dROP/dD = lead time / 365
+
+(D = annual demand, S = cost_restock, H = cost_storage.) The elasticities
+follow as x/f * df/dx. Products without an EOQ (no demand or no storage
+cost) report zero for the EOQ and cost terms.
+"""
+
+from typing import Any, Dict, List
+
+import numpy as np
+
+from inventory_optimization import LEAD_TIME_DAYS, evaluate_costs, round_half_even
+
+
+INPUTS = ('demand', 'cost_restock', 'cost_storage')
+
+
+def compute_sensitivities(demand, cost_storage, cost_restock,
+                          lead_time_days: float = LEAD_TIME_DAYS,
+                          cache=None) -> Dict[str, Any]:
+    """
+    Partial derivatives and elasticities for every product in one pass.
+
+    Args:
+        demand, cost_storage, cost_restock: Array-likes, one entry per product
+        lead_time_days: Lead time of the reorder point
+        cache: Optional EOQCache for the EOQ / cost kernel
+
+    Returns:
+        Dictionary with the eoq, total_inventory_cost and reorder_point
+        arrays, plus 'derivatives' and 'elasticities', each mapping
+        output -> input -> array
+    """
+    demand = np.asarray(demand, dtype=np.float64)
+    cost_storage = np.asarray(cost_storage, dtype=np.float64)
+    cost_restock = np.asarray(cost_restock, dtype=np.float64)
+
+    if cache is None:
+        costs = evaluate_costs(demand, cost_storage, cost_restock, lead_time_days)
+    else:
+        costs = cache.evaluate(demand, cost_storage, cost_restock, lead_time_days)
+    eoq = costs['eoq']
+    total_cost = costs['total_ordering_cost'] + costs['total_holding_cost']
+
+    defined = eoq > 0
+    values = {'demand': demand, 'cost_restock': cost_restock, 'cost_storage': cost_storage}
+    # Sign of each input's effect: only the storage cost lowers the EOQ
+    eoq_signs = {'demand': 1.0, 'cost_restock': 1.0, 'cost_storage': -1.0}
+
+    derivatives = {'eoq': {}, 'total_inventory_cost': {}}
+    elasticities = {'eoq': {}, 'total_inventory_cost': {}}
+    for name in INPUTS:
+        denominator = np.where(defined, 2 * values[name], 1.0)
+        derivatives['eoq'][name] = np.where(defined, eoq_signs[name] * eoq / denominator, 0.0)
+        derivatives['total_inventory_cost'][name] = np.where(defined, total_cost / denominator, 0.0)
+        elasticities['eoq'][name] = np.where(defined, 0.5 * eoq_signs[name], 0.0)
+        elasticities['total_inventory_cost'][name] = np.where(defined, 0.5, 0.0)
+
+    has_demand = demand > 0
+    derivatives['reorder_point'] = {'demand': np.where(has_demand, lead_time_days / 365, 0.0)}
+    elasticities['reorder_point'] = {'demand': np.where(has_demand, 1.0, 0.0)}
+
+    return {
+        'eoq': eoq,
+        'total_inventory_cost': total_cost,
+        'reorder_point': costs['reorder_point'],
+        'derivatives': derivatives,
+        'elasticities': elasticities,
+        'values': values
+    }
+
+
+def aggregate_sensitivities(sensitivities: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Catalog-wide response to scaling one input for every product.
+
+    For a multiplier m applied to input x across the catalog,
+    d(sum f)/dm at m = 1 is sum(x * df/dx), and the catalog elasticity
+    is that divided by sum(f).
+
+    Returns:
+        Totals of each output plus, per output and input, the derivative
+        with respect to the catalog-wide multiplier and the elasticity
+    """
+    values = sensitivities['values']
+    aggregates = {}
+    for output, by_input in sensitivities['derivatives'].items():
+        total = float(np.sum(sensitivities[output]))
+        per_input = {}
+        for name, derivative in by_input.items():
+            multiplier_derivative = float(np.sum(values[name] * derivative))
+            per_input[name] = {
+                'multiplier_derivative': round(multiplier_derivative, 4),
+                'elasticity': round(multiplier_derivative / total, 4) if total else 0.0
+            }
+        aggregates[output] = {'total': round(total, 2), 'sensitivity': per_input}
+    return aggregates
+
+
+def sensitivity_report(names: List[str], sensitivities: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Per-product sensitivity dicts for the API.
+
+    Returns:
+        One dict per product with its eoq, total_inventory_cost,
+        reorder_point, derivatives and elasticities
+    """
+    def rounded(array, ndigits):
+        return round_half_even(array, ndigits)
+
+    eoq = rounded(sensitivities['eoq'], 2)
+    total_cost = rounded(sensitivities['total_inventory_cost'], 2)
+    reorder_point = rounded(sensitivities['reorder_point'], 2)
+    derivatives = {
+        output: {name: rounded(array, 6) for name, array in by_input.items()}
+        for output, by_input in sensitivities['derivatives'].items()
+    }
+    elasticities = {
+        output: {name: rounded(array, 4) for name, array in by_input.items()}
+        for output, by_input in sensitivities['elasticities'].items()
+    }
+
+    report = []
+    for i, name in enumerate(names):
+        report.append({
+            'name': name,
+            'eoq': eoq[i],
+            'total_inventory_cost': total_cost[i],
+            'reorder_point': reorder_point[i],
+            'derivatives': {
+                output: {input_name: values[i] for input_name, values in by_input.items()}
+                for output, by_input in derivatives.items()
+            },
+            'elasticities': {
+                output: {input_name: values[i] for input_name, values in by_input.items()}
+                for output, by_input in elasticities.items()
+            }
+        })
+    return report
@@ -32,6 +32,77 @@ const CHART_BG_COLORS = [
     'rgba(20, 184, 166, 0.2)'
 ];
 
+// Game session (one per browser tab), sent with every game request so
+// each player gets their own game on the server
+const SESSION_STORAGE_KEY = 'stockGameSessionId';
+const sessionId = loadSessionId();
+
+function loadSessionId() {
+    let id = null;
+    try {
+        id = sessionStorage.getItem(SESSION_STORAGE_KEY);
+    } catch (e) {
+        // Storage unavailable (e.g. privacy mode): keep the ID in memory only
+    }
+    if (!id) {
+        id = (window.crypto && crypto.randomUUID)
+            ? crypto.randomUUID().replace(/-/g, '')
+            : Array.from({ length: 32 }, () => Math.floor(Math.random() * 16).toString(16)).join('');
+        try {
+            sessionStorage.setItem(SESSION_STORAGE_KEY, id);
+        } catch (e) {
+            // Ignore, see above
+        }
+    }
+    return id;
+}
+
+function gameFetch(path, options = {}) {
+    const headers = Object.assign({}, options.headers, { 'X-Session-ID': sessionId });
+    return fetch(`${API_BASE_URL}${path}`, Object.assign({}, options, { headers }));
+}
+
+// Push channel of the session (Server-Sent Events): keeps the UI in step
+// with changes made elsewhere (e.g. /advance from a script) without polling
+let gameEvents = null;
+let latestDayReport = null;
+
+function subscribeToGame() {
+    if (gameEvents) {
+        gameEvents.close();
+    }
+    if (!window.EventSource) return;
+    
+    latestDayReport = null;
+    gameEvents = new EventSource(`${API_BASE_URL}/events?session_id=${encodeURIComponent(sessionId)}`);
+    
+    gameEvents.addEventListener('day', (event) => {
+        latestDayReport = JSON.parse(event.data);
+    });
+    
+    gameEvents.addEventListener('state', (event) => {
+        const delta = JSON.parse(event.data);
+        // Our own actions already returned this state; only apply newer ones
+        if (!gameState || delta.game_id !== gameState.game_id || delta.version <= gameState.version) {
+            return;
+        }
+        Object.keys(delta).forEach((key) => {
+            if (key !== 'history' && key !== 'since_version') {
+                gameState[key] = delta[key];
+            }
+        });
+        if (delta.history) {
+            mergeHistory(delta.history);
+        }
+        updateUI();
+    });
+    
+    gameEvents.addEventListener('end', () => {
+        gameEvents.close();
+        gameEvents = null;
+    });
+}
+
 // Initialize
 document.addEventListener('DOMContentLoaded', () => {
     initializeCharts();
@@ -42,7 +113,7 @@ document.addEventListener('DOMContentLoaded', () => {
 async function startGame() {
     showLoading(true);
     try {
-        const response = await fetch(`${API_BASE_URL}/start_game`, {
+        const response = await gameFetch('/start_game', {
             method: 'GET'
         });
         
@@ -66,6 +137,7 @@ async function startGame() {
             initializeStockHistory();
             
             updateUI();
+            subscribeToGame();
             document.getElementById('nextDayBtn').disabled = false;
             showToast(data.message, 'success');
         } else {
@@ -87,7 +159,7 @@ async function nextDay() {
     
     showLoading(true);
     try {
-        const response = await fetch(`${API_BASE_URL}/next_day`, {
+        const response = await gameFetch('/next_day', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -132,7 +204,7 @@ async function nextDay() {
 async function restock(productName, quantity) {
     showLoading(true);
     try {
-        const response = await fetch(`${API_BASE_URL}/restock`, {
+        const response = await gameFetch('/restock', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -176,7 +248,7 @@ async function restock(productName, quantity) {
 async function getState() {
     showLoading(true);
     try {
-        const response = await fetch(`${API_BASE_URL}/get_state`, {
+        const response = await gameFetch('/get_state', {
             method: 'GET'
         });
         
@@ -585,7 +657,7 @@ async function unlockItem(itemName) {
     
     showLoading(true);
     try {
-        const response = await fetch(`${API_BASE_URL}/unlock_item`, {
+        const response = await gameFetch('/unlock_item', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -927,6 +999,22 @@ function initializeStockHistory() {
     });
 }
 
+// Merge the new history points of a state delta (see /get_state?since_version=)
+function mergeHistory(history) {
+    const start = history.start_index;
+    budgetHistory.splice(start, budgetHistory.length - start, ...history.budget);
+    dayHistory.splice(start, dayHistory.length - start, ...history.days);
+    Object.keys(history.stock).forEach((name) => {
+        const points = history.stock[name];
+        if (history.new_products.includes(name) || !stockHistory[name]) {
+            // Unlocked since our version: the whole series
+            stockHistory[name] = points;
+        } else {
+            stockHistory[name].splice(start, stockHistory[name].length - start, ...points);
+        }
+    });
+}
+
 function updateStockHistory() {
     if (!gameState) return;
     
@@ -1336,6 +1424,12 @@ function refreshDailyReport() {
         return;
     }
     
+    // The latest report was already pushed over the event stream
+    if (latestDayReport) {
+        displayDailyReport(latestDayReport);
+        return;
+    }
+    
     getDailyReport();
 }
 
@@ -1355,7 +1449,7 @@ async function getDailyReport() {
     
     showLoading(true);
     try {
-        const response = await fetch(`${API_BASE_URL}/get_daily_report`, {
+        const response = await gameFetch('/get_daily_report', {
             method: 'GET'
         });
         